@@ -7,8 +7,10 @@ import time
 import random
 import configparser
 import os
-import re
 from threading import Thread
+from serial_framer import StxEtxFramer
+from scale_protocol import DEFAULT_PATTERN, ScaleDecoder, load_framing_config, make_framer
+from serial_connection import SerialConnectionManager, CONNECTED
 
 # --- Default Serial Configuration (เหมือนเดิม) ---
 DEFAULT_AGENT_SERIAL_PORT = "COM1"
@@ -35,10 +37,8 @@ byte_size_map_agent = {
 
 # --- Global variables (ปรับปรุงเล็กน้อย) ---
 current_serial_config = {}
-serial_connection = None
-agent_read_buffer = b''
-AGENT_STX = b'\x02'
-AGENT_ETX = b'\x03'
+serial_manager = None  # สร้างหลังโหลด config (get_serial_connection)
+agent_decoder = ScaleDecoder(StxEtxFramer(), DEFAULT_PATTERN)
 last_known_weight = "0"  # เริ่มต้นที่ 0
 SIMULATION_MODE = False  # ตัวแปรใหม่สำหรับควบคุมโหมดจำลอง
 FORCE_SIMULATION_MODE = True
@@ -67,7 +67,7 @@ async def broadcast_weight(weight_data):
 
 # --- Function to load configuration (เหมือนเดิม) ---
 def load_agent_config():
-    global current_serial_config
+    global current_serial_config, agent_decoder
     # ... (โค้ดส่วนนี้เหมือนเดิมทุกประการ) ...
     config = configparser.ConfigParser()
     loaded_settings = {
@@ -90,6 +90,12 @@ def load_agent_config():
                 loaded_settings['bytesize_key'] = cfg_section.get('ByteSize', DEFAULT_AGENT_BYTE_SIZE_KEY)
                 loaded_settings['timeout'] = cfg_section.getfloat('ReadTimeout', DEFAULT_AGENT_READ_TIMEOUT)
                 print(f"Agent: Loaded configuration from {CONFIG_FILE_NAME}")
+            # [Framing] เลือกรูปแบบ frame ของเครื่องชั่ง (ค่าเดิม STX/ETX)
+            # [ScaleConfig] Pattern ที่ rs232_config_tester บันทึกไว้ (ค่าเดิม Default)
+            pattern_name = config['ScaleConfig'].get('Pattern', DEFAULT_PATTERN) if 'ScaleConfig' in config \
+                else DEFAULT_PATTERN
+            agent_decoder = ScaleDecoder(make_framer(load_framing_config(config, default_mode='stx_etx')),
+                                         pattern_name)
         except Exception as e:
             print(f"Agent: Error loading config file {CONFIG_FILE_NAME}: {e}. Using default settings.")
     else:
@@ -105,89 +111,46 @@ def load_agent_config():
     print(f"Agent: Effective serial settings: {current_serial_config}")
 
 
-# --- Parser function (เหมือนเดิม) ---
-def agent_parse_scale_data(cleaned_text):
-    # ... (โค้ดส่วนนี้เหมือนเดิมทุกประการ) ...
-    known_weight_indicators_config = [
-        ("1CH", r"1CH\s+(0{3,})", True), (" H ", r"\sH\s+(0{3,})", True),
-        ("1Rh", r"1Rh\s+(0{3,})", True), ("1BH", r"1BH\s+(\d+)", False),
-        ("1@H", r"1@H\s+(\d+)", False),
-    ]
-    extracted_weight_values = []
-    for indicator_text, pattern_regex, is_zero_indicator in known_weight_indicators_config:
-        matches = re.findall(pattern_regex, cleaned_text)
-        if matches:
-            for num_str_from_match in matches:
-                if is_zero_indicator:
-                    extracted_weight_values.append("0")
-                else:
-                    try:
-                        weight_val = str(int(num_str_from_match))
-                        extracted_weight_values.append(weight_val)
-                    except ValueError:
-                        pass
-    if extracted_weight_values:
-        non_zero_values = [val for val in extracted_weight_values if val != "0"]
-        if non_zero_values:
-            return non_zero_values[-1]
-        elif "0" in extracted_weight_values:
-            return "0"
-    return "N/A"
-
 # --- Function to manage serial connection (ปรับปรุงเล็กน้อย) ---
-def get_serial_connection():
-    global serial_connection, SIMULATION_MODE
-    if serial_connection and serial_connection.is_open:
-        return serial_connection
-    try:
-        print(f"Agent: Attempting to open serial port {current_serial_config['port']}")
-        serial_connection = serial.Serial(**current_serial_config)
-        if serial_connection.is_open:
-            print(f"Agent: Serial port {current_serial_config['port']} opened successfully. LIVE MODE ACTIVATED.")
-            SIMULATION_MODE = False
-            return serial_connection
-    except serial.SerialException as e:
-        print(f"Agent: Error opening serial port: {e}")
+def on_serial_state_change(state):
+    global SIMULATION_MODE
+    if state == CONNECTED:
+        print(f"Agent: Serial port {current_serial_config['port']} opened successfully. LIVE MODE ACTIVATED.")
+        SIMULATION_MODE = False
+    elif not SIMULATION_MODE:
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
         print("!! AGENT: COULD NOT CONNECT TO RS232 PORT.            !!")
         print("!! RUNNING IN SIMULATION MODE.                        !!")
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
         SIMULATION_MODE = True
-        serial_connection = None
-    return None
+
+def get_serial_connection():
+    """คืน serial connection หรือ None (ไม่พยายามเปิด port จนกว่าจะถึงเวลา retry หรือเสียบ port กลับ)"""
+    global serial_manager
+    if serial_manager is None:
+        serial_manager = SerialConnectionManager(current_serial_config,
+                                                 log=lambda message: print(f"Agent: {message}"),
+                                                 on_state_change=on_serial_state_change)
+    return serial_manager.get()
 
 # --- Function to read from RS232 (ปรับปรุงเล็กน้อย) ---
 def read_weight_from_rs232_agent():
-    global agent_read_buffer, last_known_weight
+    global last_known_weight
     ser = get_serial_connection() # พยายามเชื่อมต่อก่อน
     if not ser: # ถ้าเชื่อมต่อไม่ได้ ก็ไม่ต้องทำอะไร เพราะเราจะใช้ SIMULATION_MODE แทน
         return last_known_weight
 
     try:
-        if ser.in_waiting > 0:
-            new_bytes = ser.read(ser.in_waiting)
-            agent_read_buffer += new_bytes
-        
-        while True:
-            stx_index = agent_read_buffer.find(AGENT_STX)
-            if stx_index != -1:
-                etx_index = agent_read_buffer.find(AGENT_ETX, stx_index + 1)
-                if etx_index != -1:
-                    complete_message_bytes = agent_read_buffer[stx_index + 1: etx_index]
-                    try:
-                        decoded_message = complete_message_bytes.decode('latin-1').strip()
-                        parsed_value = agent_parse_scale_data(decoded_message)
-                        if parsed_value != "N/A":
-                            last_known_weight = parsed_value
-                    except Exception as e:
-                        print(f"Agent: Decode/Parse error: {e}")
-                    agent_read_buffer = agent_read_buffer[etx_index + 1:]
-                else: break
-            else: break
+        new_bytes = ser.read(ser.in_waiting) if ser.in_waiting > 0 else b''
+        # frame + parse ด้วย ScaleDecoder เดียวกับ rs232_client (ดู scale_protocol.py)
+        for _, reading in agent_decoder.decode(new_bytes):
+            if reading is not None:
+                last_known_weight = reading.to_text()
         
         return last_known_weight
     except Exception as e:
         print(f"Agent: Serial read error: {e}")
+        serial_manager.mark_lost(e)
         last_known_weight = "Error"
         return last_known_weight
 
@@ -198,7 +161,7 @@ def simulate_weight():
 
     try:
         # แปลงน้ำหนักล่าสุดเป็นตัวเลข ถ้าแปลงไม่ได้ ให้เริ่มที่ 0
-        current_weight = int(last_known_weight)
+        current_weight = int(float(last_known_weight))
     except (ValueError, TypeError):
         current_weight = 0
 
@@ -237,10 +200,13 @@ def weight_producer_loop():
     async def producer():
         while True:
             # ตรวจสอบสวิตช์บังคับ หรือ โหมดจำลองอัตโนมัติ
-            if FORCE_SIMULATION_MODE or SIMULATION_MODE:
+            if FORCE_SIMULATION_MODE:
                 weight = simulate_weight()
             else:
+                # ยังเรียก read เสมอเพื่อให้กลับเป็น LIVE MODE เองเมื่อเชื่อมต่อ port ได้
                 weight = read_weight_from_rs232_agent()
+                if SIMULATION_MODE:
+                    weight = simulate_weight()
             
             # ส่งข้อมูลไปให้ broadcast function
             await broadcast_weight(weight)
@@ -1,46 +1,363 @@
 # agent_websocket.py
 import asyncio
 import websockets
+import websockets.exceptions
 import json
+import sys
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+
+# JSON encoder ที่เร็วกว่า (ไม่บังคับ: pip install orjson) - ไม่มีจะใช้ json ของ stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from branch_config import get_branch_prefix
+from scale_protocol import HELLO_MESSAGE_TYPE, PUBLISHER_ROLE, SUBSCRIBER_ROLE
+from weight_reading import WeightReading
+
+# บทบาทของ socket: ประกาศด้วย path (/publish, /subscribe) หรือข้อความ hello
+# path อื่น (เช่น / ของ client รุ่นเก่า) เริ่มเป็น subscriber และย้ายเป็น publisher เมื่อส่งค่าน้ำหนักหรือ stats
+ROLE_PATHS = {'/publish': PUBLISHER_ROLE, '/subscribe': SUBSCRIBER_ROLE}
 
 # Global variables
-CONNECTED_CLIENTS = set()
-CONNECTED_SCALE_CLIENTS = {}  # เก็บข้อมูลจาก scale clients
+PUBLISHERS = set()   # เครื่องชั่ง - ส่งค่าน้ำหนักอย่างเดียว ไม่รับ broadcast
+SUBSCRIBERS = set()  # browser - รับ broadcast
 WEIGHT_DATA = defaultdict(dict)  # เก็บข้อมูลน้ำหนักจากแต่ละ client
+SCALE_STATS = {}  # ตัวนับของ read path จากแต่ละ client (ข้อความ type "stats" ดู ScaleDecoder.stats)
+STATS_TIMEOUT = 180  # client ส่ง stats ทุก 60 วินาที - ลบเมื่อไม่ได้รับนานกว่านี้
+
+# Topic ของ subscriber: ทุกเครื่องชั่ง, เครื่องชั่งเดียว (client_id) หรือทุกเครื่องชั่งของสาขา (branch_prefix)
+# subscriber เริ่มที่ ALL_TOPIC (browser รุ่นเก่า) จนกว่าจะส่งข้อความ subscribe
+#   {"type": "subscribe", "client_id": "scale_001"}
+#   {"type": "subscribe", "branch": "สำนักงานใหญ่ P8"} หรือ {"type": "subscribe", "branch_prefix": ["Z1", "Z3"]}
+#   {"type": "unsubscribe", "client_id": "scale_001"} / {"type": "subscribe", "all": true}
+SUBSCRIBE_MESSAGE_TYPE = "subscribe"
+UNSUBSCRIBE_MESSAGE_TYPE = "unsubscribe"
+SUBSCRIBED_MESSAGE_TYPE = "subscribed"
+ALL_TOPIC = "*"
+TOPIC_SUBSCRIBERS = defaultdict(set)  # topic -> sockets ที่สนใจ
+SUBSCRIPTIONS = {}  # socket -> topics (ใช้ลบออกจาก TOPIC_SUBSCRIBERS ตอนหลุด)
+
+# ข้อความ broadcast: snapshot เต็มตอน subscribe แล้วตามด้วย delta (เฉพาะเครื่องชั่งและ field ที่เปลี่ยน)
+#   {"type": "snapshot", "topic", "version", "weight", "stable", "timestamp", "scales", "stats"}
+#   {"type": "delta", "topic", "version", "timestamp", "weight"?, "stable"?, "scales"?, "removed"?, "stats"?}
+# weight / stable (เครื่องชั่งแรกของ topic) อยู่ใน delta เฉพาะเมื่อเปลี่ยน, stats ที่เป็น null = ถูกลบ
+SNAPSHOT_MESSAGE_TYPE = "snapshot"
+DELTA_MESSAGE_TYPE = "delta"
+TOPIC_STATES = {}  # topic -> TopicState (มีเฉพาะ topic ที่มี subscriber)
+
+# แต่ละ socket มี queue ขาออกและ writer task ของตัวเอง - broadcast แค่ใส่ frame ลง queue ไม่รอการส่ง
+# queue เต็ม = ทิ้ง delta เก่าที่สุด แล้วส่ง snapshot ล่าสุดของ topic นั้นแทน delta ที่หายไป
+# ข้อความควบคุม (ack ของ subscribe) ไม่ถูกทิ้ง - queue เต็มด้วย ack ทั้งหมด = ตัดการเชื่อมต่อ
+# ส่ง frame เดียวไม่เสร็จภายใน SLOW_SUBSCRIBER_TIMEOUT = ตัดการเชื่อมต่อ (browser กลับมา subscribe ใหม่ได้)
+DEFAULT_SEND_QUEUE_SIZE = 32  # frame ต่อ socket
+SLOW_SUBSCRIBER_TIMEOUT = 10  # วินาที
+SLOW_SUBSCRIBER_CLOSE_CODE = 1013  # Try Again Later
+WRITER_ERROR_CLOSE_CODE = 1011  # Internal Error - writer task ล้มเพราะ error อื่น
+OUTBOUND = {}  # socket -> SubscriberQueue
+
+# Broadcast scheduler: ข้อความที่รับเข้ามาแค่อัปเดต WEIGHT_DATA และ mark topic ว่าเปลี่ยน
+# broadcast_scheduler ส่งแต่ละ topic ที่เปลี่ยนครั้งเดียวต่อรอบ - ค่าที่มาถี่กว่านี้ถูกรวมเป็นค่าล่าสุด
+# (ค่าแรกหลังว่างส่งทันที, latency สูงสุด = 1 รอบ)
+DEFAULT_BROADCAST_RATE = 10.0  # รอบต่อวินาที (python agent.py [broadcast_rate])
+DIRTY_TOPICS = defaultdict(set)  # topic -> client_id ที่ข้อมูลเปลี่ยนตั้งแต่รอบก่อน
+BROADCAST_PENDING = asyncio.Event()
+
+def client_topic(client_id):
+    return f"client:{client_id}"
+
+def branch_topic(branch_prefix):
+    return f"branch:{branch_prefix}"
+
+def scale_topics(client_id):
+    """topic ที่ได้รับผลเมื่อค่าน้ำหนักของ client_id เปลี่ยน"""
+    topics = [ALL_TOPIC, client_topic(client_id)]
+    if client_id in WEIGHT_DATA:
+        topics.append(branch_topic(WEIGHT_DATA[client_id]["branch_prefix"]))
+    return topics
+
+def subscribe(websocket, topics):
+    """เพิ่ม topic ให้ socket - คืน topic ที่เพิ่มใหม่"""
+    current = SUBSCRIPTIONS.setdefault(websocket, set())
+    added = [topic for topic in topics if topic not in current]
+    for topic in added:
+        current.add(topic)
+        TOPIC_SUBSCRIBERS[topic].add(websocket)
+        if topic not in TOPIC_STATES:
+            TOPIC_STATES[topic] = TopicState(topic)
+    return added
+
+def unsubscribe(websocket, topics=None):
+    """เลิกรับ topic ที่กำหนด (None = ทุก topic)"""
+    current = SUBSCRIPTIONS.get(websocket, set())
+    for topic in list(current if topics is None else topics):
+        current.discard(topic)
+        subscribers = TOPIC_SUBSCRIBERS.get(topic)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del TOPIC_SUBSCRIBERS[topic]
+                TOPIC_STATES.pop(topic, None)
+    if topics is None:
+        SUBSCRIPTIONS.pop(websocket, None)
+
+def as_list(value):
+    if value is None:
+        return []
+    return [str(item) for item in value] if isinstance(value, (list, tuple)) else [str(value)]
+
+def parse_topics(data):
+    """
+    แปลงข้อความ subscribe / unsubscribe เป็น topic
+
+    Args:
+        data: ข้อความที่มี client_id, branch (ชื่อใน BRANCH_CONFIG), branch_prefix และ/หรือ all
+
+    Returns:
+        tuple: (รายการ topic, ชื่อสาขาที่ไม่รู้จัก)
+    """
+    topics = [ALL_TOPIC] if data.get("all") else []
+    topics += [client_topic(client_id) for client_id in as_list(data.get("client_id"))]
+    topics += [branch_topic(prefix) for prefix in as_list(data.get("branch_prefix"))]
+    unknown_branches = []
+    for branch in as_list(data.get("branch")):
+        prefix = get_branch_prefix(branch, default=None)
+        if prefix is None:
+            unknown_branches.append(branch)
+        else:
+            topics.append(branch_topic(prefix))
+    return topics, unknown_branches
+
+def set_role(websocket, role):
+    """
+    ย้าย socket ไปอยู่ในกลุ่มของบทบาทที่กำหนด (subscriber ใหม่ได้รับทุกเครื่องชั่ง)
+
+    Returns:
+        list: topic ที่เพิ่งสมัคร (ต้องส่ง snapshot ให้ socket นี้)
+    """
+    PUBLISHERS.discard(websocket)
+    SUBSCRIBERS.discard(websocket)
+    if role == PUBLISHER_ROLE:
+        PUBLISHERS.add(websocket)
+        unsubscribe(websocket)
+        return []
+    SUBSCRIBERS.add(websocket)
+    if websocket in SUBSCRIPTIONS:
+        return []
+    return subscribe(websocket, [ALL_TOPIC])
+
+def forget_client(websocket):
+    """ลบ socket ออกจากทุกกลุ่ม / topic / queue ขาออก (เรียกซ้ำได้ - ทั้งจาก register_client และ writer task)"""
+    PUBLISHERS.discard(websocket)
+    SUBSCRIBERS.discard(websocket)
+    unsubscribe(websocket)
+    OUTBOUND.pop(websocket, None)
+
+class SubscriberQueue:
+    """queue ขาออกของ socket หนึ่ง (จำกัดขนาด) ส่งโดย writer task ของตัวเอง - socket ที่ช้าไม่ทำให้ socket อื่นช้า"""
+
+    def __init__(self, websocket, maxsize=DEFAULT_SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.maxsize = max(1, maxsize)
+        self.items = deque()  # (topic, version, frame) - topic None = ข้อความอื่น, frame None = ส่ง snapshot
+        self.resync = set()  # topic ที่ delta ถูกทิ้ง - ส่ง snapshot ก่อน frame ถัดไป
+        self.synced = {}  # topic -> version ของ snapshot ที่ส่งล่าสุด
+        self.dropped = 0
+        self.falling_behind = False  # กำลังทิ้ง frame (log ตอนเริ่มและตอนตามทัน)
+        self.closing = False
+        self.close_task = None
+        self.ready = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    def put(self, frame, topic=None, version=0):
+        """ใส่ frame ลง queue (ไม่ block) - เต็มแล้วทิ้ง delta เก่าที่สุด (ข้อความควบคุมไม่ถูกทิ้ง)"""
+        if self.closing:
+            return
+        if len(self.items) >= self.maxsize and not self.drop_oldest_delta():
+            self.closing = True
+            print(f"Subscriber {self.websocket.remote_address} queue full of control replies - disconnecting")
+            self.close_task = asyncio.create_task(self.websocket.close(SLOW_SUBSCRIBER_CLOSE_CODE,
+                                                                       "subscriber too slow"))
+            return
+        self.items.append((topic, version, frame))
+        self.ready.set()
+
+    def drop_oldest_delta(self):
+        """ทิ้ง delta / คำขอ snapshot ที่เก่าที่สุด (topic นั้นจะได้ snapshot แทน) - False ถ้ามีแต่ข้อความควบคุม"""
+        for index, (topic, version, _) in enumerate(self.items):
+            if topic is not None:
+                del self.items[index]
+                self.resync.add(topic)
+                self.dropped += 1
+                if not self.falling_behind:
+                    self.falling_behind = True
+                    print(f"Subscriber {self.websocket.remote_address} is falling behind - dropping oldest "
+                          f"frames (first dropped: {topic} v{version})")
+                return True
+        return False
+
+    def request_snapshots(self, topics):
+        """ส่งข้อมูลเต็มของ topic (ที่เพิ่งสมัคร) ตามลำดับใน queue - หลังจากนี้ได้รับเฉพาะ delta"""
+        for topic in topics:
+            self.put(None, topic)
+
+    def next_frame(self):
+        """frame ถัดไปที่ต้องส่ง (snapshot ก่อน, ข้าม delta ที่เก่ากว่า snapshot) หรือ None ถ้าไม่มี"""
+        subscribed = SUBSCRIPTIONS.get(self.websocket, ())
+        while self.resync or self.items:
+            if self.resync:
+                topic, version, frame = self.resync.pop(), 0, None
+            else:
+                topic, version, frame = self.items.popleft()
+            if topic is None:
+                return frame
+            if topic not in subscribed:
+                continue
+            if frame is None:
+                state = TOPIC_STATES.get(topic)
+                if state is not None:
+                    self.synced[topic] = state.version
+                    return state.snapshot_frame()
+            elif version > self.synced.get(topic, version):
+                return frame
+        return None
+
+    async def run(self):
+        """writer task: ส่ง frame ตามลำดับ และตัดการเชื่อมต่อเมื่อส่งไม่ออกนานเกินไป"""
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                frame = self.next_frame()
+                while frame is not None:
+                    try:
+                        await asyncio.wait_for(self.websocket.send(frame), SLOW_SUBSCRIBER_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        print(f"Subscriber {self.websocket.remote_address} stuck for {SLOW_SUBSCRIBER_TIMEOUT}s "
+                              f"({self.dropped} frames dropped) - disconnecting")
+                        self.closing = True
+                        await self.websocket.close(SLOW_SUBSCRIBER_CLOSE_CODE, "subscriber too slow")
+                        return
+                    frame = self.next_frame()
+                if self.falling_behind:
+                    self.falling_behind = False
+                    print(f"Subscriber {self.websocket.remote_address} caught up "
+                          f"({self.dropped} frames dropped so far)")
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            print(f"Subscriber {self.websocket.remote_address} writer error: {e!r} - disconnecting")
+        finally:
+            # writer หยุดแล้ว (ไม่ว่าด้วยเหตุใด) - เลิก broadcast ให้ socket นี้และปิด socket ถ้ายังเปิดอยู่
+            # register_client จะจบ loop รับข้อความเมื่อ socket ปิด แล้ว cleanup ซ้ำได้อย่างปลอดภัย
+            self.closing = True
+            forget_client(self.websocket)
+            if not self.websocket.closed:
+                self.close_task = asyncio.create_task(self.websocket.close(WRITER_ERROR_CLOSE_CODE,
+                                                                           "subscriber writer error"))
+
+    def close(self):
+        self.task.cancel()
+
+def mark_dirty(client_id, topics):
+    """บันทึกว่าข้อมูลของ client_id ใน topic เปลี่ยน - ส่งในรอบถัดไปของ broadcast_scheduler"""
+    for topic in topics:
+        DIRTY_TOPICS[topic].add(client_id)
+    BROADCAST_PENDING.set()
+
+def encode_message(message):
+    """แปลงข้อความเป็น JSON (คืน str เพื่อให้ส่งเป็น text frame เหมือนเดิม)"""
+    if orjson is not None:
+        return orjson.dumps(message).decode('utf-8')
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+
+def describe_clients():
+    return f"Publishers: {len(PUBLISHERS)}, subscribers: {len(SUBSCRIBERS)}, topics: {len(TOPIC_SUBSCRIBERS)}"
 
 async def register_client(websocket, path):
-    """รับการเชื่อมต่อจาก client"""
-    CONNECTED_CLIENTS.add(websocket)
-    print(f"Client connected: {websocket.remote_address}. Total clients: {len(CONNECTED_CLIENTS)}")
+    """รับการเชื่อมต่อจาก client (บทบาทจาก path หรือข้อความ hello)"""
+    role = ROLE_PATHS.get(path.split('?')[0].rstrip('/'))
+    role_declared = role is not None
+    topics_chosen = False  # subscribe ครั้งแรกแทนที่ ALL_TOPIC ที่ได้ตอนเชื่อมต่อ
+    outbound = OUTBOUND[websocket] = SubscriberQueue(websocket)
+    outbound.request_snapshots(set_role(websocket, role or SUBSCRIBER_ROLE))
+    print(f"Client connected: {websocket.remote_address} ({role or 'undeclared'}). {describe_clients()}")
     
     try:
         async for message in websocket:
             try:
                 data = json.loads(message)
                 
+                if data.get("type") == HELLO_MESSAGE_TYPE:
+                    role = data.get("role")
+                    if role in (PUBLISHER_ROLE, SUBSCRIBER_ROLE):
+                        role_declared = True
+                        outbound.request_snapshots(set_role(websocket, role))
+                        print(f"Client {websocket.remote_address} is a {role} "
+                              f"({data.get('client_id', 'no client_id')}). {describe_clients()}")
+                    else:
+                        print(f"Unknown role in hello from {websocket.remote_address}: {role!r}")
+                    continue
+                
+                if data.get("type") in (SUBSCRIBE_MESSAGE_TYPE, UNSUBSCRIBE_MESSAGE_TYPE):
+                    if websocket in PUBLISHERS:
+                        print(f"Ignoring {data['type']} from publisher {websocket.remote_address}")
+                        continue
+                    role_declared = True
+                    topics, unknown_branches = parse_topics(data)
+                    if data["type"] == SUBSCRIBE_MESSAGE_TYPE:
+                        if not topics_chosen and not data.get("all"):
+                            unsubscribe(websocket, [ALL_TOPIC])
+                        topics_chosen = True
+                        added = subscribe(websocket, topics)
+                    else:
+                        unsubscribe(websocket, topics)
+                        added = []
+                    outbound.put(encode_message({
+                        "type": SUBSCRIBED_MESSAGE_TYPE,
+                        "topics": sorted(SUBSCRIPTIONS.get(websocket, ())),
+                        "unknown_branches": unknown_branches
+                    }))
+                    # ค่าปัจจุบันของ topic ที่เพิ่งสมัคร ไม่ต้องรอค่าน้ำหนักครั้งถัดไป
+                    outbound.request_snapshots(added)
+                    print(f"Client {websocket.remote_address} topics: {sorted(SUBSCRIPTIONS.get(websocket, ()))}"
+                          + (f" (unknown branches: {unknown_branches})" if unknown_branches else ""))
+                    continue
+                
+                # scale client รุ่นเก่าที่ไม่ส่ง hello - ไม่ต้องส่ง broadcast กลับไป
+                if not role_declared and "client_id" in data and websocket in SUBSCRIBERS:
+                    role_declared = True
+                    set_role(websocket, PUBLISHER_ROLE)
+                    print(f"Client {websocket.remote_address} treated as publisher. {describe_clients()}")
+                
+                # ตัวนับของ read path จาก scale client (ส่งในรอบถัดไปของ broadcast_scheduler)
+                if data.get("type") == "stats" and "client_id" in data:
+                    record_scale_stats(data)
+                
                 # ตรวจสอบว่าเป็นข้อมูลจาก scale client หรือไม่
-                if "client_id" in data and "weight" in data:
+                elif "client_id" in data and "weight" in data:
                     # ข้อมูลจาก scale client
                     client_id = data["client_id"]
-                    weight = data["weight"]
-                    timestamp = data.get("timestamp", time.time())
+                    # แปลงครั้งเดียวตอนรับ (client รุ่นเก่าส่งข้อความ เช่น "1230.0" / "N/A")
+                    reading = WeightReading.from_wire(data)
                     branch = data.get("branch", "Unknown")
-                    branch_prefix = data.get("branch_prefix", "Z1")
+                    branch_prefix = data.get("branch_prefix") or get_branch_prefix(branch)
+                    previous_topics = scale_topics(client_id)
                     
                     WEIGHT_DATA[client_id] = {
-                        "weight": weight,
-                        "timestamp": timestamp,
+                        **reading.to_wire(),
                         "last_update": time.time(),
                         "branch": branch,
                         "branch_prefix": branch_prefix
                     }
                     
-                    print(f"Received weight from {client_id} ({branch}): {weight} (Prefix: {branch_prefix})")
+                    print(f"Received weight from {client_id} ({branch}): {reading.to_text()} (Prefix: {branch_prefix})")
                     
-                    # Broadcast ข้อมูลไปยัง web clients
-                    await broadcast_weight_data()
+                    # ส่งไปยัง subscriber ของ topic ที่เกี่ยวข้องในรอบถัดไปของ broadcast_scheduler
+                    # (รวม topic ของสาขาเดิม ถ้าเครื่องชั่งย้ายสาขา)
+                    mark_dirty(client_id, previous_topics + scale_topics(client_id))
                     
                 else:
                     # ข้อมูลจาก web client (อาจเป็นคำสั่งหรือข้อมูลอื่นๆ)
@@ -52,33 +369,189 @@ async def register_client(websocket, path):
     except websockets.exceptions.ConnectionClosed:
         pass
     finally:
-        CONNECTED_CLIENTS.remove(websocket)
-        print(f"Client disconnected: {websocket.remote_address}. Total clients: {len(CONNECTED_CLIENTS)}")
-
-async def broadcast_weight_data():
-    """ส่งข้อมูลน้ำหนักไปยัง web clients"""
-    if CONNECTED_CLIENTS:
-        # สร้างข้อมูลที่จะส่งไปยัง web clients
-        # ใช้ข้อมูลน้ำหนักล่าสุดจาก scale แรกที่เชื่อมต่อ
-        latest_weight = 0
-        if WEIGHT_DATA:
-            # ใช้ข้อมูลจาก scale แรก (หรือ scale ที่อัปเดตล่าสุด)
-            first_scale_data = next(iter(WEIGHT_DATA.values()))
-            latest_weight = first_scale_data.get("weight", 0)
-        
-        weight_summary = {
-            "weight": latest_weight,  # เพิ่ม property 'weight' ที่ frontend คาดหวัง
-            "timestamp": time.time(),
-            "scales": dict(WEIGHT_DATA)
-        }
+        forget_client(websocket)
+        outbound.close()
+        dropped = f" ({outbound.dropped} frames dropped)" if outbound.dropped else ""
+        print(f"Client disconnected: {websocket.remote_address}{dropped}. {describe_clients()}")
+
+def record_scale_stats(data):
+    """เก็บ stats ล่าสุดของ client และเตือนเมื่อ frame ส่วนใหญ่ parse ไม่ได้ (ตั้งค่า serial หรือ Pattern ผิด)"""
+    client_id = data["client_id"]
+    stats = {key: value for key, value in data.items() if key not in ("type", "client_id")}
+    stats["last_update"] = time.time()
+    SCALE_STATS[client_id] = stats
+    mark_dirty(client_id, scale_topics(client_id))
+    
+    framed = stats.get("frames_framed", 0)
+    parsed = stats.get("frames_parsed", 0)
+    print(f"Stats from {client_id}: {stats.get('bytes_read', 0)} bytes, {parsed}/{framed} frames parsed, "
+          f"{stats.get('bytes_dropped', 0)} bytes dropped, max buffer {stats.get('max_buffer_depth', 0)}")
+    if framed >= 20 and parsed * 2 < framed:
+        print(f"WARNING: {client_id} cannot parse most frames (misses: {stats.get('parse_misses')}) "
+              f"- check serial settings and scale pattern")
+
+def topic_scales(topic):
+    """ข้อมูลน้ำหนักของเครื่องชั่งที่อยู่ใน topic"""
+    if topic == ALL_TOPIC:
+        return dict(WEIGHT_DATA)
+    kind, _, key = topic.partition(":")
+    if kind == "client":
+        return {key: WEIGHT_DATA[key]} if key in WEIGHT_DATA else {}
+    return {client_id: data for client_id, data in WEIGHT_DATA.items() if data.get("branch_prefix") == key}
+
+def topic_stats(topic, scales):
+    """stats ของเครื่องชั่งใน topic (ALL_TOPIC = ทุก client ที่ส่ง stats)"""
+    if topic == ALL_TOPIC:
+        return dict(SCALE_STATS)
+    return {client_id: SCALE_STATS[client_id] for client_id in scales if client_id in SCALE_STATS}
+
+class TopicState:
+    """
+    ข้อมูลล่าสุดที่ส่งให้ subscriber ของ topic หนึ่ง
+    version เพิ่มทุก delta - frame ของแต่ละ version encode ครั้งเดียวแล้วใช้กับทุก subscriber
+    """
+
+    def __init__(self, topic):
+        self.topic = topic
+        self.version = 0
+        self.timestamp = time.time()
+        self.scales = topic_scales(topic)  # client_id -> ข้อมูลที่ส่งไปแล้ว
+        self.stats = topic_stats(topic, self.scales)
+        self.headline = self.current_headline()
+        self._snapshot = None  # snapshot frame ของ version ปัจจุบัน
+
+    def contains(self, data):
+        """ข้อมูลน้ำหนักนี้อยู่ใน topic หรือไม่ (client topic ถูก mark_dirty เฉพาะ client_id ของตัวเอง)"""
+        kind, _, key = self.topic.partition(":")
+        return kind != "branch" or data.get("branch_prefix") == key
+
+    def current_headline(self):
+        """weight / stable ของเครื่องชั่งแรกใน topic (property ที่ frontend ใช้)"""
+        first_scale_data = next(iter(self.scales.values()), None)
+        if first_scale_data is None:
+            return 0, None
+        return first_scale_data.get("weight", 0), first_scale_data.get("stable")
+
+    def snapshot_frame(self):
+        """ข้อมูลเต็มของ topic สำหรับ subscriber ใหม่ (encode ครั้งเดียวต่อ version)"""
+        if self._snapshot is None:
+            weight, stable = self.headline
+            self._snapshot = encode_message({
+                "type": SNAPSHOT_MESSAGE_TYPE,
+                "topic": self.topic,
+                "version": self.version,
+                "weight": weight,  # property 'weight' ที่ frontend คาดหวัง
+                "stable": stable,  # True = นิ่ง (StabilityDetector ของ client), None = client รุ่นเก่า
+                "timestamp": self.timestamp,
+                "scales": self.scales,
+                "stats": self.stats
+            })
+        return self._snapshot
+
+    def apply(self, client_ids):
+        """
+        อัปเดตจาก WEIGHT_DATA / SCALE_STATS เฉพาะ client ที่เปลี่ยน (ไม่วนทุกเครื่องชั่ง)
+
+        Args:
+            client_ids: client_id ที่ถูก mark_dirty ใน topic นี้
+
+        Returns:
+            Optional[str]: delta frame ที่ encode แล้ว หรือ None ถ้าไม่มีอะไรเปลี่ยน
+        """
+        changed_scales = {}
+        removed = []
+        changed_stats = {}
+        for client_id in client_ids:
+            data = WEIGHT_DATA.get(client_id)
+            if data is not None and not self.contains(data):
+                data = None  # ย้ายไปสาขาอื่น
+            previous = self.scales.get(client_id)
+            if data is None:
+                if previous is not None:
+                    del self.scales[client_id]
+                    removed.append(client_id)
+            elif data is not previous:
+                fields = {key: value for key, value in data.items()
+                          if previous is None or previous.get(key) != value}
+                self.scales[client_id] = data
+                if fields:
+                    changed_scales[client_id] = fields
+            
+            stats = SCALE_STATS.get(client_id)
+            if self.topic != ALL_TOPIC and client_id not in self.scales:
+                stats = None
+            if stats is not self.stats.get(client_id):
+                if stats is None:
+                    del self.stats[client_id]
+                else:
+                    self.stats[client_id] = stats
+                changed_stats[client_id] = stats
         
-        message = json.dumps(weight_summary)
+        if not (changed_scales or removed or changed_stats):
+            return None
         
-        # ส่งข้อมูลให้ web clients ทุกคน
-        await asyncio.gather(
-            *[client.send(message) for client in CONNECTED_CLIENTS],
-            return_exceptions=True
-        )
+        self.version += 1
+        self.timestamp = time.time()
+        self._snapshot = None
+        delta = {
+            "type": DELTA_MESSAGE_TYPE,
+            "topic": self.topic,
+            "version": self.version,
+            "timestamp": self.timestamp
+        }
+        headline = self.current_headline()
+        if headline != self.headline:
+            self.headline = headline
+            delta["weight"], delta["stable"] = headline
+        if changed_scales:
+            delta["scales"] = changed_scales
+        if removed:
+            delta["removed"] = removed
+        if changed_stats:
+            delta["stats"] = changed_stats
+        return encode_message(delta)
+
+def broadcast_weight_data(dirty_topics):
+    """
+    ส่ง delta ไปยัง subscriber ของแต่ละ topic เท่านั้น - publisher ไม่ได้รับ broadcast
+    ใส่ลง queue ของแต่ละ socket (SubscriberQueue) ไม่รอการส่ง
+    socket ที่สมัครหลาย topic ที่ทับกันได้รับหนึ่งข้อความต่อ topic (แยกด้วย key "topic")
+
+    Args:
+        dirty_topics: topic -> client_id ที่ข้อมูลเปลี่ยน (ดู mark_dirty)
+    """
+    for topic, client_ids in dirty_topics.items():
+        state = TOPIC_STATES.get(topic)
+        subscribers = TOPIC_SUBSCRIBERS.get(topic)
+        if state is None or not subscribers:
+            continue
+        message = state.apply(client_ids)
+        if message is None:
+            continue
+        for client in subscribers:
+            outbound = OUTBOUND.get(client)
+            if outbound is not None:
+                outbound.put(message, topic, state.version)
+
+async def broadcast_scheduler(broadcast_rate=DEFAULT_BROADCAST_RATE):
+    """
+    ส่ง topic ที่เปลี่ยนไม่เกิน broadcast_rate รอบต่อวินาที
+    แต่ละรอบ serialize หนึ่งครั้งต่อ topic ไม่ว่าจะรับค่าน้ำหนักมากี่ข้อความ
+
+    Args:
+        broadcast_rate: จำนวนรอบต่อวินาที
+    """
+    interval = 1.0 / broadcast_rate
+    while True:
+        await BROADCAST_PENDING.wait()
+        BROADCAST_PENDING.clear()
+        dirty_topics = dict(DIRTY_TOPICS)
+        DIRTY_TOPICS.clear()
+        try:
+            broadcast_weight_data(dirty_topics)
+        except Exception as e:
+            print(f"Broadcast error: {e}")
+        await asyncio.sleep(interval)
 
 async def cleanup_old_data():
     """ลบข้อมูลเก่าที่ไม่ได้อัปเดตแล้ว"""
@@ -91,26 +564,46 @@ async def cleanup_old_data():
             to_remove.append(client_id)
     
     for client_id in to_remove:
+        topics = scale_topics(client_id)
         del WEIGHT_DATA[client_id]
+        mark_dirty(client_id, topics)
         print(f"Removed stale data from {client_id}")
+    
+    for client_id in [client_id for client_id, stats in SCALE_STATS.items()
+                      if current_time - stats["last_update"] > STATS_TIMEOUT]:
+        del SCALE_STATS[client_id]
+        mark_dirty(client_id, scale_topics(client_id))
 
-async def main():
+async def main(broadcast_rate=DEFAULT_BROADCAST_RATE):
     """ฟังก์ชันหลัก"""
     print("Starting WebSocket Server for RS232 Scale System")
-    print("Server will accept connections from scale clients and web clients")
+    print("Server will accept connections from scale clients (/publish) and web clients (/subscribe)")
+    print(f"Broadcasting changed topics at up to {broadcast_rate:g} Hz")
+    scheduler_task = asyncio.create_task(broadcast_scheduler(broadcast_rate))
     
-    # เริ่ม WebSocket server
-    async with websockets.serve(register_client, "0.0.0.0", 8765):
-        print("WebSocket Server started at ws://0.0.0.0:8765")
-        print("Waiting for scale clients and web clients to connect...")
-        
-        # Loop หลักสำหรับการทำงาน
-        while True:
-            await cleanup_old_data()
-            await asyncio.sleep(10)  # ตรวจสอบทุก 10 วินาที
+    try:
+        # เริ่ม WebSocket server
+        async with websockets.serve(register_client, "0.0.0.0", 8765):
+            print("WebSocket Server started at ws://0.0.0.0:8765")
+            print("Waiting for scale clients and web clients to connect...")
+            
+            # Loop หลักสำหรับการทำงาน
+            while True:
+                await cleanup_old_data()
+                await asyncio.sleep(10)  # ตรวจสอบทุก 10 วินาที
+    finally:
+        scheduler_task.cancel()
 
 if __name__ == '__main__':
     try:
-        asyncio.run(main())
+        broadcast_rate = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BROADCAST_RATE
+        if broadcast_rate <= 0:
+            raise ValueError
+    except ValueError:
+        print(f"Usage: python agent.py [broadcast_rate > 0] (default {DEFAULT_BROADCAST_RATE:g})")
+        sys.exit(1)
+    
+    try:
+        asyncio.run(main(broadcast_rate))
     except KeyboardInterrupt:
         print("Server stopped.")
\ No newline at end of file
@@ -0,0 +1,566 @@
+"""
+Batch Decoder - แปลงไฟล์ capture (.rs232cap) ทั้งไฟล์เป็นคอลัมน์ (timestamp, value, stable) ด้วย NumPy
+สำหรับตรวจสอบย้อนหลังข้อมูลหลายชั่วโมง แทนการ replay ผ่าน framer + parser ทีละ frame
+- เปิดไฟล์ด้วย mmap แล้วตัด record header ออกด้วย mask ครั้งเดียว ได้ bytes ดิบเป็น array uint8
+- หาขอบ frame (line / stx_etx / fixed) จากตำแหน่งตัวคั่นใน array โดยตรง
+- Pattern แบบตายตัว (Default, CAS Scale, Mettler Toledo, Sartorius - PREFIX_LAYOUTS และ ST,GS Format)
+  หา prefix และแปลงตัวเลขทั้งชุด frame พร้อมกัน (เลื่อนทีละคอลัมน์ของตาราง frame x byte)
+- Pattern อื่น (Custom Pattern) และ frame ที่ยาวหรือมีตัวเลขมากผิดปกติ ใช้ parse_frame ทีละ frame
+  ผลลัพธ์จึงเหมือน ScaleDecoder ทุกค่า (ตรวจด้วย --verify)
+
+คอลัมน์ผลลัพธ์ (หนึ่งแถวต่อ frame ที่ parse ได้):
+    timestamp  wall time (วินาที) = เวลาเริ่มบันทึก + เวลาของ chunk ที่ทำให้ frame ครบ
+    value      น้ำหนัก (kg)
+    stable     1 = นิ่ง, 0 = ไม่นิ่ง, -1 = เครื่องชั่งไม่ได้บอก
+               (--stability = ตัดสินด้วย StabilityDetector แบบเดียวกับ client ได้ 0 / 1)
+
+ต้องติดตั้ง numpy (ไม่จำเป็นสำหรับ client และ agent):
+    pip install numpy
+
+ใช้งาน:
+    python batch_decoder.py FILE [--pattern NAME] [--config client_config.ini] [--stability]
+                                 [--out weights.csv|weights.npz] [--verify]
+"""
+
+import argparse
+import configparser
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from format_detector import AUTO_PATTERN, FormatDetector
+from scale_parsers import PARSERS, PREFIX_LAYOUTS, parse_frame, parse_st_gs
+from scale_patterns import DEFAULT_PATTERN, DEFAULT_SENSITIVITY, RAW_PATTERN, SCALE_PATTERNS
+from scale_protocol import ScaleDecoder
+from serial_capture import (CAPTURE_MAGIC, CAPTURE_VERSION, HEADER, RECORD, load_replay_framing,
+                            read_capture)
+from serial_framer import make_framer
+from stability_detector import default_stability_config, load_stability_config, make_stability_detector
+from weight_reading import DECIGRAMS_PER_KG, WeightReading
+
+# จำนวน frame ต่อรอบของการแปลง (ตาราง frame x byte ไม่ใหญ่เกินไป)
+BATCH_FRAMES = 1 << 16
+# frame ที่ยาวกว่านี้ใช้ parse_frame ทีละ frame
+MAX_VECTOR_WIDTH = 64
+# ตัวเลขยาวกว่านี้ใช้ parse_frame (ค่า decigram ยังอยู่ใน int64 และตรงกับ float ของ parser)
+MAX_VECTOR_DIGITS = 9
+
+STABLE_UNKNOWN = -1
+
+_WHITESPACE = b' \t\r\n\x0b\x0c'
+_RECORD_LENGTH = struct.Struct('<I')
+_RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('length', '<u4')]) if np is not None else None
+_ST_GS_MARK = b',GS,'
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("batch_decoder requires numpy (pip install numpy)")
+
+
+class CaptureBytes:
+    """bytes ดิบทั้งไฟล์ capture (ไม่รวม header) พร้อมเวลาของแต่ละ chunk"""
+
+    def __init__(self, data, chunk_ends, chunk_times, started: float):
+        """
+        Args:
+            data: bytes ดิบทุก chunk ต่อกัน (uint8)
+            chunk_ends: ตำแหน่งสิ้นสุด (exclusive) ของแต่ละ chunk ใน data
+            chunk_times: monotonic timestamp ของแต่ละ chunk
+            started: wall time ตอนเริ่มบันทึก
+        """
+        self.data = data
+        self.chunk_ends = chunk_ends
+        self.chunk_times = chunk_times
+        self.started = started
+
+    def frame_times(self, last_bytes):
+        """monotonic timestamp ของ frame = เวลาของ chunk ที่มี byte สุดท้ายของ frame"""
+        return self.chunk_times[np.searchsorted(self.chunk_ends, last_bytes, side='right')]
+
+    def wall_times(self, monotonic):
+        """แปลง monotonic เป็น wall time โดยนับจาก chunk แรก = เวลาเริ่มบันทึก"""
+        first = self.chunk_times[0] if len(self.chunk_times) else 0.0
+        return self.started + (monotonic - first)
+
+
+def load_capture_bytes(path: str) -> CaptureBytes:
+    """
+    อ่านไฟล์ capture ด้วย mmap
+
+    Args:
+        path: path ของไฟล์ .rs232cap
+
+    Returns:
+        CaptureBytes: bytes ดิบ + ขอบเขตและเวลาของแต่ละ chunk
+    """
+    require_numpy()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"{path}: not a capture file (header too short)")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, started = HEADER.unpack_from(mm, 0)
+            if magic != CAPTURE_MAGIC:
+                raise ValueError(f"{path}: not a capture file")
+            if version != CAPTURE_VERSION:
+                raise ValueError(f"{path}: unsupported capture version {version}")
+
+            # เดินตาม record header (หนึ่งครั้งต่อ chunk ไม่ใช่ต่อ byte) - เก็บแค่ตำแหน่ง
+            offsets = []
+            pos = HEADER.size
+            unpack_length = _RECORD_LENGTH.unpack_from
+            length_offset = RECORD.size - _RECORD_LENGTH.size
+            while pos + RECORD.size <= size:
+                end = pos + RECORD.size + unpack_length(mm, pos + length_offset)[0]
+                if end > size:
+                    # record สุดท้ายไม่ครบ (โปรแกรมถูกปิดระหว่างบันทึก)
+                    break
+                offsets.append(pos)
+                pos = end
+
+            raw = np.frombuffer(mm, dtype=np.uint8, count=pos)
+            headers = np.asarray(offsets, dtype=np.int64)[:, None] + np.arange(RECORD.size)
+            records = raw[headers.ravel()].view(_RECORD_DTYPE)
+            keep = np.ones(pos, dtype=bool)
+            keep[:HEADER.size] = False
+            keep[headers.ravel()] = False
+            data = raw[keep]
+            del raw
+
+    return CaptureBytes(data, np.cumsum(records['length'], dtype=np.int64),
+                        records['timestamp'].astype(np.float64), started)
+
+
+def find_frames(data, framing: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+    """
+    หาขอบ frame ทั้งหมดใน data แบบเดียวกับ make_framer(framing)
+    (max_buffer ไม่มีผล - ข้อมูลทั้งไฟล์อยู่ในหน่วยความจำแล้ว)
+
+    Returns:
+        Tuple: (starts, ends, last_bytes) - payload คือ data[start:end],
+        last_byte คือ byte ที่ทำให้ frame ครบ (ตัวคั่น / ETX / byte สุดท้ายของ frame)
+    """
+    mode = framing['mode']
+    if mode == 'line':
+        delimiters = np.frombuffer(framing['delimiters'], dtype=np.uint8)
+        ends = np.flatnonzero(np.isin(data, delimiters))
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        # ตัวคั่นติดกัน (เช่น CR LF) = frame ว่าง ไม่นับเป็น frame
+        keep = ends > starts
+        return starts[keep], ends[keep], ends[keep]
+
+    if mode == 'stx_etx':
+        stx, etx = framing['stx'], framing['etx']
+        if len(stx) != 1 or len(etx) != 1:
+            raise ValueError("batch decoding supports single-byte STX/ETX only")
+        stx_pos = np.flatnonzero(data == stx[0])
+        ends = np.flatnonzero(data == etx[0])
+        # frame ที่จบที่ ETX นี้เริ่มที่ STX แรกหลัง ETX ก่อนหน้า (ไม่มี = bytes ขยะ)
+        previous = np.concatenate(([-1], ends[:-1]))
+        index = np.searchsorted(stx_pos, previous, side='right')
+        starts = stx_pos[np.minimum(index, len(stx_pos) - 1)] if len(stx_pos) else ends
+        valid = (index < len(stx_pos)) & (starts < ends)
+        return starts[valid] + 1, ends[valid], ends[valid]
+
+    if mode == 'fixed':
+        length = framing['frame_length']
+        sync = framing.get('sync', b'')
+        if length <= len(sync):
+            raise ValueError(f"frame_length must be greater than sync length ({len(sync)}), got {length}")
+        if not sync:
+            starts = np.arange(0, len(data) - length + 1, length, dtype=np.int64)
+        else:
+            starts = _fixed_frame_starts(data, sync, length)
+        return starts + len(sync), starts + length, starts + length - 1
+
+    raise ValueError(f"Unknown framing mode: {mode} (expected one of line, stx_etx, fixed)")
+
+
+def _fixed_frame_starts(data, sync: bytes, length: int):
+    """ตำแหน่ง sync ที่เป็นจุดเริ่ม frame (sync ถัดไปหลังจบ frame ก่อนหน้า เหมือน FixedLengthFramer)"""
+    count = len(data) - len(sync) + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    match = data[:count] == sync[0]
+    for offset, byte in enumerate(sync[1:], 1):
+        match &= data[offset:offset + count] == byte
+    candidates = np.flatnonzero(match)
+    candidates = candidates[candidates + length <= len(data)]
+    if len(candidates) < 2 or np.all(np.diff(candidates) >= length):
+        return candidates
+    # sync byte ปรากฏใน payload - เลือกทีละ frame
+    starts = []
+    pos = 0
+    while True:
+        index = np.searchsorted(candidates, pos)
+        if index >= len(candidates):
+            break
+        start = int(candidates[index])
+        starts.append(start)
+        pos = start + length
+    return np.asarray(starts, dtype=np.int64)
+
+
+class _FrameTable:
+    """ตาราง frame x byte ของหนึ่งรอบ พร้อมข้อมูลที่ใช้ร่วมกันทุก Pattern"""
+
+    def __init__(self, data, starts, ends):
+        width = int((ends - starts).max()) if len(starts) else 0
+        # คอลัมน์ท้ายเป็น 0 เสมอ (ไม่ใช่ตัวเลขหรือช่องว่าง) ใช้เป็นจุดสิ้นสุดของการค้นหา
+        self.width = width + 2
+        columns = np.arange(self.width)
+        index = starts[:, None] + columns
+        inside = index < ends[:, None]
+        table = data[np.minimum(index, len(data) - 1)] if len(data) else np.zeros(index.shape, np.uint8)
+        table[~inside] = 0
+        self.table = table
+        self.rows = np.arange(len(starts))
+        self.columns = columns
+
+        self.is_digit = (table >= 0x30) & (table <= 0x39)
+        self.is_space = np.isin(table, np.frombuffer(_WHITESPACE, dtype=np.uint8))
+        self.space_end = self._next_false(self.is_space)
+        self.digit_end = self._next_false(self.is_digit)
+
+        # ค่าของตัวเลขที่ต่อเนื่องกันจนถึงแต่ละคอลัมน์ (Horner, เริ่มใหม่เมื่อไม่ใช่ตัวเลข)
+        values = np.zeros(table.shape, dtype=np.int64)
+        digits = table.astype(np.int64) - 0x30
+        running = np.zeros(len(starts), dtype=np.int64)
+        for column in range(self.width):
+            running = np.where(self.is_digit[:, column], running * 10 + digits[:, column], 0)
+            values[:, column] = running
+        self.values = values
+
+    def _next_false(self, mask):
+        """คอลัมน์แรกที่ไม่เป็น mask ตั้งแต่แต่ละคอลัมน์ไปทางขวา"""
+        positions = np.where(mask, self.width, self.columns)
+        return np.minimum.accumulate(positions[:, ::-1], axis=1)[:, ::-1]
+
+    def matches(self, marker: bytes):
+        """ตาราง bool: marker เริ่มที่คอลัมน์นั้น (คอลัมน์ที่เหลือไม่พอ = False)"""
+        span = self.width - len(marker)
+        found = np.ones((len(self.rows), span), dtype=bool)
+        for offset, byte in enumerate(marker):
+            found &= self.table[:, offset:offset + span] == byte
+        return found
+
+    def at(self, rows, columns):
+        return self.table[rows, np.minimum(columns, self.width - 1)]
+
+
+def _decode_prefix_layout(frames: _FrameTable, indicators):
+    """parse_frame ของ make_prefix_parser ทั้งตาราง - คืน (found, decigrams, stable, fallback)"""
+    count = len(frames.rows)
+    found = np.zeros(count, dtype=bool)
+    decigrams = np.zeros(count, dtype=np.int64)
+    stable = np.full(count, STABLE_UNKNOWN, dtype=np.int8)
+    fallback = np.zeros(count, dtype=bool)
+
+    # ค่าน้ำหนักก่อน ค่าศูนย์ทีหลัง (เหมือน make_prefix_parser)
+    ordered = [item for item in indicators if not item[1]] + [item for item in indicators if item[1]]
+    for prefix, is_zero, flag in ordered:
+        size = len(prefix)
+        prefix_at = frames.matches(prefix)
+        rows = frames.rows[prefix_at.any(axis=1) & ~found]
+        if not len(rows):
+            continue
+        prefix_at = prefix_at[rows]
+        span = prefix_at.shape[1]
+        # prefix + ช่องว่างอย่างน้อยหนึ่งตัว + ตัวเลข (ตำแหน่งแรกที่ครบ เหมือน _prefix_digits)
+        digits_at = frames.space_end[rows, size:size + span]
+        valid = prefix_at & (digits_at > frames.columns[:span] + size)
+        valid &= np.take_along_axis(frames.is_digit[rows], digits_at, axis=1)
+        hit = valid.any(axis=1)
+        rows = rows[hit]
+        start = digits_at[hit, valid[hit].argmax(axis=1)]
+        end = frames.digit_end[rows, start]
+        if is_zero:
+            zero = end - start >= 3
+            for offset in range(3):
+                zero &= frames.at(rows, start + offset) == 0x30
+            rows = rows[zero]
+        else:
+            decigrams[rows] = frames.values[rows, end - 1] * DECIGRAMS_PER_KG
+            fallback[rows] = end - start > MAX_VECTOR_DIGITS
+        found[rows] = True
+        stable[rows] = STABLE_UNKNOWN if flag is None else int(flag)
+    return found, decigrams, stable, fallback
+
+
+def _decode_st_gs(frames: _FrameTable):
+    """parse_st_gs ทั้งตาราง: ST,GS,+00123.4kg / US,GS,-00012.5kg"""
+    count = len(frames.rows)
+    decigrams = np.zeros(count, dtype=np.int64)
+    stable = np.full(count, STABLE_UNKNOWN, dtype=np.int8)
+    fallback = np.zeros(count, dtype=bool)
+
+    mark = frames.matches(_ST_GS_MARK)
+    span = mark.shape[1]
+    columns = np.broadcast_to(frames.columns[:span], mark.shape)
+
+    def byte_at(offset):
+        index = np.clip(columns + offset, 0, frames.width - 1)
+        return np.take_along_axis(frames.table, index, axis=1)
+
+    status_1, status_2 = byte_at(-2), byte_at(-1)
+    is_st = (status_1 == ord('S')) & (status_2 == ord('T'))
+    is_us = (status_1 == ord('U')) & (status_2 == ord('S'))
+    sign = byte_at(4)
+    int_start = np.minimum(columns + 5, frames.width - 1)
+    int_end = np.take_along_axis(frames.digit_end, int_start, axis=1)
+    has_dot = np.take_along_axis(frames.table, int_end, axis=1) == ord('.')
+    frac_end = np.where(has_dot, np.take_along_axis(frames.digit_end,
+                                                    np.minimum(int_end + 1, frames.width - 1), axis=1), int_end)
+    unit_1 = np.take_along_axis(frames.table, frac_end, axis=1)
+    unit_2 = np.take_along_axis(frames.table, np.minimum(frac_end + 1, frames.width - 1), axis=1)
+
+    valid = mark & (columns >= 2) & (is_st | is_us)
+    valid &= (sign == ord('+')) | (sign == ord('-'))
+    valid &= int_end > int_start
+    valid &= (unit_1 == ord('k')) & (unit_2 == ord('g'))
+
+    found = valid.any(axis=1)
+    rows = frames.rows[found]
+    first = valid[found].argmax(axis=1)
+    whole = frames.values[rows, int_end[rows, first] - 1]
+    frac_digits = np.where(has_dot[rows, first], frac_end[rows, first] - int_end[rows, first] - 1, 0)
+    fraction = np.where(frac_digits > 0, frames.values[rows, frac_end[rows, first] - 1], 0)
+    # ทศนิยมเกิน 4 หลัก (ละเอียดกว่า decigram) ใช้ parse_frame ปัดเศษแบบเดียวกัน
+    scale = 10 ** np.clip(4 - frac_digits, 0, 4)
+    value = whole * DECIGRAMS_PER_KG + fraction * scale
+    decigrams[rows] = np.where(sign[rows, first] == ord('-'), -value, value)
+    stable[rows] = is_st[rows, first]
+    fallback[rows] = ((int_end[rows, first] - int_start[rows, first] > MAX_VECTOR_DIGITS)
+                      | (frac_digits > 4))
+    return found, decigrams, stable, fallback
+
+
+def apply_sensitivity(decigrams, sensitivity: float):
+    """apply_weight_rules ทั้ง array (ค่าติดลบ -> ค่าสัมบูรณ์ / 0, ค่าที่น้อยกว่า sensitivity -> 0)"""
+    result = np.where(decigrams < 0, np.where(decigrams > -1000, 0, -decigrams), decigrams)
+    return np.where(result / DECIGRAMS_PER_KG < sensitivity, 0, result)
+
+
+def vector_layout(pattern_name: str) -> Optional[str]:
+    """ชนิดของ Pattern ที่แปลงแบบ vector ได้ ('prefix', 'st_gs') หรือ None (ใช้ parse_frame)"""
+    if pattern_name in PREFIX_LAYOUTS:
+        return 'prefix'
+    if PARSERS.get(pattern_name) is parse_st_gs:
+        return 'st_gs'
+    return None
+
+
+class DecodedCapture:
+    """ผลการแปลงไฟล์ capture แบบคอลัมน์ (หนึ่งแถวต่อ frame ที่ parse ได้)"""
+
+    def __init__(self, timestamp, monotonic, value, stable, pattern_name: str, frames: int):
+        self.timestamp = timestamp
+        self.monotonic = monotonic
+        self.value = value
+        self.stable = stable
+        self.pattern_name = pattern_name
+        self.frames = frames
+
+    def __len__(self):
+        return len(self.value)
+
+    def columns(self) -> Dict[str, Any]:
+        return {'timestamp': self.timestamp, 'value': self.value, 'stable': self.stable}
+
+    def save(self, path: str):
+        """บันทึกเป็น .npz (numpy) หรือ CSV (นามสกุลอื่น)"""
+        if path.endswith('.npz'):
+            np.savez_compressed(path, **self.columns())
+            return
+        table = np.column_stack((self.timestamp, self.value, self.stable))
+        np.savetxt(path, table, fmt=('%.6f', '%.4f', '%d'), delimiter=',',
+                   header='timestamp,value,stable', comments='')
+
+
+def decode_capture(path: str, framing: Dict[str, Any], pattern_name: str = DEFAULT_PATTERN,
+                   sensitivity: float = DEFAULT_SENSITIVITY) -> DecodedCapture:
+    """
+    แปลงไฟล์ capture ทั้งไฟล์
+
+    Args:
+        path: path ของไฟล์ .rs232cap
+        framing: [Framing] แบบเดียวกับ make_framer()
+        pattern_name: ชื่อ Pattern หรือ AUTO_PATTERN (ตรวจจาก frame ช่วงแรกของไฟล์)
+        sensitivity: น้ำหนักที่น้อยกว่าค่านี้ถือเป็น 0 (kg)
+
+    Returns:
+        DecodedCapture: คอลัมน์ timestamp, value, stable
+    """
+    capture = load_capture_bytes(path)
+    data = capture.data
+    starts, ends, last_bytes = find_frames(data, framing)
+    monotonic = capture.frame_times(last_bytes)
+
+    if pattern_name == AUTO_PATTERN:
+        pattern_name = detect_capture_pattern(data, starts, ends, monotonic)
+    if pattern_name == RAW_PATTERN:
+        raise ValueError("Raw Data has no weight values to decode")
+    if pattern_name not in SCALE_PATTERNS:
+        pattern_name = DEFAULT_PATTERN
+    layout = vector_layout(pattern_name)
+
+    found = np.zeros(len(starts), dtype=bool)
+    decigrams = np.zeros(len(starts), dtype=np.int64)
+    stable = np.full(len(starts), STABLE_UNKNOWN, dtype=np.int8)
+    fallback = np.full(len(starts), layout is None)
+    if layout is not None:
+        fallback |= ends - starts > MAX_VECTOR_WIDTH
+        for batch in range(0, len(starts), BATCH_FRAMES):
+            rows = np.arange(batch, min(batch + BATCH_FRAMES, len(starts)))
+            rows = rows[~fallback[rows]]
+            if not len(rows):
+                continue
+            frames = _FrameTable(data, starts[rows], ends[rows])
+            if layout == 'prefix':
+                result = _decode_prefix_layout(frames, PREFIX_LAYOUTS[pattern_name])
+            else:
+                result = _decode_st_gs(frames)
+            found[rows], decigrams[rows], stable[rows], fallback[rows] = result
+        decigrams = apply_sensitivity(decigrams, sensitivity)
+
+    value = decigrams / DECIGRAMS_PER_KG
+    for row in np.flatnonzero(fallback):
+        reading = parse_frame(data[starts[row]:ends[row]].tobytes(), pattern_name, sensitivity)
+        found[row] = reading is not None
+        if reading is not None:
+            # ค่าจาก parse_frame อาจเกิน int64 (ตัวเลขยาวผิดปกติ) - เก็บเป็น kg โดยตรง
+            value[row] = reading.decigrams / DECIGRAMS_PER_KG
+            stable[row] = STABLE_UNKNOWN if reading.stable is None else int(reading.stable)
+
+    return DecodedCapture(capture.wall_times(monotonic[found]), monotonic[found],
+                          value[found], stable[found], pattern_name, len(starts))
+
+
+def detect_capture_pattern(data, starts, ends, monotonic) -> str:
+    """เลือก Pattern จาก frame ช่วงแรกของไฟล์ด้วย FormatDetector (เหมือน Auto Detect ของ client)"""
+    detector = FormatDetector()
+    for row in range(len(starts)):
+        detector.feed(data[starts[row]:ends[row]].tobytes(), float(monotonic[row]))
+        if detector.done:
+            break
+    pattern_name = detector.result if detector.done else detector.decide()
+    if pattern_name is None:
+        raise ValueError(f"Auto detect: {detector.summary()}")
+    print(f"Auto detect: {pattern_name} ({detector.summary()})")
+    return pattern_name
+
+
+def apply_stability(decoded: DecodedCapture, settings: Optional[Dict[str, Any]] = None,
+                    sensitivity: float = DEFAULT_SENSITIVITY):
+    """ตั้งคอลัมน์ stable ด้วย StabilityDetector ตามเวลาของแต่ละค่า (ผลเดียวกับ client ตอนอ่านจริง)"""
+    detector = make_stability_detector(settings or default_stability_config(), sensitivity)
+    decigrams = np.rint(decoded.value * DECIGRAMS_PER_KG).astype(np.int64).tolist()
+    indicators = decoded.stable.tolist()
+    result = np.zeros(len(decoded), dtype=np.int8)
+    for row, (value, monotonic) in enumerate(zip(decigrams, decoded.monotonic.tolist())):
+        reading = WeightReading(value, stable=None if indicators[row] == STABLE_UNKNOWN else bool(indicators[row]),
+                                monotonic=monotonic, wall=0.0)
+        detector.feed(reading)
+        result[row] = reading.stable
+    decoded.stable = result
+
+
+def decode_capture_scalar(path: str, framing: Dict[str, Any], pattern_name: str,
+                          sensitivity: float = DEFAULT_SENSITIVITY) -> DecodedCapture:
+    """แปลงแบบเดิม (replay ผ่าน ScaleDecoder ทีละ chunk) สำหรับตรวจผลและเทียบความเร็ว"""
+    decoder = ScaleDecoder(make_framer(framing), pattern_name, sensitivity)
+    times, values, stable = [], [], []
+    frames = 0
+    for timestamp, data in read_capture(path):
+        for _, reading in decoder.decode(data):
+            frames += 1
+            if reading is not None and reading.ok:
+                times.append(timestamp)
+                values.append(reading.decigrams / DECIGRAMS_PER_KG)
+                stable.append(STABLE_UNKNOWN if reading.stable is None else int(reading.stable))
+    monotonic = np.asarray(times, dtype=np.float64)
+    capture = load_capture_bytes(path)
+    return DecodedCapture(capture.wall_times(monotonic), monotonic, np.asarray(values, dtype=np.float64),
+                          np.asarray(stable, dtype=np.int8), pattern_name, frames)
+
+
+def verify(path: str, framing: Dict[str, Any], decoded: DecodedCapture, sensitivity: float,
+           vector_seconds: float) -> bool:
+    """เทียบผลกับ ScaleDecoder ทุกแถว และพิมพ์ความเร็วของทั้งสองแบบ"""
+    started = time.perf_counter()
+    expected = decode_capture_scalar(path, framing, decoded.pattern_name, sensitivity)
+    scalar_seconds = time.perf_counter() - started
+    same = (len(expected) == len(decoded)
+            and np.array_equal(expected.monotonic, decoded.monotonic)
+            and np.array_equal(expected.value, decoded.value)
+            and np.array_equal(expected.stable, decoded.stable))
+    print(f"Verify:   {'match' if same else 'MISMATCH'} ({len(expected)} readings from ScaleDecoder)")
+    print(f"Speed:    batch {decoded.frames / max(vector_seconds, 1e-9):,.0f} frames/s, "
+          f"ScaleDecoder {expected.frames / max(scalar_seconds, 1e-9):,.0f} frames/s "
+          f"({scalar_seconds / max(vector_seconds, 1e-9):.1f}x)")
+    return same
+
+
+def load_batch_config(config_path: Optional[str]) -> Tuple[Dict[str, Any], str, float, Dict[str, Any]]:
+    """[Framing], [ScaleConfig] Pattern, sensitivity และ [Stability] จาก config ของ client"""
+    framing = load_replay_framing(config_path)
+    pattern_name = DEFAULT_PATTERN
+    sensitivity = DEFAULT_SENSITIVITY
+    config = configparser.ConfigParser()
+    if config_path and os.path.exists(config_path):
+        config.read(config_path, encoding='utf-8')
+        if 'ScaleConfig' in config:
+            pattern_name = config['ScaleConfig'].get('Pattern', DEFAULT_PATTERN)
+        if 'SerialConfig' in config:
+            sensitivity = config['SerialConfig'].getfloat('Sensitivity', DEFAULT_SENSITIVITY)
+    return framing, pattern_name, sensitivity, load_stability_config(config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode a whole serial capture into columns with NumPy")
+    parser.add_argument('file')
+    parser.add_argument('--config', default='client_config.ini',
+                        help="client config with [Framing], [ScaleConfig] and [SerialConfig] sections")
+    parser.add_argument('--pattern', help="scale pattern name (default: [ScaleConfig] Pattern)")
+    parser.add_argument('--stability', action='store_true',
+                        help="fill the stable column with StabilityDetector instead of the scale's indicator")
+    parser.add_argument('--out', help="write columns to .csv or .npz")
+    parser.add_argument('--verify', action='store_true', help="compare every reading with ScaleDecoder")
+    args = parser.parse_args()
+
+    try:
+        require_numpy()
+        framing, pattern_name, sensitivity, stability_config = load_batch_config(args.config)
+        started = time.perf_counter()
+        decoded = decode_capture(args.file, framing, args.pattern or pattern_name, sensitivity)
+        seconds = time.perf_counter() - started
+
+        print(f"File:     {args.file}")
+        print(f"Pattern:  {decoded.pattern_name} ({framing['mode']} framing)")
+        print(f"Frames:   {decoded.frames} ({len(decoded)} readings) in {seconds:.3f}s")
+        if len(decoded):
+            print(f"Weight:   {decoded.value.min():g} - {decoded.value.max():g} kg")
+        ok = verify(args.file, framing, decoded, sensitivity, seconds) if args.verify else True
+        if args.stability:
+            apply_stability(decoded, stability_config, sensitivity)
+            print(f"Stable:   {int(decoded.stable.sum())}/{len(decoded)} readings")
+        if args.out:
+            decoded.save(args.out)
+            print(f"Saved:    {args.out}")
+        return 0 if ok else 1
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
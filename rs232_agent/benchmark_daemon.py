@@ -0,0 +1,150 @@
+"""
+Benchmark ของ scale_daemon.py - วัด CPU และ RSS เมื่อเพิ่มจำนวน port
+- สร้างเครื่องชั่งจำลองด้วย pseudo-terminal (pty) ต่อ port (Linux เท่านั้น)
+- รัน scale_daemon.py เป็น process แยก และมี websocket server จำลองนับข้อความที่ได้รับ
+- วัด CPU (utime+stime) และ RSS จาก /proc/<pid> ของ daemon
+
+ใช้งาน:
+    python benchmark_daemon.py [จำนวน port ...]    เช่น  python benchmark_daemon.py 1 2 4 8
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tty
+
+import websockets
+
+FRAME_RATE_HZ = 20       # จำนวน frame ต่อวินาทีต่อเครื่องชั่ง
+WARMUP_SECONDS = 2.0
+MEASURE_SECONDS = 10.0
+DEFAULT_PORT_COUNTS = [1, 2, 4, 8]
+SERVER_PORT = 8799
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+
+
+def read_proc_usage(pid):
+    """คืน (cpu_seconds, rss_kb) ของ process จาก /proc"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLK_TCK
+    rss_kb = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+                break
+    return cpu_seconds, rss_kb
+
+
+def open_virtual_ports(count):
+    """สร้าง pty หลายคู่ คืน [(master_fd, slave_fd, slave_name)]"""
+    ports = []
+    for _ in range(count):
+        master_fd, slave_fd = os.openpty()
+        tty.setraw(slave_fd)
+        ports.append((master_fd, slave_fd, os.ttyname(slave_fd)))
+    return ports
+
+
+def write_daemon_config(path, ports):
+    lines = ["[Daemon]", f"server_url = ws://127.0.0.1:{SERVER_PORT}", ""]
+    for index, (_, _, slave_name) in enumerate(ports, 1):
+        client_id = f"bench_{index:03d}"
+        lines += [f"[Scale:{client_id}]", f"port = {slave_name}", "baudrate = 9600",
+                  "parity = N", "stopbits = 1", "bytesize = 8", "readtimeout = 1.0",
+                  f"branch_prefix = Z{index}", "",
+                  f"[Framing:{client_id}]", "mode = stx_etx", ""]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+async def feed_scale(master_fd, stop_event):
+    """ส่ง frame รูปแบบ Default (1BH) เข้า pty ตาม FRAME_RATE_HZ"""
+    interval = 1.0 / FRAME_RATE_HZ
+    weight = 0
+    while not stop_event.is_set():
+        weight = (weight + 7) % 100000
+        os.write(master_fd, b'\x021BH  %06d\x03' % weight)
+        await asyncio.sleep(interval)
+
+
+async def run_case(port_count):
+    """รัน daemon กับ port_count เครื่องชั่ง คืนผลการวัด"""
+    received = 0
+
+    async def sink(websocket, path=None):
+        nonlocal received
+        try:
+            async for _ in websocket:
+                received += 1
+        except websockets.exceptions.ConnectionClosed:
+            # daemon ถูก terminate ตอนจบแต่ละรอบ
+            pass
+
+    ports = open_virtual_ports(port_count)
+    stop_event = asyncio.Event()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "bench_daemon.ini")
+        write_daemon_config(config_path, ports)
+
+        async with websockets.serve(sink, "127.0.0.1", SERVER_PORT):
+            daemon = subprocess.Popen([sys.executable, "scale_daemon.py", config_path],
+                                      cwd=os.path.dirname(os.path.abspath(__file__)),
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            feeders = [asyncio.create_task(feed_scale(master_fd, stop_event)) for master_fd, _, _ in ports]
+            try:
+                await asyncio.sleep(WARMUP_SECONDS)
+                cpu_start, _ = read_proc_usage(daemon.pid)
+                received_start = received
+                wall_start = time.monotonic()
+
+                await asyncio.sleep(MEASURE_SECONDS)
+
+                cpu_end, rss_kb = read_proc_usage(daemon.pid)
+                wall = time.monotonic() - wall_start
+                messages = received - received_start
+            finally:
+                stop_event.set()
+                await asyncio.gather(*feeders)
+                daemon.terminate()
+                daemon.wait()
+
+    for master_fd, slave_fd, _ in ports:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+    return {
+        'ports': port_count,
+        'cpu_percent': (cpu_end - cpu_start) / wall * 100,
+        'rss_mb': rss_kb / 1024,
+        'messages_per_sec': messages / wall,
+    }
+
+
+async def main(port_counts):
+    print(f"Frame rate: {FRAME_RATE_HZ} Hz per scale, measuring {MEASURE_SECONDS:.0f}s per case")
+    print(f"{'ports':>5} {'CPU %':>8} {'RSS MB':>8} {'msg/s':>8} {'+CPU %/port':>12} {'+RSS MB/port':>13}")
+    baseline = None
+    for port_count in port_counts:
+        result = await run_case(port_count)
+        if baseline is None:
+            baseline = result
+            extra_cpu = extra_rss = 0.0
+        else:
+            added = max(1, port_count - baseline['ports'])
+            extra_cpu = (result['cpu_percent'] - baseline['cpu_percent']) / added
+            extra_rss = (result['rss_mb'] - baseline['rss_mb']) / added
+        print(f"{result['ports']:>5} {result['cpu_percent']:>8.2f} {result['rss_mb']:>8.1f} "
+              f"{result['messages_per_sec']:>8.1f} {extra_cpu:>12.2f} {extra_rss:>13.2f}")
+
+
+if __name__ == '__main__':
+    if not sys.platform.startswith('linux'):
+        print("benchmark_daemon.py requires Linux (pty and /proc)")
+        sys.exit(1)
+    counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_PORT_COUNTS
+    asyncio.run(main(counts))
@@ -0,0 +1,108 @@
+"""
+Benchmark ของการ parse ข้อมูลเครื่องชั่ง - เล่นไฟล์ capture ผ่าน framer + parser ทุก Pattern
+- ใช้ไฟล์ .rs232cap ที่บันทึกจากหน้างาน (ปุ่ม Record Raw ใน GUI หรือ rs232_client.py --capture)
+- ถ้าไม่มีไฟล์ ใช้ --sample เพื่อสร้าง capture ตัวอย่าง (seed คงที่ ผลลัพธ์ทำซ้ำได้)
+- ข้อมูลทั้งหมดถูกโหลดเข้าหน่วยความจำก่อนจับเวลา (ไม่นับเวลาอ่านไฟล์)
+
+ใช้งาน:
+    python benchmark_parse.py FILE [FILE ...] [--config client_config.ini] [--repeat 3]
+    python benchmark_parse.py --sample sample.rs232cap
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from scale_patterns import SCALE_PATTERNS, parse_scale_text
+from serial_capture import CaptureWriter, read_capture, load_replay_framing
+from serial_framer import make_framer
+
+SAMPLE_FRAMES = 20000
+SAMPLE_SEED = 42
+
+
+def make_sample_capture(path, frames=SAMPLE_FRAMES, seed=SAMPLE_SEED):
+    """สร้าง capture ตัวอย่างที่มีหลายรูปแบบปนกัน แบ่ง chunk แบบสุ่มเหมือน UART จริง"""
+    rng = random.Random(seed)
+    formats = [
+        lambda w: b'1BH   %06d' % w,
+        lambda w: b'1CH   000000',
+        lambda w: b'ST,GS,+%07.1fkg' % (w / 10),
+        lambda w: b'US,GS,+%07.1fkg' % (w / 10),
+        lambda w: b'CAS %06d' % w,
+        lambda w: b'MT %06d' % w,
+        lambda w: b'SA %06d' % w,
+    ]
+    stream = bytearray()
+    for _ in range(frames):
+        stream += rng.choice(formats)(rng.randrange(0, 50000, 10)) + b'\r\n'
+
+    writer = CaptureWriter(path)
+    timestamp = 0.0
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(1, 32)
+        timestamp += size * 10 / 9600  # เวลาที่ใช้ส่ง size bytes ที่ 9600 baud
+        writer.write(bytes(stream[pos:pos + size]), timestamp)
+        pos += size
+    writer.close()
+    print(f"Sample capture written: {path} ({frames} frames, {writer.chunks} chunks)")
+
+
+def run_pattern(chunks, framing, pattern_name):
+    """เล่นทุก chunk ผ่าน framer + parse_scale_text คืน (frames, parsed, seconds)"""
+    framer = make_framer(framing)
+    frames = 0
+    parsed = 0
+    started = time.perf_counter()
+    for data in chunks:
+        for frame in framer.feed(data):
+            text = frame.decode('latin-1').strip()
+            if not text:
+                continue
+            frames += 1
+            if parse_scale_text(text, pattern_name) != "N/A":
+                parsed += 1
+    return frames, parsed, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse throughput benchmark over captured serial data")
+    parser.add_argument('files', nargs='*', help="capture files (.rs232cap)")
+    parser.add_argument('--config', default='client_config.ini', help="client config with [Framing] section")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per pattern (best time is reported)")
+    parser.add_argument('--sample', metavar='FILE', help="write a reproducible sample capture to FILE and use it")
+    args = parser.parse_args()
+
+    files = list(args.files)
+    if args.sample:
+        make_sample_capture(args.sample)
+        files.append(args.sample)
+    if not files:
+        parser.error("no capture files (use --sample FILE to generate one)")
+
+    framing = load_replay_framing(args.config)
+    chunks = [data for path in files for _, data in read_capture(path)]
+    total_bytes = sum(len(data) for data in chunks)
+    print(f"{len(chunks)} chunks, {total_bytes} bytes, {framing['mode']} framing, best of {args.repeat}")
+    print(f"{'pattern':<22} {'frames':>8} {'parsed':>8} {'frames/s':>12} {'us/frame':>9} {'MB/s':>7}")
+
+    for pattern_name in SCALE_PATTERNS:
+        best = None
+        for _ in range(max(1, args.repeat)):
+            result = run_pattern(chunks, framing, pattern_name)
+            if best is None or result[2] < best[2]:
+                best = result
+        frames, parsed, seconds = best
+        seconds = max(seconds, 1e-9)
+        print(f"{pattern_name:<22} {frames:>8} {parsed:>8} {frames / seconds:>12,.0f} "
+              f"{seconds / max(frames, 1) * 1e6:>9.2f} {total_bytes / seconds / 1e6:>7.2f}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,125 @@
+"""
+Microbenchmark ของการ parse หนึ่งบรรทัดตาม SCALE_PATTERNS - วิธีเดิม (re.findall ทีละ entry)
+เทียบกับ Pattern ที่ compile เป็น regex เดียว (scale_patterns.compile_pattern)
+และ parser แบบ byte-level (scale_parsers.parse_frame - รับ bytes ของ frame โดยตรง)
+- ข้อมูลทดสอบสร้างจากรูปแบบจริงของแต่ละยี่ห้อ (seed คงที่) ปนกับบรรทัดที่ไม่ตรง Pattern
+- ตรวจว่าผลลัพธ์ของทั้งสองวิธีตรงกันทุกบรรทัดก่อนจับเวลา
+
+ใช้งาน:
+    python benchmark_patterns.py [--lines 20000] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from scale_parsers import PARSERS, parse_frame
+from scale_patterns import DEFAULT_SENSITIVITY, RAW_PATTERN, SCALE_PATTERNS, parse_scale_text
+
+SEED = 42
+
+# ตัวอย่างบรรทัดของแต่ละ Pattern (รับน้ำหนัก kg เป็นจำนวนเต็ม)
+LINE_FORMATS = {
+    'Default': [lambda w: '1BH   %06d' % w, lambda w: '1CH   000000', lambda w: '1@H   %06d' % w],
+    'CAS Scale': [lambda w: 'CAS %06d' % w, lambda w: 'CAS 000000', lambda w: 'ST %06d' % w],
+    'ST,GS Format': [lambda w: 'ST,GS,+%07.1fkg' % (w / 10), lambda w: 'US,GS,+%07.1fkg' % (w / 10),
+                     lambda w: 'ST,GS,+00000.0kg', lambda w: 'ST,GS,-%07.1fkg' % (w / 10)],
+    'Mettler Toledo': [lambda w: 'MT %06d' % w, lambda w: 'WT %06d' % w, lambda w: 'MT 000000'],
+    'Sartorius': [lambda w: 'SA %06d' % w, lambda w: 'WE %06d' % w, lambda w: 'SA 000000'],
+    'Custom Pattern 1': [lambda w: 'CUSTOM1 %06d' % w, lambda w: 'CUSTOM1 000000'],
+    'Custom Pattern 2': [lambda w: 'CUSTOM2 %06d' % w, lambda w: 'CUSTOM2 000000'],
+}
+NOISE_LINES = ['', 'ERR', '   ', 'OL', '1BH', 'ST,GS,', '?']
+
+
+def legacy_parse_scale_text(cleaned_text, pattern_name, sensitivity=DEFAULT_SENSITIVITY):
+    """วิธีเดิมก่อนมี compile_pattern: re.findall ด้วย regex string ทีละ entry (ไม่รวม log)"""
+    if pattern_name not in SCALE_PATTERNS:
+        pattern_name = 'Default'
+    if pattern_name == RAW_PATTERN:
+        return cleaned_text.strip()
+
+    extracted_weight_values = []
+    for indicator_text, pattern_regex, is_zero_indicator in SCALE_PATTERNS[pattern_name]:
+        for match in re.findall(pattern_regex, cleaned_text):
+            if is_zero_indicator:
+                extracted_weight_values.append("0")
+                continue
+            try:
+                num_str = match[1] if isinstance(match, tuple) and len(match) == 2 else match
+                weight_val = float(num_str) if '.' in num_str else float(int(num_str))
+                if weight_val < 0:
+                    weight_val = 0.0 if abs(weight_val) < 0.1 else abs(weight_val)
+                if abs(weight_val) < sensitivity:
+                    weight_val = 0.0
+                extracted_weight_values.append(str(weight_val))
+            except ValueError:
+                pass
+
+    if extracted_weight_values:
+        non_zero_values = [val for val in extracted_weight_values if val != "0" and val != "0.0"]
+        if non_zero_values:
+            return non_zero_values[-1]
+        if "0" in extracted_weight_values or "0.0" in extracted_weight_values:
+            return "0"
+    return "N/A"
+
+
+def fast_path_text(frame, pattern_name):
+    reading = parse_frame(frame, pattern_name)
+    return "N/A" if reading is None else reading.to_text()
+
+
+def make_lines(pattern_name, count, rng):
+    formats = LINE_FORMATS[pattern_name]
+    lines = []
+    for _ in range(count):
+        if rng.random() < 0.05:
+            lines.append(rng.choice(NOISE_LINES))
+        else:
+            lines.append(rng.choice(formats)(rng.randrange(0, 50000, 10)))
+    return lines
+
+
+def best_rate(parse, lines, pattern_name, repeat):
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        for line in lines:
+            parse(line, pattern_name)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / max(best, 1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-line scale pattern parsing microbenchmark")
+    parser.add_argument('--lines', type=int, default=20000, help="lines per pattern family")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    print(f"{args.lines} lines per pattern, best of {args.repeat}")
+    print(f"{'pattern':<18} {'entries':>7} {'before lines/s':>15} {'after lines/s':>14} {'speedup':>8} "
+          f"{'bytes lines/s':>14} {'speedup':>8}")
+    for pattern_name, formats in LINE_FORMATS.items():
+        lines = make_lines(pattern_name, args.lines, rng)
+        frames = [line.encode('latin-1') for line in lines]
+        mismatches = [line for line, frame in zip(lines, frames)
+                      if not (legacy_parse_scale_text(line, pattern_name) == parse_scale_text(line, pattern_name)
+                              == fast_path_text(frame, pattern_name))]
+        if mismatches:
+            print(f"{pattern_name}: {len(mismatches)} results differ, e.g. {mismatches[0]!r}")
+            continue
+
+        before = best_rate(legacy_parse_scale_text, lines, pattern_name, args.repeat)
+        after = best_rate(parse_scale_text, lines, pattern_name, args.repeat)
+        fast = best_rate(parse_frame, frames, pattern_name, args.repeat)
+        fast_label = "" if pattern_name in PARSERS else " (regex)"
+        print(f"{pattern_name:<18} {len(SCALE_PATTERNS[pattern_name]):>7} {before:>15,.0f} "
+              f"{after:>14,.0f} {after / before:>7.1f}x {fast:>14,.0f} {fast / before:>7.1f}x{fast_label}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Branch Config - รายชื่อสาขาและ Prefix ของแต่ละสาขา
+ใช้ร่วมกันระหว่าง RS232ClientGUI (เลือกสาขาของเครื่องชั่ง) และ agent.py (subscribe ค่าน้ำหนักตามสาขา)
+"""
+
+from datetime import datetime
+from typing import Optional
+
+DEFAULT_BRANCH_PREFIX = 'Z1'
+DYNAMIC_PREFIX = 'DYNAMIC'  # ใช้ปี พ.ศ. 2 ตัวสุดท้าย
+
+BRANCH_CONFIG = {
+    'สาขา 1 (SPS)': 'Z4',
+    'สาขา 2 (OPS)': 'Z2',
+    'สาขา 3 (SPN)': 'Z5',
+    'สำนักงานใหญ่ P8': 'Z1',
+    'สำนักงานใหญ่ P3': 'Z3',
+    'โอเชี่ยนไพพ์ (OCP)': 'Z6',
+    'มาลีค้าเหล็ก(มาลี)': 'Z7',
+    'สาขาลพบุรี': DYNAMIC_PREFIX  # จะใช้ปี พ.ศ. 2 ตัวสุดท้าย
+}
+
+
+def get_branch_prefix(branch_name: str, default: Optional[str] = DEFAULT_BRANCH_PREFIX) -> Optional[str]:
+    """
+    Prefix ของสาขา
+
+    Args:
+        branch_name: ชื่อสาขาใน BRANCH_CONFIG
+        default: ค่าที่คืนเมื่อไม่รู้จักชื่อสาขา
+
+    Returns:
+        Optional[str]: Prefix (สาขาลพบุรี = ปี พ.ศ. 2 ตัวสุดท้าย) หรือ default
+    """
+    if branch_name not in BRANCH_CONFIG:
+        return default
+
+    prefix = BRANCH_CONFIG[branch_name]
+    if prefix == DYNAMIC_PREFIX:
+        current_year = datetime.now().year + 543  # แปลงเป็นปี พ.ศ.
+        return str(current_year)[-2:]  # เอา 2 ตัวสุดท้าย
+    return prefix
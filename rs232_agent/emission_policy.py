@@ -0,0 +1,189 @@
+"""
+Emission Policy for RS232 Scale Client
+ตัดสินใจว่าเมื่อไหร่ต้องส่งค่าน้ำหนักไป server แทนการส่งทุกค่าที่อ่านได้ (หรือทุก 100 ms)
+- ส่งทันทีเมื่อค่าเปลี่ยนเกิน sensitivity จากค่าที่ส่งไปล่าสุด
+- ค่าไม่เปลี่ยน: ส่งค่าล่าสุดซ้ำเป็น heartbeat ทุก heartbeat_interval วินาที
+  (ต้องน้อยกว่าเวลาที่ agent.py ลบข้อมูลเก่า - 30 วินาที)
+- สถานะนิ่ง/ไม่นิ่งเปลี่ยน (WeightReading.stable) ถือเป็นค่าเปลี่ยน
+- จำกัดไม่เกิน max_rate ข้อความต่อวินาที ค่าที่เปลี่ยนระหว่างนั้นถูกรวมเป็นค่าล่าสุดค่าเดียว
+
+รูปแบบ config (section [Emission] ใน client_config.ini):
+    heartbeat_interval = 10
+    max_rate = 5
+    stats_interval = 60
+stats_interval = ส่งข้อความ stats (ตัวนับของ read path ดู ScaleDecoder.stats) ทุกกี่วินาที (0 = ไม่ส่ง)
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from scale_patterns import DEFAULT_SENSITIVITY
+from weight_reading import WeightReading
+
+EMISSION_SECTION = 'Emission'
+DEFAULT_HEARTBEAT_INTERVAL = 10.0  # วินาที
+DEFAULT_MAX_RATE = 5.0  # ข้อความต่อวินาที (0 = ไม่จำกัด)
+DEFAULT_STATS_INTERVAL = 60.0  # วินาที (0 = ไม่ส่ง stats)
+
+_FLOAT_TOLERANCE = 1e-9
+
+
+def default_emission_config() -> Dict[str, Any]:
+    """ค่าเริ่มต้นของ [Emission]"""
+    return {
+        'sensitivity': DEFAULT_SENSITIVITY,
+        'heartbeat_interval': DEFAULT_HEARTBEAT_INTERVAL,
+        'max_rate': DEFAULT_MAX_RATE,
+        'stats_interval': DEFAULT_STATS_INTERVAL,
+    }
+
+
+def load_emission_config(config, section_name: str = EMISSION_SECTION,
+                         sensitivity: float = DEFAULT_SENSITIVITY) -> Dict[str, Any]:
+    """
+    อ่าน section [Emission] จาก ConfigParser
+
+    Args:
+        config: ConfigParser ที่อ่านไฟล์แล้ว
+        section_name: ชื่อ section (daemon ใช้ Emission:<client_id>)
+        sensitivity: ค่า sensitivity จาก [SerialConfig]
+
+    Returns:
+        dict: sensitivity, heartbeat_interval, max_rate, stats_interval
+    """
+    settings = default_emission_config()
+    settings['sensitivity'] = sensitivity
+    if config is not None and section_name in config:
+        section = config[section_name]
+        settings['heartbeat_interval'] = section.getfloat('Heartbeat_Interval', DEFAULT_HEARTBEAT_INTERVAL)
+        settings['max_rate'] = section.getfloat('Max_Rate', DEFAULT_MAX_RATE)
+        settings['stats_interval'] = section.getfloat('Stats_Interval', DEFAULT_STATS_INTERVAL)
+    return settings
+
+
+def save_emission_config(config, settings: Dict[str, Any]):
+    """เขียน section [Emission] ลง ConfigParser (sensitivity อยู่ใน [SerialConfig])"""
+    config[EMISSION_SECTION] = {
+        'Heartbeat_Interval': str(settings.get('heartbeat_interval', DEFAULT_HEARTBEAT_INTERVAL)),
+        'Max_Rate': str(settings.get('max_rate', DEFAULT_MAX_RATE)),
+        'Stats_Interval': str(settings.get('stats_interval', DEFAULT_STATS_INTERVAL)),
+    }
+
+
+def make_emission_policy(settings: Dict[str, Any]) -> 'EmissionPolicy':
+    return EmissionPolicy(settings.get('sensitivity', DEFAULT_SENSITIVITY),
+                          settings.get('heartbeat_interval', DEFAULT_HEARTBEAT_INTERVAL),
+                          settings.get('max_rate', DEFAULT_MAX_RATE))
+
+
+def _to_float(weight) -> Optional[float]:
+    """ค่าน้ำหนักเป็นตัวเลข - None ถ้าไม่ใช่ค่าน้ำหนัก (เทียบด้วย == แทน)"""
+    if isinstance(weight, WeightReading):
+        return weight.kg
+    try:
+        return float(weight)
+    except (TypeError, ValueError):
+        return None
+
+
+class EmissionPolicy:
+    """
+    เก็บค่าน้ำหนักล่าสุดที่อ่านได้และค่าที่ส่งไปแล้ว แล้วบอกว่าต้องส่งอะไรเมื่อไหร่
+
+    ใช้งานในลูปส่งข้อมูล:
+        policy.offer(weight)                 # ทุกค่าที่อ่านได้จาก queue
+        weight = policy.poll()               # ค่าที่ต้องส่งตอนนี้ หรือ None
+        ...send...; policy.mark_sent(weight)
+        timeout = policy.time_until_due()    # เวลารอ queue รอบถัดไป
+    """
+
+    def __init__(self, sensitivity: float = DEFAULT_SENSITIVITY,
+                 heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+                 max_rate: float = DEFAULT_MAX_RATE):
+        """
+        เริ่มต้น Emission Policy
+
+        Args:
+            sensitivity: ค่าที่ต่างจากค่าที่ส่งล่าสุดไม่เกินนี้ถือว่าไม่เปลี่ยน (kg)
+            heartbeat_interval: ส่งค่าล่าสุดซ้ำเมื่อไม่ได้ส่งนานเท่านี้ (วินาที)
+            max_rate: จำนวนข้อความสูงสุดต่อวินาที (0 = ไม่จำกัด)
+        """
+        self.sensitivity = max(0.0, sensitivity)
+        self.heartbeat_interval = max(0.1, heartbeat_interval)
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+
+        self.latest = None
+        self.last_sent_weight = None
+        self.last_sent_time = None
+        self.sent_changes = 0
+        self.sent_heartbeats = 0
+        self.readings = 0
+
+    def offer(self, weight):
+        """บันทึกค่าน้ำหนักล่าสุดที่อ่านได้"""
+        self.latest = weight
+        self.readings += 1
+
+    def changed(self) -> bool:
+        """ค่าล่าสุดต่างจากค่าที่ส่งไปแล้วเกิน sensitivity หรือไม่"""
+        if self.latest is None:
+            return False
+        if self.last_sent_time is None:
+            return True
+        if (isinstance(self.latest, WeightReading) and isinstance(self.last_sent_weight, WeightReading)
+                and self.latest.stable != self.last_sent_weight.stable):
+            # นิ่ง <-> ไม่นิ่ง (จาก StabilityDetector) ส่งทันทีเหมือนค่าเปลี่ยน
+            return True
+        latest = _to_float(self.latest)
+        sent = _to_float(self.last_sent_weight)
+        if latest is None or sent is None:
+            return self.latest != self.last_sent_weight
+        return abs(latest - sent) > self.sensitivity + _FLOAT_TOLERANCE
+
+    def poll(self, now: Optional[float] = None):
+        """
+        ค่าที่ควรส่งตอนนี้
+
+        Returns:
+            ค่าน้ำหนักที่ต้องส่ง (ค่าเปลี่ยนหรือถึงเวลา heartbeat) หรือ None ถ้ายังไม่ต้องส่ง
+        """
+        if self.latest is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        if self.last_sent_time is None:
+            return self.latest
+        since_sent = now - self.last_sent_time
+        if self.changed() and since_sent >= self.min_interval:
+            return self.latest
+        if since_sent >= self.heartbeat_interval:
+            return self.latest
+        return None
+
+    def mark_sent(self, weight, now: Optional[float] = None):
+        """บันทึกว่าส่ง weight ไปแล้ว (เรียกหลังส่งสำเร็จ)"""
+        if now is None:
+            now = time.monotonic()
+        if self.last_sent_time is not None and weight == self.last_sent_weight:
+            self.sent_heartbeats += 1
+        else:
+            self.sent_changes += 1
+        self.last_sent_weight = weight
+        self.last_sent_time = now
+
+    def time_until_due(self, now: Optional[float] = None) -> float:
+        """จำนวนวินาทีจนกว่า poll() อาจคืนค่าที่ต้องส่ง (ใช้เป็น timeout ของ queue)"""
+        if self.last_sent_time is None:
+            return 0.0 if self.latest is not None else self.heartbeat_interval
+        if now is None:
+            now = time.monotonic()
+        if self.changed():
+            due = self.last_sent_time + self.min_interval
+        else:
+            due = self.last_sent_time + self.heartbeat_interval
+        return max(0.0, due - now)
+
+    def reset(self):
+        """ลืมค่าที่ส่งไปแล้ว (เช่น หลัง reconnect) - poll() ครั้งถัดไปส่งค่าล่าสุดทันที"""
+        self.last_sent_weight = None
+        self.last_sent_time = None
@@ -0,0 +1,150 @@
+"""
+Format Detector - เลือก Scale Pattern อัตโนมัติจาก frame ช่วงแรกของ port
+- ลอง parse ทุก frame ด้วยทุก Pattern ใน SCALE_PATTERNS (ยกเว้น Raw Data) แล้วนับจำนวนที่ parse ได้
+- ครบ max_frames frame หรือ max_seconds วินาที: เลือก Pattern ที่ match มากที่สุด
+  (ต้อง match อย่างน้อย min_match_rate ของ frame ทั้งหมด ไม่เช่นนั้นถือว่าตรวจไม่ได้)
+- เก็บผลไว้ในไฟล์ cache ตาม port + การตั้งค่า serial + framing
+  เปิดโปรแกรมครั้งถัดไปใช้ค่าจาก cache ได้ทันทีโดยไม่ต้องตรวจใหม่
+
+ใช้งาน:
+    detector = FormatDetector()
+    for frame in framer.feed(data):
+        pattern_name = detector.feed(frame)
+        if detector.done:
+            ...  # pattern_name = Pattern ที่เลือก หรือ None ถ้าตรวจไม่ได้
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from scale_parsers import parse_frame
+from scale_patterns import RAW_PATTERN, SCALE_PATTERNS
+
+AUTO_PATTERN = 'Auto Detect'
+FORMAT_CACHE_FILE = 'scale_format_cache.json'
+DEFAULT_DETECT_FRAMES = 20
+DEFAULT_DETECT_SECONDS = 3.0
+DEFAULT_MIN_MATCH_RATE = 0.5
+# frame ที่ parse ไม่ได้ติดกันเท่านี้หลังเลือก Pattern แล้ว = ตรวจใหม่ (เช่น เปลี่ยนเครื่องชั่ง)
+AUTO_REDETECT_MISSES = 50
+
+
+def detection_candidates() -> List[str]:
+    """Pattern ที่ใช้ตรวจ (ไม่รวม Raw Data และ Pattern ที่ยังไม่มีรายการ เช่น Custom Pattern 3 ที่ยังไม่ตั้งค่า)"""
+    return [name for name, entries in SCALE_PATTERNS.items() if name != RAW_PATTERN and entries]
+
+
+class FormatDetector:
+    """นับจำนวน frame ที่แต่ละ Pattern parse ได้ แล้วเลือก Pattern ที่ match มากที่สุด"""
+
+    def __init__(self, candidates: Optional[List[str]] = None,
+                 max_frames: int = DEFAULT_DETECT_FRAMES,
+                 max_seconds: float = DEFAULT_DETECT_SECONDS,
+                 min_match_rate: float = DEFAULT_MIN_MATCH_RATE):
+        """
+        เริ่มต้น Format Detector
+
+        Args:
+            candidates: ชื่อ Pattern ที่ให้เลือก (None = ทุก Pattern ยกเว้น Raw Data)
+            max_frames: ตัดสินเมื่อได้ frame ครบเท่านี้
+            max_seconds: ตัดสินเมื่อผ่านไปเท่านี้นับจาก frame แรก (แม้ frame ยังไม่ครบ)
+            min_match_rate: สัดส่วน frame ขั้นต่ำที่ Pattern ต้อง parse ได้
+        """
+        self.candidates = list(candidates) if candidates is not None else detection_candidates()
+        self.max_frames = max(1, max_frames)
+        self.max_seconds = max_seconds
+        self.min_match_rate = min_match_rate
+        self.scores: Dict[str, int] = {name: 0 for name in self.candidates}
+        self.frames = 0
+        self.started: Optional[float] = None
+        self.done = False
+        self.result: Optional[str] = None
+
+    def feed(self, frame: bytes, now: Optional[float] = None) -> Optional[str]:
+        """
+        เพิ่มหนึ่ง frame
+
+        Returns:
+            Optional[str]: Pattern ที่เลือก เมื่อตัดสินแล้ว (None ระหว่างเก็บข้อมูล หรือเมื่อตรวจไม่ได้)
+        """
+        if self.done:
+            return self.result
+        if now is None:
+            now = time.monotonic()
+        if self.started is None:
+            self.started = now
+
+        self.frames += 1
+        for name in self.candidates:
+            try:
+                if parse_frame(frame, name, 0.0) is not None:
+                    self.scores[name] += 1
+            except Exception:
+                pass
+
+        if self.frames >= self.max_frames or now - self.started >= self.max_seconds:
+            self.result = self.decide()
+            self.done = True
+        return self.result
+
+    def match_rate(self, name: str) -> float:
+        return self.scores.get(name, 0) / self.frames if self.frames else 0.0
+
+    def decide(self) -> Optional[str]:
+        """Pattern ที่ match มากที่สุด (เท่ากัน = ตามลำดับใน SCALE_PATTERNS) หรือ None ถ้าต่ำกว่า min_match_rate"""
+        best = None
+        for name in self.candidates:
+            if best is None or self.scores[name] > self.scores[best]:
+                best = name
+        if best is None or self.scores[best] == 0 or self.match_rate(best) < self.min_match_rate:
+            return None
+        return best
+
+    def summary(self) -> str:
+        """ผลการนับ สำหรับ log เช่น "Default 20/20, CAS Scale 0/20" """
+        ranked = sorted(self.candidates, key=lambda name: -self.scores[name])
+        return ", ".join(f"{name} {self.scores[name]}/{self.frames}" for name in ranked if self.scores[name]) \
+            or f"no pattern matched {self.frames} frames"
+
+
+def format_cache_key(serial_config: Dict[str, Any], framing_mode: str) -> str:
+    """key ของ cache: port + baudrate + parity + stopbits + bytesize + framing"""
+    return "|".join(str(serial_config.get(name, '')) for name in
+                    ('port', 'baudrate', 'parity', 'stopbits', 'bytesize')) + f"|{framing_mode}"
+
+
+def load_format_cache(path: str = FORMAT_CACHE_FILE) -> Dict[str, str]:
+    """อ่านไฟล์ cache (ไม่มีไฟล์หรืออ่านไม่ได้ = cache ว่าง)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError) as e:
+        print(f"Error loading format cache {path}: {e}")
+        return {}
+
+
+def cached_format(key: str, path: str = FORMAT_CACHE_FILE) -> Optional[str]:
+    """Pattern ที่ตรวจได้ครั้งก่อนของ key นี้ (None ถ้าไม่มีหรือ Pattern ถูกลบไปแล้ว)"""
+    pattern_name = load_format_cache(path).get(key)
+    if pattern_name in SCALE_PATTERNS and pattern_name != RAW_PATTERN:
+        return pattern_name
+    return None
+
+
+def remember_format(key: str, pattern_name: Optional[str], path: str = FORMAT_CACHE_FILE):
+    """บันทึกผลการตรวจของ key นี้ (pattern_name None = ลบออกจาก cache)"""
+    cache = load_format_cache(path)
+    if pattern_name is None:
+        cache.pop(key, None)
+    else:
+        cache[key] = pattern_name
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"Error saving format cache {path}: {e}")
@@ -11,6 +11,8 @@ import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from weight_reading import WeightReading
+
 class HybridLightweightManager:
     """
     จัดการการทำงานแบบ hybrid ระหว่าง online และ offline mode
@@ -48,7 +50,7 @@ class HybridLightweightManager:
         if hasattr(self.client_gui, 'root'):
             self.client_gui.root.after(self.sync_interval * 1000, sync_timer)
     
-    def process_weight_data(self, weight: str, context: Dict[str, Any]) -> bool:
+    def process_weight_data(self, weight: WeightReading, context: Dict[str, Any]) -> bool:
         """
         ประมวลผลข้อมูลน้ำหนักแบบ hybrid
         
@@ -74,7 +76,7 @@ class HybridLightweightManager:
                 if success:
                     # สำเร็จ: เก็บใน local database เป็น backup
                     self.save_to_local_database(weight_data, synced=True)
-                    self.client_gui.log_message(f"✅ Online Mode: ส่งข้อมูล {weight} kg สำเร็จ")
+                    self.client_gui.log_message(f"✅ Online Mode: ส่งข้อมูล {weight.to_text()} kg สำเร็จ")
                     return True
                 else:
                     # ล้มเหลว: เก็บใน local database แบบไม่ sync
@@ -84,7 +86,7 @@ class HybridLightweightManager:
             else:
                 # Offline Mode: เก็บใน local database เท่านั้น
                 self.save_to_local_database(weight_data, synced=False)
-                self.client_gui.log_message(f"📱 Offline Mode: เก็บข้อมูล {weight} kg ใน local")
+                self.client_gui.log_message(f"📱 Offline Mode: เก็บข้อมูล {weight.to_text()} kg ใน local")
                 return True
                 
         except Exception as e:
@@ -108,8 +110,7 @@ class HybridLightweightManager:
             # สร้าง message สำหรับส่งไป server
             message = {
                 "client_id": self.client_gui.client_id_var.get(),
-                "weight": weight_data['weight'],
-                "timestamp": time.time(),
+                **weight_data['weight'].to_wire(),
                 "branch": weight_data['context'].get('branch', ''),
                 "branch_prefix": self.client_gui.get_branch_prefix(
                     weight_data['context'].get('branch', '')
@@ -143,7 +144,7 @@ class HybridLightweightManager:
         try:
             if hasattr(self.client_gui, 'local_data_manager'):
                 record_id = self.client_gui.local_data_manager.add_weight_record(
-                    weight=weight_data['weight'],
+                    weight=weight_data['weight'].to_text(),
                     branch=weight_data['context'].get('branch', ''),
                     scale_pattern=weight_data['context'].get('scale_pattern', ''),
                     synced=synced
@@ -210,7 +211,7 @@ class HybridLightweightManager:
             # สร้าง message สำหรับ sync
             message = {
                 "client_id": self.client_gui.client_id_var.get(),
-                "weight": str(record[1]),  # weight
+                "weight": WeightReading.from_text(str(record[1])),  # weight
                 "timestamp": time.time(),
                 "branch": record[4] if record[4] else self.client_gui.branch_var.get(),
                 "branch_prefix": self.client_gui.get_branch_prefix(
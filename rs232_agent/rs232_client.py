@@ -1,12 +1,19 @@
+import argparse
 import asyncio
 import websockets
 import json
 import serial
-import time
 import configparser
 import os
-import re
 from threading import Thread
+from serial_reader import AsyncSerialReader, SerialReaderThread, DEFAULT_QUEUE_SIZE
+from serial_connection import SerialConnectionManager
+from serial_capture import CaptureWriter
+from emission_policy import default_emission_config, load_emission_config, make_emission_policy
+from scale_protocol import (DEFAULT_SENSITIVITY, DEFAULT_PATTERN, ScaleDecoder, WeightReading,
+                            build_hello_message, build_stats_message, default_framing_config, format_cache_key,
+                            load_framing_config, make_framer)
+from stability_detector import default_stability_config, load_stability_config, make_stability_detector
 
 # Configuration
 CLIENT_CONFIG_FILE = "client_config.ini"
@@ -35,15 +42,73 @@ byte_size_map = {
     "5": serial.FIVEBITS
 }
 
+def parse_serial_section(cfg_section):
+    """
+    แปลง section [SerialConfig] (หรือ section ของแต่ละเครื่องชั่งใน daemon) เป็น kwargs ของ serial.Serial
+
+    Args:
+        cfg_section: section ของ ConfigParser
+
+    Returns:
+        dict: port, baudrate, parity, stopbits, bytesize, timeout
+    """
+    return {
+        'port': cfg_section.get('Port', DEFAULT_SERIAL_PORT),
+        'baudrate': cfg_section.getint('BaudRate', DEFAULT_BAUD_RATE),
+        'parity': parity_map.get(cfg_section.get('Parity', DEFAULT_PARITY).upper(), serial.PARITY_NONE),
+        'stopbits': stop_bits_map.get(cfg_section.get('StopBits', DEFAULT_STOP_BITS), serial.STOPBITS_ONE),
+        'bytesize': byte_size_map.get(cfg_section.get('ByteSize', DEFAULT_BYTE_SIZE), serial.EIGHTBITS),
+        'timeout': cfg_section.getfloat('ReadTimeout', DEFAULT_READ_TIMEOUT)
+    }
+
 class RS232Client:
-    def __init__(self):
-        self.serial_config = self.load_config()
-        self.serial_connection = None
-        self.read_buffer = b''
-        self.STX = b'\x02'
-        self.ETX = b'\x03'
-        self.last_weight = "0"
+    def __init__(self, client_id=CLIENT_ID, serial_config=None, framing_config=None,
+                 branch=None, branch_prefix=None, capture_path=None, emission_config=None,
+                 stability_config=None, scale_pattern=None):
+        """
+        เริ่มต้น client สำหรับเครื่องชั่งหนึ่งเครื่อง
+
+        Args:
+            client_id: รหัสเครื่องชั่งที่ส่งไปกับทุกค่าน้ำหนัก
+            serial_config: kwargs ของ serial.Serial (None = โหลดจาก client_config.ini)
+            framing_config: การตั้งค่า framing (None = โหลดจาก client_config.ini)
+            branch: ชื่อสาขา (ไม่บังคับ)
+            branch_prefix: prefix ของสาขา (ไม่บังคับ)
+            capture_path: ไฟล์สำหรับบันทึก bytes ดิบจาก serial port (ไม่บังคับ ดู serial_capture.py)
+            emission_config: sensitivity / heartbeat / max rate ของการส่งค่า (None = โหลดจาก client_config.ini)
+            stability_config: window / tolerance ของการตัดสินว่าน้ำหนักนิ่ง (None = โหลดจาก client_config.ini)
+            scale_pattern: ชื่อ Pattern หรือ 'Auto Detect' (None = โหลดจาก client_config.ini, ไม่มี = Default)
+        """
+        self.client_id = client_id
+        self.branch = branch
+        self.branch_prefix = branch_prefix
+        self.framing_config = default_framing_config('stx_etx')
+        self.emission_config = default_emission_config()
+        self.stability_config = default_stability_config()
+        self.scale_pattern = DEFAULT_PATTERN
+        self.serial_config = serial_config if serial_config is not None else self.load_config()
+        if framing_config is not None:
+            self.framing_config = framing_config
+        if emission_config is not None:
+            self.emission_config = emission_config
+        if stability_config is not None:
+            self.stability_config = stability_config
+        if scale_pattern is not None:
+            self.scale_pattern = scale_pattern
+        self.emission = make_emission_policy(self.emission_config)
+        self.stability = make_stability_detector(self.stability_config, self.emission_config['sensitivity'])
+        self.connection = SerialConnectionManager(self.serial_config, log=self.log)
+        self.capture = None
+        if capture_path:
+            self.start_capture(capture_path)
+        self.decoder = ScaleDecoder(make_framer(self.framing_config), self.scale_pattern,
+                                    self.emission_config['sensitivity'],
+                                    cache_key=format_cache_key(self.serial_config, self.framing_config['mode']),
+                                    log=self.log)
+        self.last_weight = WeightReading()
         self.websocket = None
+        self.weight_queue = None
+        self.serial_reader = None
         
     def load_config(self):
         """โหลด config จากไฟล์ในเครื่อง client"""
@@ -51,9 +116,9 @@ class RS232Client:
         loaded_settings = {
             'port': DEFAULT_SERIAL_PORT,
             'baudrate': DEFAULT_BAUD_RATE,
-            'parity_key': DEFAULT_PARITY,
-            'stopbits_key': DEFAULT_STOP_BITS,
-            'bytesize_key': DEFAULT_BYTE_SIZE,
+            'parity': parity_map.get(DEFAULT_PARITY, serial.PARITY_NONE),
+            'stopbits': stop_bits_map.get(DEFAULT_STOP_BITS, serial.STOPBITS_ONE),
+            'bytesize': byte_size_map.get(DEFAULT_BYTE_SIZE, serial.EIGHTBITS),
             'timeout': DEFAULT_READ_TIMEOUT
         }
         
@@ -61,73 +126,32 @@ class RS232Client:
             try:
                 config.read(CLIENT_CONFIG_FILE)
                 if 'SerialConfig' in config:
-                    cfg_section = config['SerialConfig']
-                    loaded_settings['port'] = cfg_section.get('Port', DEFAULT_SERIAL_PORT)
-                    loaded_settings['baudrate'] = cfg_section.getint('BaudRate', DEFAULT_BAUD_RATE)
-                    loaded_settings['parity_key'] = cfg_section.get('Parity', DEFAULT_PARITY).upper()
-                    loaded_settings['stopbits_key'] = cfg_section.get('StopBits', DEFAULT_STOP_BITS)
-                    loaded_settings['bytesize_key'] = cfg_section.get('ByteSize', DEFAULT_BYTE_SIZE)
-                    loaded_settings['timeout'] = cfg_section.getfloat('ReadTimeout', DEFAULT_READ_TIMEOUT)
-                    print(f"Client {CLIENT_ID}: Loaded configuration from {CLIENT_CONFIG_FILE}")
+                    loaded_settings = parse_serial_section(config['SerialConfig'])
+                    # เดิมตัด frame ด้วย STX/ETX - ใช้ค่านี้เมื่อไม่มี section [Framing]
+                    self.framing_config = load_framing_config(config, default_mode='stx_etx')
+                    sensitivity = config['SerialConfig'].getfloat('Sensitivity', DEFAULT_SENSITIVITY)
+                    self.emission_config = load_emission_config(config, sensitivity=sensitivity)
+                    self.stability_config = load_stability_config(config)
+                    if 'ScaleConfig' in config:
+                        self.scale_pattern = config['ScaleConfig'].get('Pattern', DEFAULT_PATTERN)
+                    print(f"Client {self.client_id}: Loaded configuration from {CLIENT_CONFIG_FILE}")
             except Exception as e:
-                print(f"Client {CLIENT_ID}: Error loading config: {e}. Using defaults.")
+                print(f"Client {self.client_id}: Error loading config: {e}. Using defaults.")
         else:
-            print(f"Client {CLIENT_ID}: Config file not found. Using defaults.")
+            print(f"Client {self.client_id}: Config file not found. Using defaults.")
             
-        return {
-            'port': loaded_settings['port'],
-            'baudrate': loaded_settings['baudrate'],
-            'parity': parity_map.get(loaded_settings['parity_key'], serial.PARITY_NONE),
-            'stopbits': stop_bits_map.get(loaded_settings['stopbits_key'], serial.STOPBITS_ONE),
-            'bytesize': byte_size_map.get(loaded_settings['bytesize_key'], serial.EIGHTBITS),
-            'timeout': loaded_settings['timeout']
-        }
+        return loaded_settings
+    
+    def log(self, message):
+        print(f"Client {self.client_id}: {message}")
     
     def get_serial_connection(self):
-        """เชื่อมต่อ RS232"""
-        if self.serial_connection and self.serial_connection.is_open:
-            return self.serial_connection
-            
-        try:
-            print(f"Client {CLIENT_ID}: Connecting to {self.serial_config['port']}")
-            self.serial_connection = serial.Serial(**self.serial_config)
-            if self.serial_connection.is_open:
-                print(f"Client {CLIENT_ID}: Connected to {self.serial_config['port']}")
-                return self.serial_connection
-        except serial.SerialException as e:
-            print(f"Client {CLIENT_ID}: Serial connection error: {e}")
-            self.serial_connection = None
-        return None
-    
-    def parse_scale_data(self, cleaned_text):
-        """Parse ข้อมูลจาก scale"""
-        known_weight_indicators = [
-            ("1CH", r"1CH\s+(0{3,})", True), (" H ", r"\sH\s+(0{3,})", True),
-            ("1Rh", r"1Rh\s+(0{3,})", True), ("1BH", r"1BH\s+(\d+)", False),
-            ("1@H", r"1@H\s+(\d+)", False),
-        ]
-        
-        extracted_weight_values = []
-        for indicator_text, pattern_regex, is_zero_indicator in known_weight_indicators:
-            matches = re.findall(pattern_regex, cleaned_text)
-            if matches:
-                for num_str_from_match in matches:
-                    if is_zero_indicator:
-                        extracted_weight_values.append("0")
-                    else:
-                        try:
-                            weight_val = str(int(num_str_from_match))
-                            extracted_weight_values.append(weight_val)
-                        except ValueError:
-                            pass
-                            
-        if extracted_weight_values:
-            non_zero_values = [val for val in extracted_weight_values if val != "0"]
-            if non_zero_values:
-                return non_zero_values[-1]
-            elif "0" in extracted_weight_values:
-                return "0"
-        return "N/A"
+        """เชื่อมต่อ RS232 (คืน None ทันทีถ้ายังไม่ถึงเวลา retry หรือ port ถูกถอดอยู่)"""
+        return self.connection.get()
+    
+    def parse_scale_data(self, frame):
+        """Parse หนึ่ง frame (bytes) ตาม Pattern ที่เลือก (ดู scale_protocol.ScaleDecoder)"""
+        return self.decoder.parse(frame)
     
     def read_weight_from_rs232(self):
         """อ่านน้ำหนักจาก RS232"""
@@ -137,75 +161,174 @@ class RS232Client:
             
         try:
             if ser.in_waiting > 0:
-                new_bytes = ser.read(ser.in_waiting)
-                self.read_buffer += new_bytes
-            
-            while True:
-                stx_index = self.read_buffer.find(self.STX)
-                if stx_index != -1:
-                    etx_index = self.read_buffer.find(self.ETX, stx_index + 1)
-                    if etx_index != -1:
-                        complete_message_bytes = self.read_buffer[stx_index + 1: etx_index]
-                        try:
-                            decoded_message = complete_message_bytes.decode('latin-1').strip()
-                            parsed_value = self.parse_scale_data(decoded_message)
-                            if parsed_value != "N/A":
-                                self.last_weight = parsed_value
-                        except Exception as e:
-                            print(f"Client {CLIENT_ID}: Parse error: {e}")
-                        self.read_buffer = self.read_buffer[etx_index + 1:]
-                    else:
-                        break
-                else:
-                    break
+                self.handle_serial_chunk(ser.read(ser.in_waiting))
             
             return self.last_weight
         except Exception as e:
-            print(f"Client {CLIENT_ID}: Serial read error: {e}")
-            return "Error"
+            print(f"Client {self.client_id}: Serial read error: {e}")
+            self.connection.mark_lost(e)
+            reading = WeightReading.error()
+            self.on_stability_event(self.stability.feed(reading))
+            return reading
+    
+    def on_stability_event(self, event):
+        """เรียกเมื่อสถานะนิ่งเปลี่ยน (stable / unstable / zero) - event เป็น None ถ้าไม่เปลี่ยน"""
+        if event is not None:
+            self.log(f"Weight {event!r}")
+    
+    def start_capture(self, path):
+        """เริ่มบันทึก bytes ดิบทุก chunk ลงไฟล์ capture"""
+        self.stop_capture()
+        self.capture = CaptureWriter(path)
+        self.log(f"Recording raw serial data to {path}")
+    
+    def stop_capture(self):
+        if self.capture:
+            self.capture.close()
+            self.log(f"Recording stopped: {self.capture.chunks} chunks, {self.capture.bytes_written} bytes")
+            self.capture = None
+    
+    def handle_serial_chunk(self, new_bytes):
+        """
+        Frame และ parse bytes ที่อ่านได้จาก serial port
+        
+        Returns:
+            WeightReading ล่าสุดถ้ามี frame ที่ parse ได้ในข้อมูลชุดนี้, None ถ้าไม่มี
+        """
+        if self.capture:
+            self.capture.write(new_bytes)
+        got_weight = False
+        for _, reading in self.decoder.decode(new_bytes):
+            # Raw Data: ส่งเฉพาะบรรทัดที่เป็นตัวเลข (บรรทัดอื่นเป็นค่า no_data)
+            if reading is not None and reading.ok:
+                # ตั้ง reading.stable จาก sliding window + สถานะของเครื่องชั่ง
+                self.on_stability_event(self.stability.feed(reading))
+                self.last_weight = reading
+                got_weight = True
+        return self.last_weight if got_weight else None
+    
+    def start_serial_reader(self):
+        """
+        เริ่มอ่าน serial port บน event loop
+        ใช้ loop.add_reader ถ้ารองรับ (Linux) ไม่เช่นนั้นใช้ reader thread แทน
+        """
+        loop = asyncio.get_running_loop()
+        ser = self.get_serial_connection()
+        if not ser:
+            loop.call_later(self.connection.retry_in(), self.start_serial_reader)
+            return
+        
+        self.decoder.reset()
+        if AsyncSerialReader.is_supported(ser, loop):
+            self.serial_reader = AsyncSerialReader(ser, self.handle_serial_chunk, self.weight_queue,
+                                                   on_lost=self.on_serial_lost, log=self.log)
+            self.serial_reader.start(loop)
+            print(f"Client {self.client_id}: Reading {self.serial_config['port']} via event loop")
+        else:
+            self.serial_reader = SerialReaderThread(self.get_serial_connection, self.handle_serial_chunk,
+                                                    log=self.log, on_lost=self.connection.mark_lost)
+            self.serial_reader.attach(loop, self.weight_queue)
+            self.serial_reader.start()
+            print(f"Client {self.client_id}: Reading {self.serial_config['port']} via reader thread")
+    
+    def on_serial_lost(self, exc):
+        """เมื่อ serial port ใช้งานไม่ได้ ปิด port แล้วลองเชื่อมต่อใหม่ตาม backoff ของ connection manager"""
+        self.connection.mark_lost(exc)
+        self.serial_reader = None
+        asyncio.get_running_loop().call_later(self.connection.retry_in(), self.start_serial_reader)
+    
+    def build_weight_message(self, weight):
+        """สร้างข้อความค่าน้ำหนัก (WeightReading) สำหรับส่งไป server (agent.py)"""
+        message = {
+            "client_id": self.client_id,
+            **weight.to_wire()
+        }
+        if self.branch is not None:
+            message["branch"] = self.branch
+        if self.branch_prefix is not None:
+            message["branch_prefix"] = self.branch_prefix
+        return message
+    
+    def build_stats_message(self):
+        """สร้างข้อความ stats (ตัวนับของ read path) สำหรับส่งไป server (agent.py)"""
+        return build_stats_message(self.client_id, self.decoder)
+    
+    async def send_stats_loop(self):
+        """ส่ง stats ทุก stats_interval วินาที (เพื่อหาเครื่องชั่งที่ตั้งค่าผิดและเสีย CPU กับข้อมูลที่ parse ไม่ได้)"""
+        interval = self.emission_config.get('stats_interval', 0)
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            if self.websocket:
+                await self.websocket.send(json.dumps(self.build_stats_message()))
     
     async def send_weight_to_server(self):
-        """ส่งข้อมูลน้ำหนักไปยัง server"""
+        """ส่งข้อมูลน้ำหนักไปยัง server เมื่อค่าเปลี่ยนเกิน sensitivity หรือถึงเวลา heartbeat (ดู emission_policy.py)"""
+        # server ใหม่ยังไม่มีค่าของเครื่องนี้ - ส่งค่าล่าสุดทันทีหลังเชื่อมต่อ
+        self.emission.reset()
+        self.emission.offer(self.last_weight)
         while True:
             try:
                 if self.websocket:
-                    weight = self.read_weight_from_rs232()
-                    message = {
-                        "client_id": CLIENT_ID,
-                        "weight": weight,
-                        "timestamp": time.time()
-                    }
+                    try:
+                        reading_ts, weight = await asyncio.wait_for(self.weight_queue.get(),
+                                                                    timeout=self.emission.time_until_due())
+                        self.emission.offer(weight)
+                    except asyncio.TimeoutError:
+                        pass
+                    weight = self.emission.poll()
+                    if weight is None:
+                        continue
+                    message = self.build_weight_message(weight)
                     await self.websocket.send(json.dumps(message))
-                    print(f"Client {CLIENT_ID}: Sent weight {weight}")
-                await asyncio.sleep(0.5)
+                    self.emission.mark_sent(weight)
+                    print(f"Client {self.client_id}: Sent weight {weight.to_text()}")
+                else:
+                    await asyncio.sleep(0.5)
             except Exception as e:
-                print(f"Client {CLIENT_ID}: Error sending data: {e}")
+                print(f"Client {self.client_id}: Error sending data: {e}")
                 await asyncio.sleep(1)
     
     async def connect_to_server(self):
         """เชื่อมต่อไปยัง WebSocket server"""
         while True:
             try:
-                print(f"Client {CLIENT_ID}: Connecting to server {SERVER_WEBSOCKET_URL}")
+                print(f"Client {self.client_id}: Connecting to server {SERVER_WEBSOCKET_URL}")
                 async with websockets.connect(SERVER_WEBSOCKET_URL) as websocket:
                     self.websocket = websocket
-                    print(f"Client {CLIENT_ID}: Connected to server")
+                    print(f"Client {self.client_id}: Connected to server")
+                    # บอก agent.py ว่าเป็นเครื่องชั่ง (ไม่ต้องส่ง broadcast กลับมา)
+                    await websocket.send(json.dumps(build_hello_message(self.client_id)))
                     
-                    # ส่งข้อมูลน้ำหนักไปยัง server
-                    await self.send_weight_to_server()
+                    # ส่งข้อมูลน้ำหนักไปยัง server (และ stats เป็นระยะ)
+                    stats_task = asyncio.create_task(self.send_stats_loop())
+                    try:
+                        await self.send_weight_to_server()
+                    finally:
+                        stats_task.cancel()
                     
             except Exception as e:
-                print(f"Client {CLIENT_ID}: Connection error: {e}")
+                print(f"Client {self.client_id}: Connection error: {e}")
                 self.websocket = None
                 await asyncio.sleep(5)  # รอ 5 วินาทีก่อนเชื่อมต่อใหม่
     
     async def run(self):
         """เริ่มต้นการทำงานของ client"""
+        self.weight_queue = asyncio.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        self.start_serial_reader()
         await self.connect_to_server()
 
 if __name__ == '__main__':
-    client = RS232Client()
+    arg_parser = argparse.ArgumentParser(description="RS232 scale client (headless)")
+    arg_parser.add_argument('--capture', metavar='FILE',
+                            help="record raw serial bytes to FILE (replay with serial_capture.py)")
+    args = arg_parser.parse_args()
+    
+    client = RS232Client(capture_path=args.capture)
     try:
         asyncio.run(client.run())
     except KeyboardInterrupt:
-        print(f"Client {CLIENT_ID}: Stopped.")
\ No newline at end of file
+        print(f"Client {client.client_id}: Stopped.")
+    finally:
+        client.stop_capture()
\ No newline at end of file
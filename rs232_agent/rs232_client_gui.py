@@ -2,13 +2,14 @@ import asyncio
 import websockets
 import json
 import serial
-import time
 import configparser
+import multiprocessing
 import os
+import queue
 import re
 import threading
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 from datetime import datetime
 import serial.tools.list_ports
 import webbrowser
@@ -16,6 +17,23 @@ import sys
 from PIL import Image, ImageTk
 import pystray
 from pystray import MenuItem as item
+from branch_config import BRANCH_CONFIG, get_branch_prefix
+from serial_framer import (FRAMING_MODES, default_framing_config, load_framing_config,
+                           save_framing_config, make_framer)
+from serial_reader import SerialReaderThread, DEFAULT_QUEUE_SIZE
+from serial_tap import SerialTap
+from serial_process import (PROCESS_MODE, SerialProcessReader, default_reader_config, load_reader_config,
+                            save_reader_config)
+from serial_connection import SerialConnectionManager, CONNECTED, RETRYING, GONE
+from scale_patterns import CompiledPatternSet
+from scale_protocol import (SCALE_PATTERNS, RAW_PATTERN, DEFAULT_PATTERN, AUTO_PATTERN, ScaleDecoder,
+                            WeightReading, build_hello_message, build_stats_message, compile_pattern,
+                            compile_scale_patterns, format_cache_key, parse_scale_text)
+from serial_capture import CaptureWriter, ReplaySource, default_capture_path, CAPTURE_EXTENSION
+from emission_policy import (default_emission_config, load_emission_config, save_emission_config,
+                             make_emission_policy)
+from stability_detector import (STABLE, ZERO, default_stability_config, load_stability_config,
+                                save_stability_config, make_stability_detector)
 # ลบ import ที่เกี่ยวข้องกับ Offline Mode ออกแล้ว
 
 # Configuration
@@ -32,84 +50,13 @@ DEFAULT_STOP_BITS = "1"
 DEFAULT_BYTE_SIZE = "7"   # เปลี่ยนจาก 8 เป็น 7 ตาม HyperTerminal
 DEFAULT_READ_TIMEOUT = 1.0  # เพิ่มจาก 0.05 เป็น 1.0 วินาที
 DEFAULT_SENSITIVITY = 0.1  # ความไวในการอ่านน้ำหนัก (kg)
+HEALTH_STATUS_INTERVAL_MS = 1000  # อัปเดตแถบตัวนับของ read path ทุก 1 วินาที
+READER_PROCESS_POLL_MS = 100  # อ่านค่าล่าสุดจาก reader ใน process แยก ([Reader] mode = process)
+UI_QUEUE_POLL_MS = 50  # ทำงานที่ thread อื่นส่งมาให้ Tk thread (log, label น้ำหนัก, stability)
 
 # Branch Configuration
-BRANCH_CONFIG = {
-    'สาขา 1 (SPS)': 'Z4',
-    'สาขา 2 (OPS)': 'Z2',
-    'สาขา 3 (SPN)': 'Z5',
-    'สำนักงานใหญ่ P8': 'Z1',
-    'สำนักงานใหญ่ P3': 'Z3',
-    'โอเชี่ยนไพพ์ (OCP)': 'Z6',
-    'มาลีค้าเหล็ก(มาลี)': 'Z7',
-    'สาขาลพบุรี': 'DYNAMIC'  # จะใช้ปี พ.ศ. 2 ตัวสุดท้าย
-}
-
+# รายชื่อสาขาอยู่ใน branch_config.BRANCH_CONFIG (ใช้ร่วมกับ agent.py)
 
-# Scale Pattern Configuration - รองรับหลายรุ่น/ยี่ห้อ
-SCALE_PATTERNS = {
-    'Raw Data (No Parse)': [
-        ("RAW", r".*", False),  # รับข้อมูลทั้งหมดโดยไม่ parse
-    ],
-    'Default': [
-        ("1CH", r"1CH\s+(0{3,})", True),
-        (" H ", r"\sH\s+(0{3,})", True),
-        ("1Rh", r"1Rh\s+(0{3,})", True),
-        ("1BH", r"1BH\s+(\d+)", False),
-        ("1@H", r"1@H\s+(\d+)", False),
-    ],
-    'CAS Scale': [
-        ("CAS", r"CAS\s+(\d+)", False),
-        ("CAS", r"CAS\s+(0{3,})", True),
-        ("ST", r"ST\s+(\d+)", False),
-        ("ST", r"ST\s+(0{3,})", True),
-    ],
-    'ST,GS Format': [
-        ("ST,GS", r"(ST),GS,\+([0-9]+\.?[0-9]*)kg", False),  # น้ำหนัก Stable เช่น ST,GS,+123.4kg
-        ("US,GS", r"(US),GS,\+([0-9]+\.?[0-9]*)kg", False),  # น้ำหนัก Unstable เช่น US,GS,+123.4kg
-        ("ST,GS", r"(ST),GS,\+0{3,}\.?0*kg", True),          # น้ำหนัก 0 Stable เช่น ST,GS,+00000.0kg
-        ("US,GS", r"(US),GS,\+0{3,}\.?0*kg", True),          # น้ำหนัก 0 Unstable เช่น US,GS,+00000.0kg
-        # เพิ่ม pattern สำหรับข้อมูลที่อาจถูกตัดขาด
-        ("ST,GS", r"(ST),GS,\+([0-9]+\.?[0-9]*)$", False),   # น้ำหนัก Stable ที่ถูกตัดขาด
-        ("US,GS", r"(US),GS,\+([0-9]+\.?[0-9]*)$", False),   # น้ำหนัก Unstable ที่ถูกตัดขาด
-        ("ST,GS", r"(ST),GS,\+0{3,}\.?0*$", True),           # น้ำหนัก 0 Stable ที่ถูกตัดขาด
-        ("US,GS", r"(US),GS,\+0{3,}\.?0*$", True),           # น้ำหนัก 0 Unstable ที่ถูกตัดขาด
-        # เพิ่ม pattern สำหรับค่าติดลบ
-        ("ST,GS", r"(ST),GS,-([0-9]+\.?[0-9]*)kg", False),   # น้ำหนัก Stable ติดลบ เช่น ST,GS,-123.4kg
-        ("US,GS", r"(US),GS,-([0-9]+\.?[0-9]*)kg", False),   # น้ำหนัก Unstable ติดลบ เช่น US,GS,-123.4kg
-        ("ST,GS", r"(ST),GS,-0{3,}\.?0*kg", True),           # น้ำหนัก 0 Stable ติดลบ เช่น ST,GS,-00000.0kg
-        ("US,GS", r"(US),GS,-0{3,}\.?0*kg", True),           # น้ำหนัก 0 Unstable ติดลบ เช่น US,GS,-00000.0kg
-        # เพิ่ม pattern สำหรับค่าติดลบที่ถูกตัดขาด
-        ("ST,GS", r"(ST),GS,-([0-9]+\.?[0-9]*)$", False),    # น้ำหนัก Stable ติดลบที่ถูกตัดขาด
-        ("US,GS", r"(US),GS,-([0-9]+\.?[0-9]*)$", False),    # น้ำหนัก Unstable ติดลบที่ถูกตัดขาด
-        ("ST,GS", r"(ST),GS,-0{3,}\.?0*$", True),            # น้ำหนัก 0 Stable ติดลบที่ถูกตัดขาด
-        ("US,GS", r"(US),GS,-0{3,}\.?0*$", True),            # น้ำหนัก 0 Unstable ติดลบที่ถูกตัดขาด
-        # เพิ่ม pattern สำหรับข้อมูลที่ถูกตัดขาดมาก
-        ("ST,GS", r"(ST),GS,-$", True),                       # ST,GS,- (น้ำหนัก 0)
-        ("US,GS", r"(US),GS,-$", True),                       # US,GS,- (น้ำหนัก 0)
-    ],
-    'Mettler Toledo': [
-        ("MT", r"MT\s+(\d+)", False),
-        ("MT", r"MT\s+(0{3,})", True),
-        ("WT", r"WT\s+(\d+)", False),
-        ("WT", r"WT\s+(0{3,})", True),
-    ],
-    'Sartorius': [
-        ("SA", r"SA\s+(\d+)", False),
-        ("SA", r"SA\s+(0{3,})", True),
-        ("WE", r"WE\s+(\d+)", False),
-        ("WE", r"WE\s+(0{3,})", True),
-    ],
-    'Custom Pattern 1': [
-        ("CUSTOM1", r"CUSTOM1\s+(\d+)", False),
-        ("CUSTOM1", r"CUSTOM1\s+(0{3,})", True),
-    ],
-    'Custom Pattern 2': [
-        ("CUSTOM2", r"CUSTOM2\s+(\d+)", False),
-        ("CUSTOM2", r"CUSTOM2\s+(0{3,})", True),
-    ],
-    'Custom Pattern 3': []  # จะถูกเติมด้วยข้อมูลจากผู้ใช้
-}
 
 # Helper mappings
 parity_map = {
@@ -131,25 +78,52 @@ class RS232ClientGUI:
         self.root.title(f"RS232 Scale Client - {CLIENT_ID}")
         self.root.geometry("980x750") # ปรับขนาดหน้าต่างให้เหมาะสม
         self.root.configure(bg='#f0f0f0')
+        # Tk ไม่ thread-safe: thread อื่น (reader, websocket loop, process reader) ส่งงาน UI ผ่าน ui_queue
+        self.ui_thread = threading.current_thread()
+        self.ui_queue = queue.Queue()
         
         # Client variables
         self.serial_config = self.load_config()
-        self.serial_connection = None
-        self.read_buffer = b''
-        self.STX = b'\x02'
-        self.ETX = b'\x03'
-        self.last_weight = "0"
+        compile_scale_patterns()
+        # เปิด serial port ผ่าน connection manager (backoff + ตรวจจับการถอด/เสียบ port)
+        self.serial_manager = SerialConnectionManager(log=self.log_message,
+                                                      on_state_change=self.on_serial_state_change)
+        try:
+            framer = make_framer(self.framing_config)
+        except ValueError as e:
+            print(f"Invalid framing config: {e}. Using line framing.")
+            self.framing_config = default_framing_config('line')
+            framer = make_framer(self.framing_config)
+        # framer + Pattern + Sensitivity ชุดเดียวกับ rs232_client / rs232_config_tester (ดู scale_protocol.py)
+        # Pattern ที่เลือกถูกตั้งตอนเริ่ม reader (reset_format_detection)
+        self.decoder = ScaleDecoder(framer, AUTO_PATTERN, self.serial_config['sensitivity'], log=self.log_message)
+        self.capture_writer = None  # บันทึก bytes ดิบลงไฟล์ (ปุ่ม Record Raw)
+        # reader ตัวเดียวเป็นเจ้าของ port - monitor / recorder / เครื่องมือ debug รับ bytes จาก tap นี้
+        self.tap = SerialTap(self.ingest_serial_bytes, log=self.log_message)
+        self.realtime_subscription = None
+        self.last_weight = WeightReading()  # ค่าน้ำหนักล่าสุด (เริ่มต้น 0 kg)
+        # ตัดสินว่าน้ำหนักนิ่งหรือไม่ (สร้างใหม่ตอนเริ่ม reader เพื่อใช้ Sensitivity ล่าสุด)
+        self.stability = make_stability_detector(self.stability_config, self.serial_config['sensitivity'])
         self.websocket = None
         self.is_connected = False
         self.is_running = False
         self.loop = None
         
+        # Serial reader (thread หรือ process แยก ตาม [Reader]) และ queue ของค่าน้ำหนักสำหรับ send_weight_loop
+        self.serial_reader = None
+        self.weight_queue = None
+        self.reader_process_seq = 0
+        self.serial_state = None  # state ล่าสุดของ port (จาก connection manager หรือ reader ใน process แยก)
+        
         # Tray variables
         self.tray_icon = None
         self.is_minimized_to_tray = False
         
         # Sensitivity variable
+        # ค่าจากหน้าจอที่ reader thread ใช้ - copy จาก Tk variable ใน Tk thread (ดู sync_reader_settings)
         self.sensitivity = DEFAULT_SENSITIVITY
+        self.selected_pattern = AUTO_PATTERN
+        self.format_cache_key = None
         
         # GUI variables
         self.port_var = tk.StringVar(value=self.serial_config['port'])
@@ -162,11 +136,17 @@ class RS232ClientGUI:
         self.server_url_var = tk.StringVar(value=SERVER_WEBSOCKET_URL)
         self.client_id_var = tk.StringVar(value=CLIENT_ID)
         self.branch_var = tk.StringVar(value='สำนักงานใหญ่ P8')  # Default branch
-        self.scale_pattern_var = tk.StringVar(value='Raw Data (No Parse)')  # เปลี่ยนเป็น Raw Data
+        self.scale_pattern_var = tk.StringVar(value=AUTO_PATTERN)  # ตรวจรูปแบบเองจาก frame ช่วงแรก
         # Custom Pattern 3 variables
         self.custom_pattern_prefix_var = tk.StringVar(value="CUSTOM3")
         self.custom_pattern_regex_var = tk.StringVar(value=r"CUSTOM3\s+(\d+)")
         self.custom_pattern_is_zero_var = tk.BooleanVar(value=False)
+        self.framing_mode_var = tk.StringVar(value=self.framing_config['mode'])
+        for var in (self.sensitivity_var, self.scale_pattern_var, self.framing_mode_var, self.port_var,
+                    self.baudrate_var, self.parity_var, self.stopbits_var, self.bytesize_var, self.timeout_var,
+                    self.branch_var, self.server_url_var, self.client_id_var):
+            var.trace_add('write', self.sync_reader_settings)
+        self.sync_reader_settings()
         
         # สร้าง UI ก่อน
         self.setup_ui()
@@ -184,6 +164,50 @@ class RS232ClientGUI:
         
         # ตรวจสอบสถานะ Serial port หลังจากเริ่มต้น
         self.root.after(1000, self.test_connection_status)  # ตรวจสอบหลังจาก 1 วินาที
+        self.root.after(HEALTH_STATUS_INTERVAL_MS, self.update_health_status)
+        self.root.after(READER_PROCESS_POLL_MS, self.poll_reader_process)
+        self.root.after(UI_QUEUE_POLL_MS, self.process_ui_queue)
+        
+    def is_ui_thread(self):
+        return threading.current_thread() is self.ui_thread
+        
+    def run_on_ui_thread(self, func, *args):
+        """เรียก func ใน Tk thread (เรียกทันทีถ้าอยู่ใน Tk thread อยู่แล้ว ไม่งั้นส่งผ่าน ui_queue)"""
+        if self.is_ui_thread():
+            func(*args)
+        else:
+            self.ui_queue.put((func, args))
+        
+    def process_ui_queue(self):
+        """ทำงานที่ thread อื่นส่งมา (เรียกซ้ำทุก UI_QUEUE_POLL_MS)"""
+        try:
+            while True:
+                func, args = self.ui_queue.get_nowait()
+                try:
+                    func(*args)
+                except Exception as e:
+                    print(f"UI update error: {e}")
+        except queue.Empty:
+            pass
+        self.root.after(UI_QUEUE_POLL_MS, self.process_ui_queue)
+        
+    def sync_reader_settings(self, *args):
+        """
+        copy การตั้งค่า serial / Pattern / Sensitivity / key ของ cache รูปแบบ / สาขา / server จาก Tk variable
+        เป็น attribute ธรรมดา (trace ของ Tk variable - ทำงานใน Tk thread)
+        reader thread และ asyncio thread อ่านเฉพาะ attribute เหล่านี้ ไม่เรียก Tk จาก thread อื่น
+        """
+        self.sensitivity = self.get_sensitivity()
+        self.selected_pattern = self.scale_pattern_var.get()
+        self.format_cache_key = self.get_format_cache_key()
+        try:
+            self.serial_settings = self.read_serial_settings()
+        except ValueError:
+            # ระหว่างพิมพ์ค่าอาจยังไม่ครบ - แจ้งเตือนตอนเชื่อมต่อ (get_serial_connection)
+            self.serial_settings = None
+        self.branch_name = self.branch_var.get()
+        self.server_url = self.server_url_var.get().strip()
+        self.client_id = self.client_id_var.get()
         
     def setup_ui(self):
         """สร้าง UI"""
@@ -274,7 +298,7 @@ class RS232ClientGUI:
         # Scale pattern selection
         ttk.Label(scale_frame, text="Scale Pattern:", font=('Tahoma', 8)).grid(row=0, column=0, sticky=tk.W, padx=(0, 8))
         scale_pattern_combo = ttk.Combobox(scale_frame, textvariable=self.scale_pattern_var, 
-                                         values=list(SCALE_PATTERNS.keys()), width=20, font=('Tahoma', 8))
+                                         values=[AUTO_PATTERN] + list(SCALE_PATTERNS.keys()), width=20, font=('Tahoma', 8))
         scale_pattern_combo.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=3)
         
         # Scale pattern info (ซ่อนไว้)
@@ -285,6 +309,13 @@ class RS232ClientGUI:
         # Bind scale pattern selection change
         scale_pattern_combo.bind('<<ComboboxSelected>>', self.on_scale_pattern_change)
         
+        # Framing mode (รายละเอียดอื่นๆ ตั้งใน [Framing] ของ client_config.ini)
+        ttk.Label(scale_frame, text="Framing:", font=('Tahoma', 8)).grid(row=2, column=0, sticky=tk.W, padx=(0, 8))
+        framing_combo = ttk.Combobox(scale_frame, textvariable=self.framing_mode_var, state='readonly',
+                                     values=list(FRAMING_MODES), width=20, font=('Tahoma', 8))
+        framing_combo.grid(row=2, column=1, sticky=(tk.W, tk.E), pady=3)
+        framing_combo.bind('<<ComboboxSelected>>', self.on_framing_mode_change)
+        
         # Custom Pattern 3 Configuration Frame
         custom_frame = ttk.LabelFrame(left_panel, text="Custom Pattern 3 Configuration", padding="8")
         custom_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 8))
@@ -395,6 +426,11 @@ class RS232ClientGUI:
                                     font=('Tahoma', 11, 'bold'))
         self.weight_label.grid(row=0, column=2, sticky=tk.E)
         
+        # ตัวนับของ read path (bytes / frames / parse ไม่ได้ / bytes ที่ทิ้ง) - ดู ScaleDecoder.stats()
+        self.health_label = ttk.Label(status_indicators_frame, text="📊 Read: -", font=('Tahoma', 8),
+                                      foreground='gray')
+        self.health_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=(3, 0))
+        
         # Log area
         log_frame = ttk.Frame(status_frame)
         log_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -520,6 +556,12 @@ class RS232ClientGUI:
         
         pattern_test_btn = ttk.Button(debug_frame, text="🔍 Test Pattern", command=self.test_pattern_parsing)
         pattern_test_btn.grid(row=0, column=1, padx=2, sticky=tk.EW)
+        
+        self.capture_btn = ttk.Button(debug_frame, text="⏺️ Record Raw", command=self.toggle_capture)
+        self.capture_btn.grid(row=1, column=0, padx=2, pady=(3, 0), sticky=tk.EW)
+        
+        replay_btn = ttk.Button(debug_frame, text="⏯️ Replay Capture", command=self.replay_capture)
+        replay_btn.grid(row=1, column=1, padx=2, pady=(3, 0), sticky=tk.EW)
 
         # Update displays and right_panel column weights
         right_panel.columnconfigure(0, weight=1)
@@ -669,10 +711,17 @@ class RS232ClientGUI:
                 messagebox.showwarning("Warning", "Please fill in both Prefix and Regex Pattern fields.")
                 return
             
+            # ตรวจ regex ก่อนใช้งาน (compile ครั้งเดียวตอนนี้ ไม่ใช่ทุก frame)
+            entries = [(prefix, regex_pattern, is_zero)]
+            try:
+                CompiledPatternSet('Custom Pattern 3', entries)
+            except re.error as e:
+                messagebox.showerror("Error", f"Invalid regex pattern: {e}")
+                return
+            
             # อัปเดต Custom Pattern 3
-            SCALE_PATTERNS['Custom Pattern 3'] = [
-                (prefix, regex_pattern, is_zero)
-            ]
+            SCALE_PATTERNS['Custom Pattern 3'] = entries
+            compile_pattern('Custom Pattern 3')
             
             self.log_message(f"Custom Pattern 3 updated: {prefix} -> {regex_pattern} (Zero: {is_zero})")
             self.update_scale_pattern_info()
@@ -699,9 +748,10 @@ class RS232ClientGUI:
         if not self.check_websocket_connection():
             self.log_message("Attempting to reconnect WebSocket...")
             try:
-                server_url = self.server_url_var.get().strip()
+                server_url = self.server_url
                 if server_url:
                     self.websocket = await websockets.connect(server_url)
+                    await self.websocket.send(json.dumps(build_hello_message(self.client_id)))
                     self.is_connected = True
                     self.log_message("WebSocket reconnected successfully")
                     return True
@@ -717,15 +767,58 @@ class RS232ClientGUI:
         
     def on_scale_pattern_change(self, event=None):
         """เมื่อมีการเปลี่ยน Scale Pattern"""
+        if self.scale_pattern_var.get() == AUTO_PATTERN:
+            self.reset_format_detection()
+        else:
+            try:
+                compile_pattern(self.scale_pattern_var.get())
+            except re.error as e:
+                self.log_message(f"Invalid regex in pattern {self.scale_pattern_var.get()}: {e}")
         self.update_scale_pattern_info()
         self.log_message(f"Scale pattern changed to: {self.scale_pattern_var.get()}")
         
+    def on_framing_mode_change(self, event=None):
+        """เมื่อมีการเปลี่ยน Framing mode - สร้าง framer ใหม่ (ข้อมูลที่ค้างอยู่ถูกทิ้ง)"""
+        settings = dict(self.framing_config, mode=self.framing_mode_var.get())
+        try:
+            framer = make_framer(settings)
+        except ValueError as e:
+            self.log_message(f"Invalid framing config: {e}")
+            self.framing_mode_var.set(self.framing_config['mode'])
+            return
+        self.framing_config = settings
+        self.decoder.reset()
+        self.decoder.framer = framer
+        self.log_message(f"Framing mode changed to: {settings['mode']}")
+        self.reset_format_detection()
+        
     def update_branch_prefix_display(self):
         """อัปเดตการแสดง Prefix ของสาขา"""
         selected_branch = self.branch_var.get()
         prefix = self.get_branch_prefix(selected_branch)
         self.branch_prefix_label.config(text=f"Prefix: {prefix}")
         
+    def get_format_cache_key(self):
+        """key ของ cache รูปแบบเครื่องชั่ง (port + การตั้งค่า serial + framing)"""
+        return format_cache_key({
+            'port': self.port_var.get(),
+            'baudrate': self.baudrate_var.get(),
+            'parity': self.get_parity_key(),
+            'stopbits': self.get_stopbits_key(),
+            'bytesize': self.get_bytesize_key(),
+        }, self.framing_mode_var.get())
+    
+    def reset_format_detection(self):
+        """ตั้ง Pattern ที่เลือกให้ decoder - Auto Detect เริ่มตรวจใหม่ (ใช้ Pattern จาก cache ถ้าเคยตรวจ port + การตั้งค่านี้แล้ว)"""
+        self.decoder.set_pattern(self.selected_pattern, self.format_cache_key)
+    
+    def get_active_pattern(self):
+        """Pattern ที่ใช้ parse จริง (โหมด Auto Detect = Pattern ที่ตรวจได้ หรือ Default ถ้ายังไม่ได้)"""
+        pattern_name = self.selected_pattern
+        if pattern_name == AUTO_PATTERN:
+            return self.get_stats_source().active_pattern or DEFAULT_PATTERN
+        return pattern_name
+    
     def update_scale_pattern_info(self):
         """อัปเดตการแสดงข้อมูล Scale Pattern (ซ่อนไว้)"""
         # ซ่อนการแสดงรายละเอียด patterns
@@ -734,21 +827,14 @@ class RS232ClientGUI:
     # toggle_offline_mode function ถูกลบออกแล้ว - ใช้งาน Online Mode เท่านั้น
         
     def get_branch_prefix(self, branch_name):
-        """ดึง Prefix ของสาขา"""
-        if branch_name not in BRANCH_CONFIG:
-            return 'Z1'  # Default
-            
-        prefix = BRANCH_CONFIG[branch_name]
-        
-        # สำหรับสาขาลพบุรี ใช้ปี พ.ศ. 2 ตัวสุดท้าย
-        if prefix == 'DYNAMIC':
-            current_year = datetime.now().year + 543  # แปลงเป็นปี พ.ศ.
-            return str(current_year)[-2:]  # เอา 2 ตัวสุดท้าย
-            
-        return prefix
+        """ดึง Prefix ของสาขา (ไม่รู้จักชื่อสาขา = Z1, สาขาลพบุรี = ปี พ.ศ. 2 ตัวสุดท้าย)"""
+        return get_branch_prefix(branch_name)
         
     def log_message(self, message):
-        """เพิ่มข้อความลงใน log"""
+        """เพิ่มข้อความลงใน log (เรียกจาก thread ใดก็ได้)"""
+        if not self.is_ui_thread():
+            self.ui_queue.put((self.log_message, (message,)))
+            return
         try:
             timestamp = datetime.now().strftime("%H:%M:%S")
             log_entry = f"[{timestamp}] {message}\n"
@@ -766,16 +852,16 @@ class RS232ClientGUI:
             print(f"Clear log error: {e}")
     
     def toggle_realtime_monitoring(self):
-        """เปิด/ปิดการ monitor ข้อมูล real-time"""
+        """เปิด/ปิดการ monitor ข้อมูล real-time (รับ bytes ดิบจาก reader ตัวเดียวกับ production ผ่าน tap)"""
         try:
             if not self.realtime_monitoring_active:
                 self.log_message("Attempting to start real-time monitoring...")
-                ser = self.get_serial_connection()
-                if not ser or not ser.is_open:
+                if not self.ensure_serial_reader():
                     messagebox.showwarning("Warning", "Serial connection not available or not open!")
                     self.log_message("Failed to start monitoring: Serial connection is not open.")
                     return
                 
+                self.realtime_subscription = self.tap.subscribe('realtime')
                 self.realtime_monitoring_active = True
                 self.realtime_monitor_btn.config(text="⏸️ Stop Monitoring")
                 self.realtime_info_label.config(text="📊 Monitoring...", foreground='green')
@@ -789,23 +875,31 @@ class RS232ClientGUI:
                 if self.realtime_update_timer:
                     self.root.after_cancel(self.realtime_update_timer)
                     self.realtime_update_timer = None
+                self.close_realtime_subscription()
         except Exception as e:
             self.log_message(f"Error in toggle_realtime_monitoring: {e}")
 
+    def close_realtime_subscription(self):
+        """เลิกรับข้อมูลของ real-time monitor และหยุด reader ถ้าไม่มีใครใช้แล้ว"""
+        subscription = self.realtime_subscription
+        self.realtime_subscription = None
+        if subscription:
+            if subscription.dropped:
+                self.log_message(f"Real-time monitor skipped {subscription.dropped} chunks (display too slow)")
+            subscription.close()
+        self.release_serial_reader()
+
     def start_realtime_reading(self):
-        """เริ่มการอ่านข้อมูล real-time"""
-        if not self.realtime_monitoring_active:
+        """แสดง chunk ที่ reader ส่งมาทาง tap ทุก 200ms (ไม่อ่าน serial port เอง)"""
+        if not self.realtime_monitoring_active or self.realtime_subscription is None:
             return
         
         try:
-            ser = self.get_serial_connection()
-            if ser and ser.in_waiting > 0:
-                new_bytes = ser.read(ser.in_waiting)
-                if new_bytes:
-                    self.log_message(f"Read {len(new_bytes)} bytes from serial port.")
-                    self.add_realtime_data(new_bytes)
-                else:
-                    self.log_message("in_waiting > 0 but read() returned no bytes.")
+            chunks = self.realtime_subscription.drain()
+            for timestamp, data in chunks:
+                self.add_realtime_data(data)
+            if chunks:
+                self.update_realtime_text()
             
             self.realtime_update_timer = self.root.after(200, self.start_realtime_reading)
             
@@ -814,6 +908,7 @@ class RS232ClientGUI:
             self.realtime_monitoring_active = False
             self.realtime_monitor_btn.config(text="▶️ Start Monitoring")
             self.realtime_info_label.config(text="⚠️ Error! Monitoring stopped.", foreground='red')
+            self.close_realtime_subscription()
 
     def clear_realtime_data(self):
         """ล้างข้อมูล real-time"""
@@ -905,33 +1000,8 @@ class RS232ClientGUI:
             if len(self.realtime_data_buffer) > max_lines:
                 self.realtime_data_buffer = self.realtime_data_buffer[-max_lines:]
             
-            # อัปเดตการแสดงผล
-            self.update_realtime_text()
-            
-            # Auto-scroll ถ้าเปิดใช้งาน
-            if self.auto_scroll_var.get():
-                self.realtime_text.see(tk.END)
-            
-            # ลอง parse ข้อมูลใหม่
-            try:
-                decoded = data_bytes.decode('latin-1', errors='ignore')
-                lines = []
-                for line in decoded.split('\r\n'):
-                    lines.extend(line.split('\n'))
-                
-                # ตรวจสอบทุกบรรทัด
-                for line in lines:
-                    line = line.strip()
-                    if line:
-                        parsed_value = self.parse_scale_data(line)
-                        if parsed_value != "N/A":
-                            self.last_weight = parsed_value
-                            self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                            # ไม่ log ทุกครั้งเพื่อลด spam
-                            break
-            except Exception as e:
-                # ไม่เป็นไรถ้า parse ไม่ได้
-                pass
+            # การแสดงผลทำใน start_realtime_reading ครั้งเดียวต่อรอบ
+            # การ parse น้ำหนักทำใน ingest_serial_bytes ที่เดียว
                 
         except Exception as e:
             self.log_message(f"Add real-time data error: {e}")
@@ -1079,12 +1149,21 @@ class RS232ClientGUI:
             # เก็บข้อมูล config เพิ่มเติมสำหรับโหลดทีหลัง
             self.config_data = {
                 'branch': 'สำนักงานใหญ่ P8',
-                'scale_pattern': 'Raw Data (No Parse)',
+                'scale_pattern': AUTO_PATTERN,
                 'custom_prefix': 'CUSTOM3',
                 'custom_regex': r'CUSTOM3\s+(\d+)',
                 'custom_iszero': False
             }
             
+            # รูปแบบ frame ของเครื่องชั่ง (section [Framing]) - ค่าเริ่มต้นตัดตามบรรทัด
+            self.framing_config = default_framing_config('line')
+            # เงื่อนไขการส่งค่าไป server (section [Emission])
+            self.emission_config = default_emission_config()
+            # การตัดสินว่าน้ำหนักนิ่ง (section [Stability])
+            self.stability_config = default_stability_config()
+            # อ่าน port ด้วย thread หรือ process แยก (section [Reader])
+            self.reader_config = default_reader_config()
+            
             # ตรวจสอบไฟล์ config ใน path ของโปรแกรม
             config_paths = [
                 CLIENT_CONFIG_FILE,  # ไฟล์ในโฟลเดอร์ปัจจุบัน
@@ -1116,7 +1195,7 @@ class RS232ClientGUI:
                             # Load scale pattern configuration
                             if 'ScaleConfig' in config:
                                 scale_section = config['ScaleConfig']
-                                self.config_data['scale_pattern'] = scale_section.get('Pattern', 'Raw Data (No Parse)')
+                                self.config_data['scale_pattern'] = scale_section.get('Pattern', AUTO_PATTERN)
                                 
                             # Load custom pattern 3 configuration
                             if 'CustomPattern3Config' in config:
@@ -1125,6 +1204,19 @@ class RS232ClientGUI:
                                 self.config_data['custom_regex'] = custom_section.get('Regex', r'CUSTOM3\s+(\d+)')
                                 self.config_data['custom_iszero'] = custom_section.getboolean('IsZero', False)
                             
+                            # Load framing configuration
+                            self.framing_config = load_framing_config(config, default_mode='line')
+                            
+                            # Load emission configuration (heartbeat / max rate)
+                            self.emission_config = load_emission_config(
+                                config, sensitivity=loaded_settings['sensitivity'])
+                            
+                            # Load stability configuration (window / tolerance)
+                            self.stability_config = load_stability_config(config)
+                            
+                            # Load reader configuration (thread / process)
+                            self.reader_config = load_reader_config(config)
+                            
                             config_loaded = True
                             print(f"Config loaded from: {config_path}")
                             break
@@ -1147,6 +1239,10 @@ class RS232ClientGUI:
             }
         except Exception as e:
             print(f"Load config error: {e}")
+            self.framing_config = default_framing_config('line')
+            self.emission_config = default_emission_config()
+            self.stability_config = default_stability_config()
+            self.reader_config = default_reader_config()
             return {
                 'port': DEFAULT_SERIAL_PORT,
                 'baudrate': DEFAULT_BAUD_RATE,
@@ -1190,6 +1286,18 @@ class RS232ClientGUI:
                 'IsZero': str(self.custom_pattern_is_zero_var.get())
             }
             
+            # Save framing configuration
+            save_framing_config(config, self.framing_config)
+            
+            # Save emission configuration
+            save_emission_config(config, self.emission_config)
+            
+            # Save stability configuration
+            save_stability_config(config, self.stability_config)
+            
+            # Save reader configuration
+            save_reader_config(config, self.reader_config)
+            
             # บันทึกไฟล์ในโฟลเดอร์โปรแกรม
             config_path = os.path.join(os.path.dirname(sys.executable), CLIENT_CONFIG_FILE)
             if not os.path.exists(os.path.dirname(config_path)):
@@ -1207,7 +1315,7 @@ class RS232ClientGUI:
             messagebox.showerror("Error", f"Failed to save configuration: {e}")
             
     def test_serial_connection(self):
-        """ทดสอบการเชื่อมต่อ Serial"""
+        """ทดสอบการเชื่อมต่อ Serial (เปิดผ่าน connection manager - ไม่เปิด port ซ้ำกับ reader)"""
         try:
             test_config = {
                 'port': self.port_var.get(),
@@ -1221,37 +1329,42 @@ class RS232ClientGUI:
             self.log_message(f"Testing connection to {test_config['port']}...")
             self.log_message(f"Config: {test_config['port']}, {test_config['baudrate']}, {self.parity_var.get()}, {self.stopbits_var.get()}, {self.bytesize_var.get()}")
             
-            with serial.Serial(**test_config) as test_ser:
-                if test_ser.is_open:
-                    self.log_message("Serial connection test successful!")
-                    self.serial_status_label.config(text="🟢 Serial: Test OK")
-                    
-                    # แนะนำให้เปิด real-time monitoring
-                    result = messagebox.askyesno("Test Successful", 
-                                               "Serial connection test successful!\n\n"
-                                               "Would you like to start real-time monitoring\n"
-                                               "to see the data from the scale?")
-                    if result:
-                        self.toggle_realtime_monitoring()
-                else:
-                    self.log_message("Serial connection test failed!")
-                    self.serial_status_label.config(text="🔴 Serial: Test Failed")
-                    messagebox.showerror("Error", "Serial connection test failed!")
+            if self.is_process_reader() and self.is_serial_reader_running():
+                # port เป็นของ reader ใน process แยก - ใช้ state ที่ process ลูกแจ้งแทนการเปิด port ซ้ำ
+                self.log_message("Serial port is owned by the reader process")
+                connected = self.serial_state == CONNECTED
+            elif self.serial_manager.is_connected() and self.serial_manager.config == test_config:
+                # port เปิดอยู่แล้วโดยโปรแกรมนี้ (reader กำลังอ่าน) - ไม่ต้องเปิดซ้ำ
+                self.log_message("Serial port is already open by this client")
+                connected = True
+            else:
+                # ลองเปิดทันทีโดยไม่รอ backoff
+                self.serial_manager.close()
+                test_ser = self.serial_manager.get(test_config)
+                connected = bool(test_ser and test_ser.is_open)
+            
+            if connected:
+                self.log_message("Serial connection test successful!")
+                self.serial_status_label.config(text="🟢 Serial: Test OK")
+                
+                # แนะนำให้เปิด real-time monitoring
+                result = messagebox.askyesno("Test Successful", 
+                                           "Serial connection test successful!\n\n"
+                                           "Would you like to start real-time monitoring\n"
+                                           "to see the data from the scale?")
+                if result and not self.realtime_monitoring_active:
+                    self.toggle_realtime_monitoring()
+            else:
+                self.log_message("Serial connection test failed!")
+                self.serial_status_label.config(text="🔴 Serial: Test Failed")
+                messagebox.showerror("Error", 
+                                   "Serial connection test failed! (see log for details)\n\n"
+                                   "Possible solutions:\n"
+                                   "1. Run as Administrator\n"
+                                   "2. Close other applications using this port\n"
+                                   "3. Check Device Manager for port conflicts\n"
+                                   "4. Reconnect USB to Serial adapter")
                     
-        except serial.SerialException as e:
-            self.log_message(f"Serial connection test error: {e}")
-            self.serial_status_label.config(text="🔴 Serial: Error")
-            messagebox.showerror("Error", f"Serial connection test failed: {e}")
-        except PermissionError as e:
-            self.log_message(f"Permission Error: {e}")
-            self.serial_status_label.config(text="🔴 Serial: Permission Denied")
-            messagebox.showerror("Permission Error", 
-                               "Cannot access the serial port.\n\n"
-                               "Possible solutions:\n"
-                               "1. Run as Administrator\n"
-                               "2. Close other applications using this port\n"
-                               "3. Check Device Manager for port conflicts\n"
-                               "4. Reconnect USB to Serial adapter")
         except Exception as e:
             self.log_message(f"Unexpected error: {e}")
             self.serial_status_label.config(text="🔴 Serial: Error")
@@ -1259,82 +1372,38 @@ class RS232ClientGUI:
 
         
     def test_all_functions(self):
-        """ทดสอบทุกฟังก์ชัน"""
+        """ทดสอบทุกฟังก์ชัน (อ่านข้อมูลผ่าน tap ของ reader ตัวเดียวกับ production)"""
         try:
             self.log_message("=== Testing All Functions ===")
             
             # 1. ทดสอบการเชื่อมต่อ Serial
             self.log_message("1. Testing Serial Connection...")
-            ser = self.get_serial_connection()
-            if not ser:
+            if not self.ensure_serial_reader():
                 self.log_message("   ❌ Serial connection failed")
                 messagebox.showerror("Error", "Serial connection failed!")
                 return
             else:
                 self.log_message("   ✅ Serial connection successful!")
             
-            # 2. ทดสอบการอ่านข้อมูล
+            # 2. ทดสอบการอ่านข้อมูล (5 chunk)
             self.log_message("2. Testing Data Reading...")
+            self.collect_tap_chunks('test-all', 5, 0.8, self.finish_test_all_functions)
             
-            # ล้าง buffer ก่อน
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-            self.read_buffer = b''
-            
-            # อ่านข้อมูล 5 ครั้ง
-            data_received = False
-            for i in range(5):
-                try:
-                    original_timeout = ser.timeout
-                    ser.timeout = 0.5
-                    
-                    data = ser.read(100)
-                    if data:
-                        # ลบการแสดง Hex และ ASCII
-                        self.log_message(f"   Read {i+1}: {data.decode('latin-1', errors='ignore')}")
-                        self.read_buffer += data
-                        data_received = True
-                    else:
-                        self.log_message(f"   Read {i+1}: No data")
-                    
-                    ser.timeout = original_timeout
-                    time.sleep(0.3)  # เพิ่มเวลารอ
-                    
-                except Exception as e:
-                    self.log_message(f"   Read {i+1} error: {e}")
-            
-            if not data_received:
+        except Exception as e:
+            self.log_message(f"Test all functions error: {e}")
+            messagebox.showerror("Error", f"Test failed: {e}")
+
+    def finish_test_all_functions(self, chunks):
+        """ขั้นตอนที่ 2-4 ของ test_all_functions หลังได้ข้อมูลจาก tap แล้ว"""
+        try:
+            if not self.log_tap_reads(chunks, indent="   "):
                 self.log_message("   ⚠️ No data received from scale")
                 messagebox.showwarning("Warning", "No data received from scale!\nPlease check if the scale is sending data.")
                 return
             
             # 3. ทดสอบการ parse และแสดงผล
             self.log_message("3. Testing Data Parsing and Display...")
-            if self.read_buffer:
-                try:
-                    decoded = self.read_buffer.decode('latin-1', errors='ignore')
-                    self.log_message(f"   Decoded: '{decoded}'")
-                    
-                    # แยกข้อมูลตามบรรทัด
-                    lines = decoded.split('\r\n') + decoded.split('\n')
-                    for line in lines:
-                        line = line.strip()
-                        if line:
-                            self.log_message(f"   Processing line: '{line}'")
-                            parsed_value = self.parse_scale_data(line)
-                            self.log_message(f"   Parsed result: {parsed_value}")
-                            
-                            # อัปเดต weight label
-                            if parsed_value != "N/A":
-                                self.last_weight = parsed_value
-                                self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                                self.log_message(f"   ✅ Updated weight: {parsed_value}")
-                                break
-                            else:
-                                self.log_message(f"   ❌ Failed to parse: {line}")
-                    
-                except Exception as e:
-                    self.log_message(f"   Parse error: {e}")
+            self.log_tap_parse(chunks, indent="   ")
             
             # 4. แนะนำการใช้งาน
             self.log_message("4. Test Complete!")
@@ -1360,6 +1429,51 @@ class RS232ClientGUI:
             self.log_message(f"Test all functions error: {e}")
             messagebox.showerror("Error", f"Test failed: {e}")
 
+    def toggle_capture(self):
+        """เริ่ม/หยุดบันทึก bytes ดิบจาก serial port ลงไฟล์ capture"""
+        try:
+            if self.capture_writer is None:
+                path = filedialog.asksaveasfilename(
+                    title="Record raw serial data",
+                    defaultextension=CAPTURE_EXTENSION,
+                    initialfile=default_capture_path(),
+                    filetypes=[("RS232 capture", f"*{CAPTURE_EXTENSION}"), ("All files", "*.*")])
+                if not path:
+                    return
+                self.capture_writer = CaptureWriter(path)
+                # บันทึกทุก chunk ใน reader thread (ไม่ผ่าน queue จึงไม่มี chunk หาย)
+                self.tap.add_listener(self.capture_writer.write)
+                self.capture_btn.config(text="⏹️ Stop Recording")
+                self.log_message(f"Recording raw serial data to: {path}")
+            else:
+                writer = self.capture_writer
+                self.capture_writer = None
+                self.tap.remove_listener(writer.write)
+                writer.close()
+                self.capture_btn.config(text="⏺️ Record Raw")
+                self.log_message(f"Recording stopped: {writer.chunks} chunks, {writer.bytes_written} bytes -> {writer.path}")
+        except Exception as e:
+            self.log_message(f"Capture error: {e}")
+            messagebox.showerror("Error", f"Capture error: {e}")
+            
+    def replay_capture(self):
+        """เล่นไฟล์ capture ซ้ำตามเวลาจริงผ่าน pipeline เดียวกับ serial port (ไม่ส่งค่าไป server)"""
+        path = filedialog.askopenfilename(
+            title="Replay capture",
+            filetypes=[("RS232 capture", f"*{CAPTURE_EXTENSION}"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        def replay_worker():
+            try:
+                self.log_message(f"Replaying capture: {path}")
+                chunks = ReplaySource(path, speed=1.0).replay(self.tap.feed)
+                self.log_message(f"Replay finished: {chunks} chunks, pipeline stats: {self.get_pipeline_stats()}")
+            except Exception as e:
+                self.log_message(f"Replay error: {e}")
+        
+        threading.Thread(target=replay_worker, daemon=True).start()
+            
     def test_pattern_parsing(self):
         """ทดสอบการ parse pattern โดยเฉพาะ"""
         try:
@@ -1389,275 +1503,132 @@ class RS232ClientGUI:
         except Exception as e:
             self.log_message(f"Pattern testing error: {e}")
     def test_connection_status(self):
-        """ทดสอบสถานะการเชื่อมต่อและอัปเดต status"""
+        """ทดสอบสถานะการเชื่อมต่อและอัปเดต status (เปิด port ผ่าน connection manager ซึ่งเป็นเจ้าของ port)"""
         try:
-            # ตรวจสอบว่ามีการเชื่อมต่ออยู่หรือไม่
-            if self.serial_connection and self.serial_connection.is_open:
+            # ตรวจสอบว่ามีการเชื่อมต่ออยู่หรือไม่ (reader ใน process แยกเป็นเจ้าของ port เอง)
+            if self.serial_manager.is_connected() or (self.is_process_reader() and self.is_serial_reader_running()
+                                                      and self.serial_state == CONNECTED):
                 self.serial_status_label.config(text="🟢 Serial: Connected")
                 self.log_message("Serial connection is active")
                 return True
+            
+            # ลองเชื่อมต่อใหม่ - port ที่เปิดได้จะถูกใช้ต่อโดย reader ไม่ต้องเปิดซ้ำ
+            ser = self.get_serial_connection()
+            if ser and ser.is_open:
+                self.serial_status_label.config(text="🟢 Serial: Available")
+                self.log_message("Serial port is available")
+                return True
             else:
-                # ลองเชื่อมต่อใหม่
-                test_config = {
-                    'port': self.port_var.get(),
-                    'baudrate': int(self.baudrate_var.get()),
-                    'parity': parity_map.get(self.parity_var.get(), serial.PARITY_NONE),
-                    'stopbits': stop_bits_map.get(self.stopbits_var.get(), serial.STOPBITS_ONE),
-                    'bytesize': byte_size_map.get(self.bytesize_var.get(), serial.EIGHTBITS),
-                    'timeout': 0.1  # ใช้ timeout สั้นๆ
-                }
-                
-                with serial.Serial(**test_config) as test_ser:
-                    if test_ser.is_open:
-                        self.serial_status_label.config(text="🟢 Serial: Available")
-                        self.log_message("Serial port is available")
-                        return True
-                    else:
-                        self.serial_status_label.config(text="🔴 Serial: Unavailable")
-                        self.log_message("Serial port is unavailable")
-                        return False
+                self.serial_status_label.config(text="🔴 Serial: Unavailable")
+                self.log_message("Serial port is unavailable")
+                return False
                         
-        except serial.SerialException as e:
-            self.serial_status_label.config(text="🔴 Serial: Error")
-            self.log_message(f"Serial status check error: {e}")
-            return False
-        except PermissionError as e:
-            self.serial_status_label.config(text="🔴 Serial: Permission Denied")
-            self.log_message(f"Permission error: {e}")
-            return False
         except Exception as e:
             self.serial_status_label.config(text="🔴 Serial: Error")
             self.log_message(f"Unexpected error: {e}")
             return False
 
     def debug_serial_reading(self):
-        """Debug การอ่านข้อมูล Serial"""
+        """Debug การอ่านข้อมูล Serial (อ่านผ่าน tap - ไม่ล้าง buffer และไม่แย่ง bytes จาก reader)"""
         try:
             self.log_message("=== Debug Serial Reading ===")
+            self.log_message(f"Pipeline stats: {self.get_pipeline_stats()}")
             
-            ser = self.get_serial_connection()
-            if not ser:
+            if not self.ensure_serial_reader():
                 self.log_message("❌ Serial connection not available!")
                 return
+            # reader ใน process แยกเปิด port เอง - แสดงการตั้งค่าที่ส่งให้แทน
+            settings = self.serial_manager.config if self.serial_manager.is_connected() else self.get_serial_settings()
             
             # แสดงการตั้งค่า
-            self.log_message(f"✅ Serial connected: {ser.port}")
-            self.log_message(f"   Baudrate: {ser.baudrate}")
-            self.log_message(f"   Parity: {ser.parity}")
-            self.log_message(f"   Stop bits: {ser.stopbits}")
-            self.log_message(f"   Byte size: {ser.bytesize}")
-            self.log_message(f"   Timeout: {ser.timeout}")
-            
-            # ล้าง buffer
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-            self.read_buffer = b''
+            self.log_message(f"✅ Serial connected: {settings['port']} ({self.reader_config['mode']} reader)")
+            self.log_message(f"   Baudrate: {settings['baudrate']}")
+            self.log_message(f"   Parity: {settings['parity']}")
+            self.log_message(f"   Stop bits: {settings['stopbits']}")
+            self.log_message(f"   Byte size: {settings['bytesize']}")
+            self.log_message(f"   Timeout: {settings['timeout']}")
             
             self.log_message("📖 Reading data continuously...")
             
-            # อ่านข้อมูล 10 ครั้ง
-            for i in range(10):
-                try:
-                    original_timeout = ser.timeout
-                    ser.timeout = 0.2
-                    
-                    # ตรวจสอบข้อมูลใน buffer
-                    if ser.in_waiting > 0:
-                        self.log_message(f"   Buffer has {ser.in_waiting} bytes")
-                    
-                    # อ่านข้อมูล
-                    data = ser.read(100)
-                    if data:
-                        self.log_message(f"   Read {i+1}: {len(data)} bytes")
-                        # ลบการแสดง HEX และ ASCII
-                        self.log_message(f"      Data: '{data.decode('latin-1', errors='ignore')}'")
-                        
-                        # เพิ่มข้อมูลลงใน buffer
-                        self.read_buffer += data
-                        
-                        # ลอง decode
-                        try:
-                            decoded = self.read_buffer.decode('latin-1', errors='ignore')
-                            self.log_message(f"      Full buffer: '{decoded}'")
-                            
-                            # แยกบรรทัด
-                            lines = decoded.split('\r\n') + decoded.split('\n')
-                            for j, line in enumerate(lines):
-                                if line.strip():
-                                    self.log_message(f"      Line {j+1}: '{line.strip()}'")
-                        except Exception as e:
-                            self.log_message(f"      Decode error: {e}")
-                    else:
+            def show_reads(chunks):
+                buffered = b''
+                for i, data in enumerate(chunks):
+                    if not data:
                         self.log_message(f"   Read {i+1}: No data")
-                    
-                    ser.timeout = original_timeout
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    self.log_message(f"   Read {i+1} error: {e}")
-            
-            self.log_message("=== Debug Complete ===")
+                        continue
+                    self.log_message(f"   Read {i+1}: {len(data)} bytes")
+                    self.log_message(f"      Data: '{data.decode('latin-1', errors='ignore')}'")
+                    buffered += data
+                    decoded = buffered.decode('latin-1', errors='ignore')
+                    self.log_message(f"      Full buffer: '{decoded}'")
+                    for j, line in enumerate(decoded.splitlines()):
+                        if line.strip():
+                            self.log_message(f"      Line {j+1}: '{line.strip()}'")
+                self.log_message(f"Pipeline stats: {self.get_pipeline_stats()}")
+                self.log_message("=== Debug Complete ===")
+            
+            # อ่าน 10 chunk
+            self.collect_tap_chunks('debug', 10, 0.3, show_reads)
             
         except Exception as e:
             self.log_message(f"Debug error: {e}")
 
     def get_serial_connection(self):
-        """เชื่อมต่อ RS232"""
-        if self.serial_connection and self.serial_connection.is_open:
-            return self.serial_connection
-            
+        """
+        เชื่อมต่อ RS232
+        ถ้าเปิดไม่ได้ connection manager จะรอตาม backoff (หรือรอจนกว่าจะเสียบ port กลับ)
+        ระหว่างนั้นคืน None ทันทีโดยไม่พยายามเปิด port และไม่ log ซ้ำ
+        (ถูกเรียกจาก reader thread - ใช้ self.serial_settings จาก sync_reader_settings ไม่อ่าน Tk variable)
+        """
+        if self.serial_manager.is_connected():
+            return self.serial_manager.connection
+            
+        current_config = self.serial_settings
+        if current_config is None:
+            self.log_message("Invalid serial config")
+            return None
+        return self.serial_manager.get(current_config)
+    
+    def read_serial_settings(self):
+        """kwargs ของ serial.Serial จากช่องตั้งค่า (Tk thread เท่านั้น - ValueError ถ้าค่าไม่ถูกต้อง)"""
+        return {
+            'port': self.port_var.get(),
+            'baudrate': int(self.baudrate_var.get()),
+            'parity': parity_map.get(self.parity_var.get(), serial.PARITY_NONE),
+            'stopbits': stop_bits_map.get(self.stopbits_var.get(), serial.STOPBITS_ONE),
+            'bytesize': byte_size_map.get(self.bytesize_var.get(), serial.EIGHTBITS),
+            'timeout': float(self.timeout_var.get())
+        }
+
+    def get_serial_settings(self):
+        """kwargs ของ serial.Serial จากช่องตั้งค่า (None ถ้าค่าไม่ถูกต้อง)"""
         try:
-            current_config = {
-                'port': self.port_var.get(),
-                'baudrate': int(self.baudrate_var.get()),
-                'parity': parity_map.get(self.parity_var.get(), serial.PARITY_NONE),
-                'stopbits': stop_bits_map.get(self.stopbits_var.get(), serial.STOPBITS_ONE),
-                'bytesize': byte_size_map.get(self.bytesize_var.get(), serial.EIGHTBITS),
-                'timeout': float(self.timeout_var.get())
-            }
-            
-            # Log configuration for debugging
-            self.log_message(f"Connecting with config: {current_config['port']}, {current_config['baudrate']}, {self.parity_var.get()}, {self.stopbits_var.get()}, {self.bytesize_var.get()}")
-            
-            self.serial_connection = serial.Serial(**current_config)
-            if self.serial_connection.is_open:
-                self.log_message(f"Connected to {current_config['port']}")
-                self.serial_status_label.config(text="🟢 Serial: Connected")
-                return self.serial_connection
-        except serial.SerialException as e:
-            self.log_message(f"Serial connection error: {e}")
-            self.serial_status_label.config(text="🔴 Serial: Error")
-            self.serial_connection = None
-        except PermissionError as e:
-            self.log_message(f"Permission Error: {e}")
-            self.serial_status_label.config(text="�� Serial: Permission Denied")
-            self.serial_connection = None
-        except Exception as e:
-            self.log_message(f"Unexpected serial error: {e}")
-            self.serial_connection = None
-        return None
+            return self.read_serial_settings()
+        except ValueError as e:
+            self.log_message(f"Invalid serial config: {e}")
+            return None
+        
+    def on_serial_state_change(self, state):
+        """อัปเดตสถานะ Serial เมื่อ connection manager เปลี่ยน state (อาจถูกเรียกจาก reader thread)"""
+        status_text = {
+            CONNECTED: "🟢 Serial: Connected",
+            RETRYING: "🟡 Serial: Retrying",
+            GONE: "🔴 Serial: Unplugged",
+        }.get(state, "🔴 Serial: Disconnected")
+        self.serial_state = state
+        self.run_on_ui_thread(self.serial_status_label.config, {'text': status_text})
+        
+    def get_sensitivity(self):
+        """ค่า Sensitivity จากช่องกรอก (ค่าไม่ถูกต้อง = ค่าเริ่มต้น)"""
+        try:
+            return float(self.sensitivity_var.get())
+        except ValueError:
+            return DEFAULT_SENSITIVITY
         
     def parse_scale_data(self, cleaned_text):
-        """Parse ข้อมูลจาก scale ตาม Pattern ที่เลือก"""
+        """Parse ข้อมูลจาก scale ตาม Pattern ที่เลือก (ดู scale_patterns.parse_scale_text)"""
         try:
-            # ใช้ Pattern ตามที่เลือก
-            selected_pattern = self.scale_pattern_var.get()
-            if selected_pattern not in SCALE_PATTERNS:
-                selected_pattern = 'Default'  # Fallback to default
-                
-            # ถ้าเป็น Raw Data (No Parse) ให้แสดงข้อมูลดิบเลย
-            if selected_pattern == 'Raw Data (No Parse)':
-                return cleaned_text.strip()
-                
-            known_weight_indicators = SCALE_PATTERNS[selected_pattern]
-        
-            extracted_weight_values = []
-            for indicator_text, pattern_regex, is_zero_indicator in known_weight_indicators:
-                matches = re.findall(pattern_regex, cleaned_text)
-                if matches:
-                    self.log_message(f"Pattern '{indicator_text}' matched: {matches} for text: '{cleaned_text}'")
-                    for match in matches:
-                        if is_zero_indicator:
-                            extracted_weight_values.append("0")
-                        else:
-                            try:
-                                # สำหรับ ST,GS Format ที่มี 2 capture groups
-                                if isinstance(match, tuple) and len(match) == 2:
-                                    num_str_from_match = match[1]  # ตัวเลข (ตัวที่ 2)
-                                else:
-                                    # สำหรับ Pattern อื่นๆ ที่มี 1 capture group
-                                    num_str_from_match = match
-                                
-                                # รองรับทั้งตัวเลขเต็มและทศนิยม รวมถึงค่าติดลบ
-                                if '.' in num_str_from_match:
-                                    weight_val = float(num_str_from_match)
-                                else:
-                                    weight_val = float(int(num_str_from_match))
-                                
-                                # จัดการค่าติดลบ - เก็บค่าติดลบไว้เพื่อการวิเคราะห์
-                                if weight_val < 0:
-                                    # ค่าติดลบอาจหมายถึงการชั่งผิดทิศทางหรือมีปัญหา
-                                    # ให้เก็บค่าสัมบูรณ์ไว้ แต่เพิ่ม log เพื่อแจ้งเตือน
-                                    if abs(weight_val) < 0.1:  # ค่าติดลบน้อยกว่า 0.1 kg
-                                        weight_val = 0.0
-                                        self.log_message(f"Negative weight below threshold, treating as 0: {cleaned_text}")
-                                    else:
-                                        # ค่าติดลบที่มากกว่า ให้ใช้ค่าสัมบูรณ์
-                                        original_val = weight_val
-                                        weight_val = abs(weight_val)
-                                        self.log_message(f"Negative weight converted to positive: {original_val} -> {weight_val} (from: {cleaned_text})")
-                                
-                                # ใช้ความไวในการกรองข้อมูล
-                                sensitivity = float(self.sensitivity_var.get())
-                                if abs(weight_val) < sensitivity:
-                                    weight_val = 0.0
-                                
-                                extracted_weight_values.append(str(weight_val))
-                            except ValueError:
-                                pass
-                            
-            if extracted_weight_values:
-                non_zero_values = [val for val in extracted_weight_values if val != "0" and val != "0.0"]
-                if non_zero_values:
-                    weight_result = non_zero_values[-1]
-                    self.log_message(f"Parsed weight from complete pattern: {cleaned_text} -> {weight_result}")
-                    # ลบการบันทึกใน Local Database
-                    return weight_result
-                elif "0" in extracted_weight_values or "0.0" in extracted_weight_values:
-                    weight_result = "0"
-                    self.log_message(f"Parsed zero weight from complete pattern: {cleaned_text} -> {weight_result}")
-                    # ลบการบันทึกใน Local Database
-                    return weight_result
-            
-            # เพิ่มการตรวจสอบข้อมูลที่อาจถูกตัดขาด
-            if selected_pattern == 'ST,GS Format':
-                # ตรวจสอบว่ามีข้อมูล ST,GS หรือ US,GS ที่ไม่สมบูรณ์หรือไม่
-                if 'ST,GS' in cleaned_text or 'US,GS' in cleaned_text:
-                    # ลองหา pattern ที่ไม่สมบูรณ์ (รวมถึงค่าติดลบ)
-                    incomplete_patterns = [
-                        (r"ST,GS,\+([0-9]+\.?[0-9]*)$", False),
-                        (r"US,GS,\+([0-9]+\.?[0-9]*)$", False),
-                        (r"ST,GS,\+0{3,}\.?0*$", True),
-                        (r"US,GS,\+0{3,}\.?0*$", True),
-                        # เพิ่ม pattern สำหรับค่าติดลบที่ถูกตัดขาด
-                        (r"ST,GS,-([0-9]+\.?[0-9]*)$", False),
-                        (r"US,GS,-([0-9]+\.?[0-9]*)$", False),
-                        (r"ST,GS,-0{3,}\.?0*$", True),
-                        (r"US,GS,-0{3,}\.?0*$", True),
-                        # เพิ่ม pattern สำหรับข้อมูลที่ถูกตัดขาดมาก
-                        (r"ST,GS,-$", True),
-                        (r"US,GS,-$", True),
-                    ]
-                    
-                    for pattern_regex, is_zero_indicator in incomplete_patterns:
-                        matches = re.findall(pattern_regex, cleaned_text)
-                        if matches:
-                            if is_zero_indicator:
-                                weight_result = "0"
-                                self.log_message(f"Found incomplete zero weight pattern: {cleaned_text}")
-                                # ลบการบันทึกใน Local Database
-                                return weight_result
-                            else:
-                                try:
-                                    num_str_from_match = matches[0] if isinstance(matches[0], str) else matches[0][0]
-                                    if '.' in num_str_from_match:
-                                        weight_val = float(num_str_from_match)
-                                    else:
-                                        weight_val = float(int(num_str_from_match))
-                                    
-                                    # ใช้ความไวในการกรองข้อมูล
-                                    sensitivity = float(self.sensitivity_var.get())
-                                    if abs(weight_val) < sensitivity:
-                                        weight_val = 0.0
-                                    
-                                    weight_result = str(weight_val)
-                                    self.log_message(f"Found incomplete weight pattern: {cleaned_text} -> {weight_result}")
-                                    # ลบการบันทึกใน Local Database
-                                    return weight_result
-                                except ValueError:
-                                    pass
-            
-            return "N/A"
+            return parse_scale_text(cleaned_text, self.get_active_pattern(), self.get_sensitivity())
         except Exception as e:
             self.log_message(f"Parse error: {e}")
             return "N/A"
@@ -1667,234 +1638,309 @@ class RS232ClientGUI:
     # ลบ show_local_data_window function
 
     def read_weight_from_rs232(self):
-        """อ่านน้ำหนักจาก RS232"""
+        """อ่านน้ำหนักจาก RS232 แบบ poll (ใช้เมื่อไม่ได้รัน serial reader thread)"""
         ser = self.get_serial_connection()
         if not ser:
             return self.last_weight
             
         try:
-            # ตรวจสอบและจำกัดขนาด buffer เพื่อป้องกัน overflow
-            if len(self.read_buffer) > 2000:  # เพิ่มขนาด buffer limit
-                self.read_buffer = self.read_buffer[-1000:]  # เก็บข้อมูลล่าสุด 1000 bytes
-                self.log_message("Buffer size limit reached, trimming...")
-                
-                # หลังจาก trim แล้ว ให้ประมวลผลข้อมูลใหม่
-                try:
-                    decoded_message = self.read_buffer.decode('latin-1', errors='ignore')
-                    lines = []
-                    for line in decoded_message.split('\r\n'):
-                        lines.extend(line.split('\n'))
-                    
-                    # ประมวลผลบรรทัดสุดท้ายเพื่อหาน้ำหนักล่าสุด
-                    for line in reversed(lines):
-                        line = line.strip()
-                        if line:
-                            try:
-                                parsed_value = self.parse_scale_data(line)
-                                if parsed_value != "N/A":
-                                                                                # ตรวจสอบว่าน้ำหนักเป็น 0 หรือไม่
-                                            if parsed_value != "0" and parsed_value != "0.0":
-                                                self.last_weight = parsed_value
-                                                self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                                                # ลดการ log เพื่อเพิ่มความเร็ว
-                                                # self.log_message(f"Updated weight after buffer trim: {parsed_value}")
-                                                break
-                            except Exception as e:
-                                continue
-                except Exception as e:
-                    self.log_message(f"Error processing trimmed buffer: {e}")
-            
-            # อ่านข้อมูลที่มีอยู่ใน buffer
-            # ... existing code ...
-
             # อ่านข้อมูลที่มีอยู่ใน buffer
             if ser.in_waiting > 0:
-                try:
-                    new_bytes = ser.read(ser.in_waiting)
-                    if new_bytes:
-                        self.read_buffer += new_bytes
-                        
-                        # ส่งข้อมูลไปยัง real-time display
-                        if self.realtime_monitoring_active:
-                            self.add_realtime_data(new_bytes)
-                        
-                        # ประมวลผลข้อมูลใหม่ทันที
-                        try:
-                            decoded_new = new_bytes.decode('latin-1', errors='ignore')
-                            lines = []
-                            for line in decoded_new.split('\r\n'):
-                                lines.extend(line.split('\n'))
-                            
-                            # ตรวจสอบข้อมูลใหม่
-                            for line in lines:
-                                line = line.strip()
-                                if line:
-                                    try:
-                                        parsed_value = self.parse_scale_data(line)
-                                        if parsed_value != "N/A":
-                                            # ตรวจสอบว่าน้ำหนักเป็น 0 หรือไม่
-                                            if parsed_value != "0" and parsed_value != "0.0":
-                                                self.last_weight = parsed_value
-                                                self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                                                # ลดการ log เพื่อเพิ่มความเร็ว
-                                                # self.log_message(f"New weight from buffer: {parsed_value}")
-                                    except Exception as e:
-                                        continue
-                        except Exception as e:
-                            pass  # ไม่ log error สำหรับการประมวลผลข้อมูลใหม่
-                        
-                        # Log raw data for debugging (ลดความถี่)
-                        if len(new_bytes) > 20:  # เพิ่มเงื่อนไขเพื่อลด log
-                            self.log_message(f"Buffer data: {len(new_bytes)} bytes")
-                except Exception as e:
-                    self.log_message(f"Error reading buffer: {e}")
-
-# ... existing code ...
-            
-            # ลองอ่านข้อมูลใหม่ (non-blocking read)
-            try:
-                # ใช้ timeout สั้นๆ เพื่อไม่ให้ block นาน
-                original_timeout = ser.timeout
-                ser.timeout = 0.01  # ลด timeout เป็น 10ms
-                new_bytes = ser.read(100)  # เพิ่มจำนวน bytes ที่อ่าน
+                new_bytes = ser.read(ser.in_waiting)
                 if new_bytes:
-                    self.read_buffer += new_bytes
-                    
-                    # ส่งข้อมูลไปยัง real-time display
-                    if self.realtime_monitoring_active:
-                        self.add_realtime_data(new_bytes)
-                    
-                    # ประมวลผลข้อมูลใหม่ทันที
-                    try:
-                        decoded_new = new_bytes.decode('latin-1', errors='ignore')
-                        lines = []
-                        for line in decoded_new.split('\r\n'):
-                            lines.extend(line.split('\n'))
-                        
-                        # ตรวจสอบข้อมูลใหม่
-                        for line in lines:
-                            line = line.strip()
-                            if line:
-                                try:
-                                    parsed_value = self.parse_scale_data(line)
-                                    if parsed_value != "N/A":
-                                        # ตรวจสอบว่าน้ำหนักเป็น 0 หรือไม่
-                                        if parsed_value != "0" and parsed_value != "0.0":
-                                            self.last_weight = parsed_value
-                                            self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                                            # ลดการ log เพื่อเพิ่มความเร็ว
-                                            # self.log_message(f"New weight from timeout read: {parsed_value}")
-                                except Exception as e:
-                                    continue
-                    except Exception as e:
-                        pass  # ไม่ log error สำหรับการประมวลผลข้อมูลใหม่
-                    
-                    # Log raw data for debugging (ลดความถี่)
-                    if len(new_bytes) > 5:
-                        self.log_message(f"New data: {len(new_bytes)} bytes")
-                ser.timeout = original_timeout
-            except Exception as e:
-                # ไม่มีข้อมูลใหม่ ไม่เป็นไร
-                pass
-            
-            # Process buffer for complete messages
-            if self.read_buffer:
-                try:
-                    decoded_message = self.read_buffer.decode('latin-1', errors='ignore')
-                    
-                    # แยกข้อมูลตามบรรทัด
-                    lines = []
-                    for line in decoded_message.split('\r\n'):
-                        lines.extend(line.split('\n'))
-                    
-                    processed_lines = 0
-                    last_processed_index = 0
-                    
-                    for i, line in enumerate(lines):
-                        line = line.strip()
-                        if line:  # ถ้ามีข้อมูลในบรรทัด
-                            try:
-                                parsed_value = self.parse_scale_data(line)
-                                if parsed_value != "N/A":
-                                    # ตรวจสอบว่าค่าใหม่แตกต่างจากค่าเดิมหรือไม่
-                                    if parsed_value != self.last_weight:
-                                        self.last_weight = parsed_value
-                                        self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                                        # ลดการ log เพื่อเพิ่มความเร็ว
-                                        # self.log_message(f"New weight: {parsed_value} (from: {line})")
-                                    processed_lines += 1
-                                    last_processed_index = i
-                            except Exception as e:
-                                self.log_message(f"Error parsing line '{line}': {e}")
-                    
-                    # ล้าง buffer เฉพาะบรรทัดที่ประมวลผลแล้ว
-                    if processed_lines > 0:
-                        try:
-                            # หาตำแหน่งของบรรทัดสุดท้ายที่ประมวลผล
-                            processed_content = '\r\n'.join(lines[:last_processed_index + 1])
-                            if processed_content:
-                                # ลบข้อมูลที่ประมวลผลแล้วออกจาก buffer
-                                remaining_content = decoded_message[len(processed_content):].lstrip('\r\n')
-                                self.read_buffer = remaining_content.encode('latin-1', errors='ignore')
-                                
-                                # ตรวจสอบว่ามีข้อมูลใหม่เข้ามาหรือไม่
-                                if len(self.read_buffer) > 0:
-                                    self.log_message(f"Buffer cleared, remaining: {len(self.read_buffer)} bytes")
-                        except Exception as e:
-                            self.log_message(f"Error clearing buffer: {e}")
-                            # ถ้าเกิดข้อผิดพลาด ให้ล้าง buffer ทั้งหมด
-                            self.read_buffer = b''
-                    
-                    # ปรับปรุงการจัดการ buffer สำหรับข้อมูลที่ส่งมาอย่างต่อเนื่อง
-                    if len(self.read_buffer) > 2000:  # เพิ่มขนาด buffer limit
-                        # เก็บข้อมูลล่าสุด 1000 bytes แทนที่จะเป็น 500
-                        self.read_buffer = self.read_buffer[-1000:]
-                        self.log_message("Buffer trimmed due to size (increased limit)")
-                        
-                        # หลังจาก trim buffer แล้ว ให้ประมวลผลข้อมูลใหม่
-                        try:
-                            decoded_message = self.read_buffer.decode('latin-1', errors='ignore')
-                            lines = []
-                            for line in decoded_message.split('\r\n'):
-                                lines.extend(line.split('\n'))
-                            
-                            # ประมวลผลบรรทัดสุดท้ายเพื่อหาน้ำหนักล่าสุด
-                            for line in reversed(lines):
-                                line = line.strip()
-                                if line:
-                                    try:
-                                        parsed_value = self.parse_scale_data(line)
-                                        if parsed_value != "N/A":
-                                            # ตรวจสอบว่าน้ำหนักเป็น 0 หรือไม่
-                                            if parsed_value != "0" and parsed_value != "0.0":
-                                                self.last_weight = parsed_value
-                                                self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                                                # ลดการ log เพื่อเพิ่มความเร็ว
-                                                # self.log_message(f"Updated weight after buffer trim: {parsed_value}")
-                                                break
-                                    except Exception as e:
-                                        continue
-                        except Exception as e:
-                            self.log_message(f"Error processing trimmed buffer: {e}")
-                        
-                except Exception as e:
-                    self.log_message(f"Buffer decode error: {e}")
-                    # ถ้า decode ไม่ได้ ให้ล้าง buffer
-                    self.read_buffer = b''
+                    self.tap.feed(new_bytes)
             
             return self.last_weight
         except Exception as e:
             self.log_message(f"Serial read error: {e}")
-            # ถ้าเกิดข้อผิดพลาด ให้รีเซ็ตการเชื่อมต่อ
-            try:
-                if ser and ser.is_open:
-                    ser.reset_input_buffer()
-                    ser.reset_output_buffer()
-                    self.read_buffer = b''
-                    self.log_message("Serial buffers reset due to error")
-            except Exception as reset_error:
-                self.log_message(f"Error resetting serial buffers: {reset_error}")
-            return "Error"
+            # ปิด port แล้วให้ connection manager เชื่อมต่อใหม่ตาม backoff
+            self.serial_manager.mark_lost(e)
+            self.reset_read_buffer()
+            return WeightReading.error()
+
+    def ingest_serial_bytes(self, new_bytes):
+        """
+        ประมวลผล bytes ที่อ่านได้จาก serial port แบบ single pass
+        read -> frame -> parse bytes ครั้งเดียว (scale_protocol.ScaleDecoder) -> ส่งต่อให้
+        weight label และ sender (ค่าที่ return)
+        ถูกเรียกผ่าน self.tap - real-time monitor / recorder / เครื่องมือ debug รับ bytes ดิบจาก tap เอง
+        Pattern "Raw Data (No Parse)" เท่านั้นที่ decode frame เป็นข้อความ
+        
+        Returns:
+            WeightReading ล่าสุดถ้ามีการ parse สำเร็จจากข้อมูลชุดนี้, None ถ้าไม่มี
+            (Raw Data: บรรทัดที่ไม่ใช่ตัวเลขแสดงบน label เท่านั้น ไม่ส่งไป server)
+        """
+        latest_weight = None
+        latest_text = None
+        decoder = self.decoder
+        # reader thread - ใช้ค่าที่ copy ไว้ ไม่อ่าน Tk variable (sync_reader_settings)
+        decoder.sensitivity = self.sensitivity
+        if decoder.pattern_name != self.selected_pattern:
+            self.reset_format_detection()
+        for frame, reading in decoder.decode(new_bytes):
+            if reading is None:
+                continue
+            if decoder.active_pattern == RAW_PATTERN:
+                # แสดงข้อความดิบ - ส่งไป server เฉพาะบรรทัดที่เป็นตัวเลข
+                latest_weight = reading
+                latest_text = frame.decode('latin-1').strip()
+                continue
+            # ตั้ง reading.stable จาก sliding window + สถานะของเครื่องชั่ง
+            event = self.stability.feed(reading)
+            if event is not None:
+                self.on_stability_event(event)
+            latest_weight = reading
+            latest_text = None
+        
+        if latest_weight is None:
+            return None
+        
+        # อัปเดต label ครั้งเดียวต่อ chunk ด้วยค่าล่าสุด (สีเขียว = นิ่ง)
+        if latest_text is not None or latest_weight != self.last_weight:
+            self.run_on_ui_thread(self.weight_label.config,
+                                  {'text': f"⚖️ Weight: {latest_text or latest_weight.to_text()}",
+                                   'foreground': 'green' if latest_weight.stable else ''})
+        if not latest_weight.ok:
+            # ข้อความดิบที่ไม่ใช่ตัวเลข - ไม่ใช่ค่าน้ำหนัก ไม่ส่งเข้า weight_queue
+            return None
+        self.last_weight = latest_weight
+        return latest_weight
+
+    def on_stability_event(self, event):
+        """
+        เรียกเมื่อสถานะนิ่งเปลี่ยนเท่านั้น (stable / unstable / zero) ไม่ใช่ทุก frame
+        ค่าที่นิ่งถูกส่งไป server ทันทีเพราะ reading.stable เปลี่ยน (ดู emission_policy.py)
+        ถูกเรียกจาก reader thread - งาน UI ทำใน Tk thread
+        """
+        if not self.is_ui_thread():
+            self.ui_queue.put((self.on_stability_event, (event,)))
+            return
+        if event.kind == STABLE:
+            self.log_message(f"Stable weight: {event.reading.to_text()} {event.reading.unit}")
+        elif event.kind == ZERO:
+            self.log_message("Scale returned to zero")
+        else:
+            self.log_message("Weight unstable")
+
+    def get_stats_source(self):
+        """ตัวนับของ read path: decoder ใน process นี้ หรือ SerialProcessReader (stats จาก process ลูก)"""
+        return self.serial_reader if self.is_process_reader() else self.decoder
+
+    def get_pipeline_stats(self):
+        """
+        ตัวนับของ byte pipeline (ScaleDecoder.stats() + bytes_framed)
+        unaccounted_bytes ต้องเป็น 0 เสมอ (ทุก byte ถูก frame, ทิ้ง หรือค้างรอ frame ครั้งเดียว)
+        """
+        if self.is_process_reader():
+            return self.serial_reader.stats()
+        framer = self.decoder.framer
+        return {
+            **self.decoder.stats(),
+            'bytes_framed': framer.bytes_framed,
+            'unaccounted_bytes': framer.bytes_in - framer.bytes_framed - framer.bytes_dropped - framer.pending(),
+        }
+
+    def update_health_status(self):
+        """อัปเดตแถบตัวนับของ read path (เรียกซ้ำทุก HEALTH_STATUS_INTERVAL_MS)"""
+        try:
+            stats = self.get_stats_source().stats()
+            misses = ", ".join(f"{name} {count:,}" for name, count in stats['parse_misses'].items()) or "0"
+            self.health_label.config(
+                text=f"📊 Read {stats['bytes_read']:,} B | Frames {stats['frames_framed']:,} | "
+                     f"Parsed {stats['frames_parsed']:,} | Misses {misses} | Errors {stats['parse_errors']:,} | "
+                     f"Dropped {stats['bytes_dropped']:,} B (trimmed {stats['bytes_trimmed']:,}) | "
+                     f"Max buffer {stats['max_buffer_depth']:,} B",
+                # frame ส่วนใหญ่ parse ไม่ได้ = ตั้งค่า serial หรือ Pattern ผิด
+                foreground='red' if stats['frames_framed'] >= 20
+                and stats['frames_parsed'] * 2 < stats['frames_framed'] else 'gray')
+        except Exception as e:
+            self.log_message(f"Health status error: {e}")
+        self.root.after(HEALTH_STATUS_INTERVAL_MS, self.update_health_status)
+
+    async def send_stats_loop(self, client_id):
+        """ส่ง stats ของ read path ไป server ทุก stats_interval วินาที ([Emission] ใน client_config.ini)"""
+        interval = self.emission_config.get('stats_interval', 0)
+        if interval <= 0:
+            return
+        while self.is_running and self.is_connected:
+            await asyncio.sleep(interval)
+            if self.websocket and not self.websocket.closed:
+                await self.websocket.send(json.dumps(build_stats_message(client_id, self.get_stats_source())))
+
+    def reset_read_buffer(self):
+        """ล้าง buffer ของ serial (เช่น หลัง reconnect หรือหยุด client)"""
+        self.decoder.framer.reset()
+
+    def start_serial_reader(self):
+        """
+        เริ่ม thread สำหรับอ่าน serial port แบบ blocking และส่งค่าเข้า weight_queue
+        ([Reader] mode = process: อ่านและ parse ใน process แยก ดู serial_process.py)
+        ถ้า reader ทำงานอยู่แล้ว (เริ่มจาก monitor / debug) จะผูกกับ event loop ปัจจุบันแทนการเริ่มใหม่
+        เพื่อไม่ให้มี reader สองตัวอ่าน port เดียวกันแม้ชั่วขณะ
+        """
+        self.stability = make_stability_detector(self.stability_config, self.sensitivity)
+        self.reset_format_detection()
+        self.weight_queue = asyncio.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        if self.is_serial_reader_running():
+            self.serial_reader.attach(self.loop, self.weight_queue)
+            self.log_message("Serial reader attached to client")
+            return
+        self.stop_serial_reader()
+        if self.reader_config['mode'] == PROCESS_MODE:
+            self.serial_reader = self.make_reader_process()
+        else:
+            self.serial_reader = SerialReaderThread(
+                self.get_serial_connection,
+                self.tap.feed,
+                log=self.log_message,
+                on_lost=self.serial_manager.mark_lost
+            )
+        self.serial_reader.attach(self.loop, self.weight_queue)
+        self.serial_reader.start()
+        if not self.is_process_reader():
+            self.log_message("Serial reader thread started")
+
+    def make_reader_process(self):
+        """
+        สร้าง reader ใน process แยก - process ลูกเป็นเจ้าของ port จึงปิด port ของ process นี้ก่อน
+        GUI และ sender อ่านค่าล่าสุดจาก shared memory อย่างเดียว (poll_reader_process / weight_queue)
+        """
+        self.serial_manager.close()
+        reader = SerialProcessReader(self.serial_settings or self.serial_manager.config,
+                                     self.framing_config,
+                                     stability_config=self.stability_config,
+                                     log=self.log_message,
+                                     on_stability_event=self.on_stability_event,
+                                     on_state_change=self.on_serial_state_change,
+                                     on_chunk=self.tap.publish)
+        self.reader_process_seq = 0
+        self.configure_reader_process(reader)
+        return reader
+
+    def configure_reader_process(self, reader):
+        """
+        ส่ง Pattern / Sensitivity / Framing ล่าสุดให้ process ลูก (ส่งเฉพาะค่าที่เปลี่ยน)
+        อาจถูกเรียกจาก asyncio thread (start_serial_reader) - ใช้ค่าจาก sync_reader_settings เท่านั้น
+        """
+        pattern_name = self.selected_pattern
+        patterns = {pattern_name: SCALE_PATTERNS[pattern_name]} if pattern_name in SCALE_PATTERNS else {}
+        reader.configure(pattern_name=pattern_name,
+                         sensitivity=self.sensitivity,
+                         framing_config=self.framing_config,
+                         cache_key=self.format_cache_key,
+                         patterns=patterns,
+                         # ส่ง bytes ดิบข้าม process เฉพาะเมื่อมี monitor / recorder / เครื่องมือ debug
+                         forward_raw=self.tap.active)
+
+    def is_process_reader(self):
+        return isinstance(self.serial_reader, SerialProcessReader)
+
+    def poll_reader_process(self):
+        """
+        อ่านค่าล่าสุดจาก reader ใน process แยกแล้วอัปเดต label (เรียกซ้ำทุก READER_PROCESS_POLL_MS)
+        Tk ค้างนานแค่ไหนก็ไม่กระทบการอ่าน port - ค่าที่พลาดไประหว่างนั้นถูกแทนด้วยค่าล่าสุด
+        """
+        try:
+            reader = self.serial_reader
+            if self.is_process_reader() and not reader.stopped:
+                self.configure_reader_process(reader)
+                seq, reading, text = reader.latest()
+                if seq != self.reader_process_seq and reading is not None:
+                    self.reader_process_seq = seq
+                    if text or reading != self.last_weight:
+                        self.weight_label.config(text=f"⚖️ Weight: {text or reading.to_text()}",
+                                                 foreground='green' if reading.stable else '')
+                    self.last_weight = reading
+        except Exception as e:
+            self.log_message(f"Reader process poll error: {e}")
+        self.root.after(READER_PROCESS_POLL_MS, self.poll_reader_process)
+
+    def ensure_serial_reader(self):
+        """
+        ให้มี reader ตัวเดียวเป็นเจ้าของ serial port (เริ่ม reader ถ้ายังไม่ทำงาน)
+        real-time monitor และเครื่องมือ debug รับ bytes ผ่าน self.tap แทนการเปิด port เอง
+        
+        Returns:
+            bool: True ถ้า reader ทำงานอยู่
+        """
+        if self.is_serial_reader_running():
+            return True
+        if self.reader_config['mode'] != PROCESS_MODE:
+            # process แยกเปิด port เอง - ตรวจ port ล่วงหน้าเฉพาะโหมด thread
+            ser = self.get_serial_connection()
+            if not ser or not ser.is_open:
+                return False
+        self.start_serial_reader()
+        return True
+
+    def release_serial_reader(self):
+        """หยุด reader ที่เริ่มเพื่อ monitor / debug เมื่อไม่มีผู้ใช้แล้ว (client ที่ทำงานอยู่ใช้ reader ต่อ)"""
+        if self.is_running or self.tap.subscriptions or self.capture_writer:
+            return
+        self.stop_serial_reader()
+
+    def collect_tap_chunks(self, name, reads, timeout, on_done):
+        """
+        เก็บ chunk ดิบจาก reader ตัวเดียวกับ production (ไม่เปิด port ซ้ำ ไม่ล้าง buffer ของ port)
+        รอใน worker thread เพื่อไม่ให้ Tk thread ค้าง แล้วเรียก on_done(chunks) บน Tk thread
+        
+        Args:
+            name: ชื่อ subscription
+            reads: จำนวน chunk ที่ต้องการ
+            timeout: เวลารอสูงสุดต่อ chunk (วินาที)
+            on_done: callback ที่รับ list ของ bytes (None = ไม่มีข้อมูลภายใน timeout)
+        """
+        subscription = self.tap.subscribe(name)
+        
+        def collect_worker():
+            chunks = []
+            with subscription:
+                for _ in range(reads):
+                    item = subscription.get(timeout)
+                    chunks.append(item[1] if item else None)
+            self.run_on_ui_thread(self.finish_tap_collection, on_done, chunks)
+        
+        threading.Thread(target=collect_worker, daemon=True).start()
+
+    def finish_tap_collection(self, on_done, chunks):
+        try:
+            on_done(chunks)
+        finally:
+            self.release_serial_reader()
+
+    def log_tap_reads(self, chunks, indent=""):
+        """log chunk ที่ได้จาก collect_tap_chunks ทีละ chunk - คืน True ถ้ามีข้อมูลอย่างน้อยหนึ่ง chunk"""
+        for i, data in enumerate(chunks):
+            if data:
+                self.log_message(f"{indent}Read {i+1}: {data.decode('latin-1', errors='ignore')}")
+            else:
+                self.log_message(f"{indent}Read {i+1}: No data")
+        return any(chunks)
+
+    def log_tap_parse(self, chunks, indent=""):
+        """
+        log ผลการ parse ของข้อมูลที่อ่านได้ทีละบรรทัด (แสดงผลอย่างเดียว)
+        ค่าน้ำหนักจริงมาจาก ingest_serial_bytes ซึ่งได้ bytes ชุดเดียวกันจาก tap แล้ว
+        """
+        decoded = b''.join(data for data in chunks if data).decode('latin-1', errors='ignore')
+        self.log_message(f"{indent}Decoded: '{decoded}'")
+        for line in decoded.splitlines():
+            line = line.strip()
+            if line:
+                self.log_message(f"{indent}Processing line: '{line}'")
+                self.log_message(f"{indent}Parsed result: {self.parse_scale_data(line)}")
+        self.log_message(f"{indent}Current weight: {self.last_weight.to_text()}")
+        self.log_message(f"{indent}Pipeline stats: {self.get_pipeline_stats()}")
+
+    def stop_serial_reader(self):
+        """หยุด serial reader thread"""
+        if self.serial_reader:
+            self.serial_reader.stop()
+            self.serial_reader = None
+
+    def is_serial_reader_running(self):
+        """ตรวจสอบว่า serial reader thread กำลังทำงานอยู่หรือไม่"""
+        return bool(self.serial_reader and self.serial_reader.is_alive() and not self.serial_reader.stopped)
 
 # ... existing code ...
     def start_client(self):
@@ -1938,41 +1984,20 @@ class RS232ClientGUI:
 
         
     def test_raw_reading(self):
-        """ทดสอบการอ่านข้อมูล Raw"""
+        """ทดสอบการอ่านข้อมูล Raw (อ่านผ่าน tap ของ reader ตัวเดียวกับ production)"""
         try:
             self.log_message("=== Testing Raw Reading ===")
             
-            ser = self.get_serial_connection()
-            if not ser:
+            if not self.ensure_serial_reader():
                 self.log_message("❌ Serial connection not available!")
                 return
             
-            # ล้าง buffer
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-            self.read_buffer = b''
-            
-            # อ่านข้อมูล 10 ครั้ง
-            for i in range(10):
-                try:
-                    original_timeout = ser.timeout
-                    ser.timeout = 0.5
-                    
-                    data = ser.read(100)
-                    if data:
-                        # ลบการแสดง Hex และ ASCII
-                        self.log_message(f"Read {i+1}: {data.decode('latin-1', errors='ignore')}")
-                        self.read_buffer += data
-                    else:
-                        self.log_message(f"Read {i+1}: No data")
-                    
-                    ser.timeout = original_timeout
-                    time.sleep(0.2)
-                    
-                except Exception as e:
-                    self.log_message(f"Read {i+1} error: {e}")
+            def show_reads(chunks):
+                self.log_tap_reads(chunks)
+                self.log_message("=== Raw Reading Test Complete ===")
             
-            self.log_message("=== Raw Reading Test Complete ===")
+            # อ่าน 10 chunk
+            self.collect_tap_chunks('raw-reading', 10, 0.7, show_reads)
             
         except Exception as e:
             self.log_message(f"Raw reading test error: {e}")
@@ -1993,13 +2018,14 @@ class RS232ClientGUI:
             if self.realtime_monitoring_active:
                 self.toggle_realtime_monitoring()
             
+            # หยุด serial reader thread ก่อนปิด port
+            self.stop_serial_reader()
+            self.log_message(f"Pipeline stats: {self.get_pipeline_stats()}")
+            
             # ปิดการเชื่อมต่อ Serial
-            if self.serial_connection and self.serial_connection.is_open:
-                try:
-                    self.serial_connection.close()
-                    self.log_message("Serial connection closed")
-                except Exception as e:
-                    self.log_message(f"Error closing serial connection: {e}")
+            if self.serial_manager.is_connected():
+                self.log_message("Serial connection closed")
+            self.serial_manager.close()
                 
             # ปิด WebSocket
             if self.websocket and self.loop:
@@ -2016,10 +2042,10 @@ class RS232ClientGUI:
             self.start_btn.config(state='normal')
             self.stop_btn.config(state='disabled')
             self.serial_status_label.config(text="🔴 Serial: Disconnected")
-            self.server_status_label.config(text="🔴 Server: Disconnected", foreground='red')
+            self.run_on_ui_thread(self.server_status_label.config, {'text': "🔴 Server: Disconnected", 'foreground': 'red'})
             
             # ล้าง buffer
-            self.read_buffer = b''
+            self.reset_read_buffer()
             
             self.log_message("Client stopped successfully")
         except Exception as e:
@@ -2098,9 +2124,12 @@ class RS232ClientGUI:
         try:
             self.loop = asyncio.new_event_loop()
             asyncio.set_event_loop(self.loop)
+            self.start_serial_reader()
             self.loop.run_until_complete(self.client_main())
         except Exception as e:
             self.log_message(f"Client async error: {e}")
+        finally:
+            self.stop_serial_reader()
         
     async def client_main(self):
         """ฟังก์ชันหลักของ client"""
@@ -2109,8 +2138,8 @@ class RS232ClientGUI:
         
         while self.is_running:
             try:
-                server_url = self.server_url_var.get()
-                client_id = self.client_id_var.get()
+                server_url = self.server_url
+                client_id = self.client_id
                 
                 # ... existing code ...
 
@@ -2118,19 +2147,24 @@ class RS232ClientGUI:
                 
                 # สร้าง WebSocket connection
                 websocket = await websockets.connect(server_url)
+                # บอก agent.py ว่าเป็นเครื่องชั่ง (ไม่ต้องส่ง broadcast กลับมา)
+                await websocket.send(json.dumps(build_hello_message(client_id)))
                 self.websocket = websocket
                 self.is_connected = True
-                self.server_status_label.config(text="🟢 Server: Connected", foreground='green')
+                self.run_on_ui_thread(self.server_status_label.config, {'text': "🟢 Server: Connected", 'foreground': 'green'})
                 self.log_message("Connected to server")
                 
                 # รีเซ็ต reconnect delay เมื่อเชื่อมต่อสำเร็จ
                 reconnect_delay = 5
                 
                 # ล้าง buffer เก่าเมื่อ reconnect เพื่อไม่ให้ส่งข้อมูลเก่า
-                if len(self.read_buffer) > 0:
+                if self.decoder.framer.pending() > 0:
                     self.log_message("Clearing old buffer after reconnect")
-                    self.read_buffer = b''
+                    self.reset_read_buffer()
+                while self.weight_queue and not self.weight_queue.empty():
+                    self.weight_queue.get_nowait()
                 
+                stats_task = asyncio.create_task(self.send_stats_loop(client_id))
                 try:
                     # เริ่มการส่งข้อมูล
                     await self.send_weight_loop(client_id)
@@ -2141,6 +2175,7 @@ class RS232ClientGUI:
                 except Exception as e:
                     self.log_message(f"Error in send_weight_loop: {e}")
                 finally:
+                    stats_task.cancel()
                     # ปิด WebSocket connection อย่างถูกต้อง
                     try:
                         await websocket.close()
@@ -2150,19 +2185,19 @@ class RS232ClientGUI:
                     
                     self.websocket = None
                     self.is_connected = False
-                    self.server_status_label.config(text="🔴 Server: Disconnected", foreground='red')
+                    self.run_on_ui_thread(self.server_status_label.config, {'text': "🔴 Server: Disconnected", 'foreground': 'red'})
                     
             except websockets.exceptions.InvalidURI:
                 self.log_message(f"Invalid server URL: {server_url}")
                 self.is_connected = False
-                self.server_status_label.config(text="🔴 Server: Invalid URL", foreground='red')
+                self.run_on_ui_thread(self.server_status_label.config, {'text': "🔴 Server: Invalid URL", 'foreground': 'red'})
                 await asyncio.sleep(10)  # รอนานขึ้นสำหรับ URL ที่ผิด
                 continue
                     
             except Exception as e:
                 self.log_message(f"Connection error: {e}")
                 self.is_connected = False
-                self.server_status_label.config(text="🔴 Server: Disconnected", foreground='red')
+                self.run_on_ui_thread(self.server_status_label.config, {'text': "🔴 Server: Disconnected", 'foreground': 'red'})
             
             # รอก่อน reconnect
             if self.is_running:
@@ -2175,10 +2210,14 @@ class RS232ClientGUI:
 # ... existing code ...
                 
     async def send_weight_loop(self, client_id):
-        """ลูปสำหรับส่งข้อมูลน้ำหนัก"""
+        """ลูปสำหรับส่งข้อมูลน้ำหนัก - ส่งเมื่อค่าเปลี่ยนเกิน Sensitivity หรือถึงเวลา heartbeat (ดู emission_policy.py)"""
         consecutive_errors = 0
         max_consecutive_errors = 5
         
+        # ใช้ Sensitivity ล่าสุดจากหน้าจอ และส่งค่าล่าสุดทันทีหลังเชื่อมต่อ
+        emission = make_emission_policy(dict(self.emission_config, sensitivity=self.sensitivity))
+        emission.offer(self.last_weight)
+        
         while self.is_running and self.is_connected:
             try:
                 # ตรวจสอบว่า WebSocket ยังเชื่อมต่ออยู่หรือไม่
@@ -2186,10 +2225,23 @@ class RS232ClientGUI:
                     self.log_message("WebSocket connection lost, breaking loop")
                     break
                 
-                weight = self.read_weight_from_rs232()
+                # รอค่าน้ำหนักใหม่จาก serial reader thread (ไม่อ่าน serial บน event loop)
+                try:
+                    reading_ts, weight = await asyncio.wait_for(self.weight_queue.get(),
+                                                                timeout=emission.time_until_due())
+                    emission.offer(weight)
+                except asyncio.TimeoutError:
+                    pass
+                
+                # ค่าไม่เปลี่ยนและยังไม่ถึงเวลา heartbeat (หรือเกิน max rate) - ไม่ต้องส่ง
+                weight = emission.poll()
+                if weight is None:
+                    continue
                 
                 # ตรวจสอบว่าค่าน้ำหนักถูกต้องหรือไม่
-                if weight == "Error" or weight == "N/A":
+                if not weight.ok:
+                    # ถือว่าจัดการค่านี้แล้ว ไม่งั้น emission.poll() คืนค่าเดิมซ้ำทุกรอบจนต้อง reconnect
+                    emission.mark_sent(weight)
                     consecutive_errors += 1
                     if consecutive_errors >= max_consecutive_errors:
                         self.log_message(f"Too many consecutive errors ({consecutive_errors}), reconnecting...")
@@ -2201,13 +2253,15 @@ class RS232ClientGUI:
                 consecutive_errors = 0
                 
                 # ส่งข้อมูลเพิ่มเติมรวมถึง branch prefix และ scale pattern
+                # ใช้ค่าสาขา / Pattern จาก sync_reader_settings (ห้ามอ่าน Tk variable ใน asyncio thread)
+                branch_name = self.branch_name
+                scale_pattern = self.get_active_pattern()
                 message = {
                     "client_id": client_id,
-                    "weight": weight,
-                    "timestamp": time.time(),
-                    "branch": self.branch_var.get(),
-                    "branch_prefix": self.get_branch_prefix(self.branch_var.get()),
-                    "scale_pattern": self.scale_pattern_var.get()
+                    **weight.to_wire(),
+                    "branch": branch_name,
+                    "branch_prefix": self.get_branch_prefix(branch_name),
+                    "scale_pattern": scale_pattern
                 }
                 
                 # ส่งข้อมูลไปยัง Server โดยตรง
@@ -2215,7 +2269,8 @@ class RS232ClientGUI:
                     # ตรวจสอบ WebSocket state ก่อนส่ง
                     if self.websocket and not self.websocket.closed:
                         await self.websocket.send(json.dumps(message))
-                        self.log_message(f"Sent weight {weight} to server (Branch: {self.branch_var.get()}, Pattern: {self.scale_pattern_var.get()})")
+                        emission.mark_sent(weight)
+                        self.log_message(f"Sent weight {weight.to_text()} to server (Branch: {branch_name}, Pattern: {scale_pattern})")
                     else:
                         self.log_message("WebSocket not available for sending")
                         break
@@ -2233,8 +2288,6 @@ class RS232ClientGUI:
                         self.log_message(f"Too many send errors ({consecutive_errors}), reconnecting...")
                         break
                 
-                await asyncio.sleep(0.1)  # ลด delay จาก 0.5 เป็น 0.1 วินาที
-                
             except websockets.exceptions.ConnectionClosed:
                 self.log_message("WebSocket connection closed in main loop")
                 break
@@ -2255,67 +2308,21 @@ class RS232ClientGUI:
 
         
     def test_raw_data_display(self):
-        """ทดสอบการแสดงข้อมูล Raw Data"""
+        """ทดสอบการแสดงข้อมูล Raw Data (อ่านผ่าน tap ของ reader ตัวเดียวกับ production)"""
         try:
-            ser = self.get_serial_connection()
-            if not ser:
+            if not self.ensure_serial_reader():
                 messagebox.showerror("Error", "Serial connection not available!")
                 return
             
             self.log_message("=== Testing Raw Data Display ===")
             
-            # ล้าง buffer ก่อน
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-            self.read_buffer = b''
+            def show_reads(chunks):
+                if self.log_tap_reads(chunks):
+                    self.log_tap_parse(chunks)
+                self.log_message("=== Raw Data Display Test Complete ===")
             
-            # อ่านข้อมูล 5 ครั้ง
-            for i in range(5):
-                try:
-                    # ตั้ง timeout สั้นๆ
-                    original_timeout = ser.timeout
-                    ser.timeout = 0.5
-                    
-                    # อ่านข้อมูล
-                    data = ser.read(100)
-                    if data:
-                        # ลบการแสดง Hex และ ASCII
-                        self.log_message(f"Read {i+1}: {data.decode('latin-1', errors='ignore')}")
-                        
-                        # เพิ่มข้อมูลลงใน buffer
-                        self.read_buffer += data
-                        
-                        # ลอง decode และ parse
-                        try:
-                            decoded = self.read_buffer.decode('latin-1', errors='ignore')
-                            self.log_message(f"Decoded: '{decoded}'")
-                            
-                            # แยกข้อมูลตามบรรทัด
-                            lines = decoded.split('\r\n') + decoded.split('\n')
-                            for line in lines:
-                                line = line.strip()
-                                if line:
-                                    self.log_message(f"Processing line: '{line}'")
-                                    parsed_value = self.parse_scale_data(line)
-                                    self.log_message(f"Parsed result: {parsed_value}")
-                                    
-                                    # อัปเดต weight label
-                                    if parsed_value != "N/A":
-                                        self.last_weight = parsed_value
-                                        self.weight_label.config(text=f"⚖️ Weight: {parsed_value}")
-                                        self.log_message(f"Updated weight: {parsed_value}")
-                        except Exception as e:
-                            self.log_message(f"Parse error: {e}")
-                    else:
-                        self.log_message(f"Read {i+1}: No data")
-                    
-                    ser.timeout = original_timeout
-                    time.sleep(0.2)  # รอ 200ms
-                    
-                except Exception as e:
-                    self.log_message(f"Read {i+1} error: {e}")
-            
-            self.log_message("=== Raw Data Display Test Complete ===")
+            # อ่าน 5 chunk
+            self.collect_tap_chunks('raw-display', 5, 0.7, show_reads)
             
         except Exception as e:
             self.log_message(f"Test raw data display error: {e}")
@@ -2343,6 +2350,12 @@ class RS232ClientGUI:
             if self.is_running:
                 self.stop_client()
             
+            # ปิดไฟล์ capture ที่กำลังบันทึก
+            if self.capture_writer:
+                self.tap.remove_listener(self.capture_writer.write)
+                self.capture_writer.close()
+                self.capture_writer = None
+            
             # หยุด tray icon
             if self.tray_icon:
                 try:
@@ -2350,15 +2363,12 @@ class RS232ClientGUI:
                 except Exception as e:
                     print(f"Error stopping tray icon: {e}")
             
-            # ปิดการเชื่อมต่อ Serial
-            if self.serial_connection:
-                try:
-                    self.serial_connection.close()
-                except Exception as e:
-                    print(f"Error closing serial connection: {e}")
+            # หยุด reader (อาจทำงานอยู่เพื่อ real-time monitor / debug) แล้วปิดการเชื่อมต่อ Serial
+            self.stop_serial_reader()
+            self.serial_manager.close()
             
             # ล้าง buffer
-            self.read_buffer = b''
+            self.reset_read_buffer()
             
             # ปิดโปรแกรม
             try:
@@ -2614,6 +2624,9 @@ class RS232ClientGUI:
 # Class ที่เกี่ยวข้องกับ Offline Mode ถูกลบออกแล้ว - ตอนนี้ระบบทำงานแบบ Online เท่านั้น
 
 if __name__ == '__main__':
+    # exe ที่ build ด้วย PyInstaller: process ลูกของ [Reader] mode = process รัน exe นี้ซ้ำ
+    # freeze_support() ต้องมาก่อนทุกอย่าง ไม่งั้น process ลูกสร้าง GUI ตัวที่สองแทน run_reader_process
+    multiprocessing.freeze_support()
     try:
         app = RS232ClientGUI()
         app.run()
@@ -3,10 +3,11 @@ from tkinter import ttk, scrolledtext, messagebox
 import serial
 import threading
 import time
-import re
 import queue
 import configparser
 import os
+from scale_protocol import (AUTO_PATTERN, ScaleDecoder, default_framing_config, load_framing_config,
+                            save_framing_config, make_framer)
 
 # --- Default Configuration ---
 DEFAULT_SERIAL_PORT = "COM1"
@@ -33,9 +34,10 @@ class RS232TesterApp:
 
 
         # --- Buffer สำหรับ Data Fragmentation ---
-        self.read_buffer = b''
-        self.STX = b'\x02'
-        self.ETX = b'\x03'
+        self.framing_config = default_framing_config('stx_etx')
+        # Pattern เริ่มต้น Auto Detect - log บอกว่าเครื่องชั่งส่งข้อมูลรูปแบบไหน (บันทึกลง [ScaleConfig] ตอน Save)
+        self.decoder = ScaleDecoder(make_framer(self.framing_config), AUTO_PATTERN,
+                                    log=lambda message: self.data_queue.put({"log_direct": message}))
         # ------------------------------------
 
 
@@ -145,6 +147,8 @@ class RS232TesterApp:
             'ByteSize': self.byte_size_var.get(),  # เก็บเป็น '8', '7', '5'
             'ReadTimeout': self.timeout_var.get()
         }
+        save_framing_config(config, self.framing_config)
+        config['ScaleConfig'] = {'Pattern': self.decoder.active_pattern or AUTO_PATTERN}
         try:
             with open(self.config_file_name, 'w') as configfile:
                 config.write(configfile)
@@ -171,6 +175,11 @@ class RS232TesterApp:
                 self.stop_bits_var.set(cfg.get('StopBits', str(DEFAULT_STOP_BITS)))
                 self.byte_size_var.set(cfg.get('ByteSize', str(DEFAULT_BYTE_SIZE)))
                 self.timeout_var.set(cfg.get('ReadTimeout', str(DEFAULT_READ_TIMEOUT)))
+                self.framing_config = load_framing_config(config, default_mode='stx_etx')
+                self.decoder.framer = make_framer(self.framing_config)
+                if 'ScaleConfig' in config:
+                    self.decoder.set_pattern(config['ScaleConfig'].get('Pattern', AUTO_PATTERN))
+                self.log_message(f"INFO: Framing mode: {self.framing_config['mode']}")
                 self.log_message(f"INFO: Configuration loaded from {self.config_file_name}")
             else:
                 self.log_message(
@@ -184,38 +193,6 @@ class RS232TesterApp:
         self.log_text.delete(1.0, tk.END)
         self.log_text.configure(state='disabled')
 
-    def parse_scale_data(self, raw_data_str):
-        # self.log_message(f"DEBUG_PARSER_INPUT: '{raw_data_str}'") # อาจจะถี่ไป
-        known_weight_indicators = [
-            ("1BH", r"1BH\s+(\d+)"),
-            ("1@H", r"1@H\s+(\d+)"),
-            ("1CH", r"1CH\s+(0{3,})"),
-            (" H ", r" H\s+(0{3,})")
-        ]
-        extracted_weight_strings = []
-        for indicator_text, pattern_regex in known_weight_indicators:
-            matches = re.findall(pattern_regex, raw_data_str)
-            # self.log_message(f"DEBUG_PARSER_MATCH: Ind: {indicator_text}, Matches: {matches}")
-            if matches:
-                for num_str in matches:
-                    if indicator_text == "1CH":
-                        extracted_weight_strings.append("0")
-                    else:
-                        extracted_weight_strings.append(num_str)
-
-        if extracted_weight_strings:
-            final_num_str = extracted_weight_strings[-1]  # อาจจะต้องมี logic ที่ดีกว่านี้ถ้ามีหลาย match
-            try:
-                weight_value_int = int(final_num_str)
-                parsed_result = str(weight_value_int)
-                # self.log_message(f"DEBUG_PARSER_RETURN: '{parsed_result}' from final_num_str: '{final_num_str}'")
-                return parsed_result
-            except ValueError:
-                # self.log_message(f"DEBUG_PARSER_ERROR: ValueError for '{final_num_str}'")
-                return "Error: Invalid Number"
-        # self.log_message("DEBUG_PARSER_RETURN: 'N/A' (No known indicator or values)")
-        return "N/A"
-
     def update_live_weight_label(self, text_to_display):
         self.log_message(f"DEBUG_LIVE_WEIGHT_UPDATE: Attempting to set Live Weight to '{text_to_display}'")
         if text_to_display is not None and isinstance(text_to_display, str):
@@ -314,80 +291,42 @@ class RS232TesterApp:
             while self.is_reading and self.ser and self.ser.is_open:
                 loop_count += 1
                 bytes_to_read = self.ser.in_waiting or 1  # อ่านที่มีอยู่ หรืออย่างน้อย 1 byte (ถ้า timeout > 0)
+                new_bytes = b''
 
                 if bytes_to_read > 0:
                     try:
                         new_bytes = self.ser.read(bytes_to_read)
-                        if new_bytes:
-                            # self.data_queue.put({"log_direct": f"DEBUG_THREAD ({thread_name}): Read {len(new_bytes)} bytes: {new_bytes!r}"})
-                            self.read_buffer += new_bytes
-                        # else: # ser.read() timed out (if timeout > 0 and in_waiting was 0)
-                        # self.data_queue.put({"log_direct": f"DEBUG_THREAD ({thread_name}): ser.read() returned no bytes (timeout)."})
-                        # pass # ผ่านไปเฉยๆ ไม่ต้องทำอะไรถ้าอ่านไม่ได้
-
                     except serial.SerialException as se_read_frag:
                         self.data_queue.put(
                             {"error": f"Serial Read Error in Fragment Read ({thread_name}): {se_read_frag}"})
                         break  # ออกจาก loop ถ้ามีปัญหาการอ่าน
 
                 # --- ประมวลผล Buffer เพื่อหา Message ที่สมบูรณ์ ---
-                while True:  # Loop เพื่อดึง Message ทั้งหมดที่อาจจะมีใน Buffer
-                    stx_index = self.read_buffer.find(self.STX)
-                    if stx_index != -1:  # เจอ STX
-                        etx_index = self.read_buffer.find(self.ETX, stx_index + 1)  # หา ETX หลัง STX
-                        if etx_index != -1:  # เจอ ETX ด้วย
-                            # ได้ Message ที่สมบูรณ์ (ไม่รวม STX และ ETX)
-                            complete_message_bytes = self.read_buffer[stx_index + 1: etx_index]
-                            if complete_message_bytes:  # ตรวจสอบว่าไม่เป็น empty bytes (ไม่ควรเกิดถ้า STX/ETX ถูกต้อง)
-                                # --- Process the complete_message_bytes ---
-                                cleaned_text_for_display_and_parse = ""
-                                parsed_numeric_str = "N/A"  # Default ก่อน Parse
-                                try:
-                                    # Decode Message ที่สมบูรณ์
-                                    decoded_message = complete_message_bytes.decode('latin-1',
-                                                                                    errors='replace')  # หรือ 'ascii'
-                                    cleaned_text_for_display_and_parse = decoded_message.strip()
-
-                                    # Parse ข้อมูลที่ Clean แล้ว
-                                    parsed_numeric_str = self.parse_scale_data(cleaned_text_for_display_and_parse)
-
-                                except Exception as decode_parse_err:
-                                    self.data_queue.put({
-                                                            "error": f"Decode/Parse Error ({thread_name}): {decode_parse_err} | MsgBytes: {complete_message_bytes!r}"})
-                                    self.read_buffer = self.read_buffer[etx_index + 1:]  # สำคัญ: เคลียร์ส่วนที่มีปัญหา
-                                    continue  # ไปรอบถัดไปของ while True (หา message ใหม่)
-
-                                # --- สร้าง Payload ให้ถูกต้อง ---
-                                update_payload = {
-                                    "cleaned_data_for_live": cleaned_text_for_display_and_parse,
-                                    "parsed_numeric_str_for_live": parsed_numeric_str,
-                                    "cleaned_data_for_log": cleaned_text_for_display_and_parse,
-                                    "parsed_data_for_log": parsed_numeric_str
-                                }
-                                self.data_queue.put(update_payload)
-                                self.data_queue.put({
-                                                        "log_direct": f"DEBUG_THREAD ({thread_name}): Put DATA_PAYLOAD from complete message: {update_payload}"})  # <--- Log payload ที่ส่ง
-
-                                # ตัด Message ที่ประมวลผลแล้วออกจาก Buffer
-                            self.read_buffer = self.read_buffer[etx_index + 1:]
-
-                        else:  # เจอ STX แต่ยังไม่เจอ ETX
-                            # self.data_queue.put({"log_direct": f"DEBUG_THREAD ({thread_name}): Found STX, waiting for ETX. Buffer: {self.read_buffer[stx_index:]!r}"})
-                            # ข้อมูลยังไม่ครบ Message, เก็บ STX และข้อมูลที่ตามมาไว้ใน Buffer
-                            # แต่ถ้า Buffer ยาวเกินไปโดยไม่เจอ ETX นานๆ อาจจะต้องมีกลไกตัด Buffer ส่วนหน้าทิ้ง
-                            if len(self.read_buffer) > 2048:  # สมมติ Max buffer size
-                                self.data_queue.put({
-                                                        "log_direct": f"WARNING_THREAD ({thread_name}): Buffer too long, clearing from STX: {self.read_buffer[stx_index:stx_index + 20]}..."})
-                                self.read_buffer = self.read_buffer[stx_index:]  # เก็บตั้งแต่ STX ล่าสุด
-                            break  # ออกจาก while True, รอข้อมูลเพิ่มในรอบหน้าของ while self.is_reading
-
-                    else:  # ไม่เจอ STX ใน Buffer เลย
-                        # ถ้า Buffer มีข้อมูลแต่ไม่มี STX แสดงว่าอาจจะเป็นข้อมูลขยะ หรือส่วนท้ายของ message ที่ STX หายไป
-                        if len(self.read_buffer) > 0 and len(self.read_buffer) > 256:  # ถ้ามีข้อมูลขยะสะสมเยอะ
-                            self.data_queue.put({
-                                                    "log_direct": f"WARNING_THREAD ({thread_name}): No STX in buffer, clearing old data. Buffer: {self.read_buffer[:20]}..."})
-                            self.read_buffer = b''  # หรือเก็บไว้ส่วนหนึ่ง self.read_buffer = self.read_buffer[-128:]
-                        break  # ออกจาก while True, รอข้อมูลเพิ่ม
+                framer = self.decoder.framer
+                dropped_before = framer.bytes_dropped
+                for complete_message_bytes, reading in self.decoder.decode(new_bytes):
+                    if not complete_message_bytes:  # ตรวจสอบว่าไม่เป็น empty bytes (ไม่ควรเกิดถ้า STX/ETX ถูกต้อง)
+                        continue
+                    # --- Process the complete_message_bytes (parse แล้วโดย ScaleDecoder) ---
+                    cleaned_text_for_display_and_parse = complete_message_bytes.decode('latin-1',
+                                                                                      errors='replace').strip()
+                    parsed_numeric_str = "N/A" if reading is None else reading.to_text()
+
+                    # --- สร้าง Payload ให้ถูกต้อง ---
+                    update_payload = {
+                        "cleaned_data_for_live": cleaned_text_for_display_and_parse,
+                        "parsed_numeric_str_for_live": parsed_numeric_str,
+                        "cleaned_data_for_log": cleaned_text_for_display_and_parse,
+                        "parsed_data_for_log": parsed_numeric_str
+                    }
+                    self.data_queue.put(update_payload)
+                    self.data_queue.put({
+                                            "log_direct": f"DEBUG_THREAD ({thread_name}): Put DATA_PAYLOAD from complete message: {update_payload}"})  # <--- Log payload ที่ส่ง
+
+                # ข้อมูลขยะที่ไม่มี STX หรือ frame ที่ยาวเกินไป ถูกทิ้งโดย framer
+                if framer.bytes_dropped != dropped_before:
+                    self.data_queue.put({
+                                            "log_direct": f"WARNING_THREAD ({thread_name}): Dropped {framer.bytes_dropped - dropped_before} bytes without a complete frame."})
 
                 # --- จบส่วนประมวลผล Buffer ---
 
@@ -451,46 +390,10 @@ class RS232TesterApp:
         finally:
             self.data_queue.put({"log_direct": f"DEBUG_THREAD ({thread_name}): EXITING."})
 
-    def parse_scale_data(self, cleaned_text):  # Parameter คือ cleaned_text
-        # self.log_message(f"DEBUG_PARSER_INPUT: '{cleaned_text}'")
-
-        # Pattern 1: "1CH" ตามด้วยกลุ่มของเลข 0 (อย่างน้อย 3 ตัว) -> ตีความเป็น "0"
-        match_1ch_zero = re.search(r"1CH\s+(0{3,})", cleaned_text)
-        if match_1ch_zero:
-            # self.log_message(f"DEBUG_PARSER_MATCH: 1CH Zero: {match_1ch_zero.group(1)}")
-            return "0"  # คืน "0" โดยตรง
-
-        # Pattern 2: "1BH" หรือ "1@H" ตามด้วยตัวเลข (อาจจะมี 0 นำหน้า)
-        known_weight_prefixes = [
-            ("1BH", r"1BH\s+(\d+)"),
-            ("1@H", r"1@H\s+(\d+)"),
-            ("1CH", r"1CH\s+(0{3,})"),
-            ("1Rh", r"1Rh\s+(0{3,})")
-        ]
-
-        # เราจะหา match จากท้ายสตริงขึ้นมา หรือหาทั้งหมดแล้วเลือกอันที่ "ดูดีที่สุด"
-        # ตัวอย่างนี้จะหาทั้งหมด แล้วถ้ามี match จะเอาตัวเลขจาก match สุดท้าย
-        all_numeric_matches = []
-        for prefix_text, pattern_regex in known_weight_prefixes:
-            matches = re.findall(pattern_regex, cleaned_text)
-            if matches:
-                for num_str in matches:
-                    all_numeric_matches.append(num_str)
-
-        if all_numeric_matches:
-            last_num_str_candidate = all_numeric_matches[-1]
-            try:
-                weight_value_int = int(last_num_str_candidate)  # ตัดศูนย์นำหน้า
-                parsed_result = str(weight_value_int)
-                # self.log_message(f"DEBUG_PARSER_RETURN: '{parsed_result}' from '{last_num_str_candidate}'")
-                return parsed_result
-            except ValueError:
-                # self.log_message(f"DEBUG_PARSER_ERROR: ValueError for '{last_num_str_candidate}'")
-                return "Error: Invalid Number"
-
-        # ถ้าไม่เข้าเงื่อนไขไหนเลย
-        # self.log_message("DEBUG_PARSER_RETURN: 'N/A' (No specific pattern matched)")
-        return "N/A"
+    def parse_scale_data(self, cleaned_text):
+        """Parse ข้อความหนึ่ง frame ด้วย ScaleDecoder เดียวกับโปรแกรมหลัก (ดู scale_protocol.py)"""
+        reading = self.decoder.parse(cleaned_text.encode('latin-1', errors='replace'))
+        return "N/A" if reading is None else reading.to_text()
 
     def process_serial_data_queue(self):
         # self.log_message(f"DEBUG_QUEUE_PROC: Called. Queue size: {self.data_queue.qsize()}")
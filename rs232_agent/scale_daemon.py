@@ -0,0 +1,218 @@
+"""
+Scale Daemon - อ่านเครื่องชั่งหลายเครื่องใน process เดียว (headless)
+- แทนการเปิด RS232ClientGUI หนึ่งโปรแกรมต่อหนึ่งเครื่องชั่ง
+- ทุก serial port อยู่บน asyncio event loop เดียว (selectors ผ่าน loop.add_reader)
+  บน Windows ที่ port ไม่มี fileno() จะใช้ reader thread ต่อ port แทน
+- ค่าน้ำหนักของทุก port ส่งผ่าน websocket เส้นเดียวไปยัง agent.py
+  โดยแต่ละข้อความมี client_id / branch ของเครื่องชั่งนั้น
+
+รูปแบบ config (scale_daemon.ini) - หนึ่ง section [Scale:<client_id>] ต่อหนึ่งเครื่องชั่ง
+และ [Framing:<client_id>] (ไม่บังคับ) รูปแบบเดียวกับ [Framing] ใน client_config.ini
+และ [Emission] / [Emission:<client_id>] (ไม่บังคับ) ดู emission_policy.py
+และ [Stability] / [Stability:<client_id>] (ไม่บังคับ) ดู stability_detector.py
+pattern = ชื่อ Pattern ใน SCALE_PATTERNS หรือ Auto Detect (ไม่กำหนด = Default)
+ถ้ากำหนด capture จะบันทึก bytes ดิบของ port นั้นลงไฟล์ (ดู serial_capture.py):
+    [Daemon]
+    server_url = ws://localhost:8765
+
+    [Scale:scale_001]
+    port = COM1
+    baudrate = 9600
+    branch = สำนักงานใหญ่ P8
+    branch_prefix = Z1
+    sensitivity = 0.1
+    pattern = Default
+    capture = scale_001.rs232cap
+
+    [Framing:scale_001]
+    mode = stx_etx
+
+ใช้งาน:
+    python scale_daemon.py [scale_daemon.ini]
+"""
+
+import asyncio
+import configparser
+import json
+import os
+import sys
+import time
+
+import websockets
+
+from emission_policy import EMISSION_SECTION, load_emission_config
+from rs232_client import RS232Client, parse_serial_section, SERVER_WEBSOCKET_URL
+from scale_protocol import DEFAULT_PATTERN, DEFAULT_SENSITIVITY, build_hello_message
+from serial_framer import load_framing_config
+from serial_reader import DEFAULT_QUEUE_SIZE
+from stability_detector import STABILITY_SECTION, load_stability_config
+
+DAEMON_CONFIG_FILE = "scale_daemon.ini"
+SCALE_SECTION_PREFIX = "Scale:"
+FRAMING_SECTION_PREFIX = "Framing:"
+EMISSION_SECTION_PREFIX = "Emission:"
+STABILITY_SECTION_PREFIX = "Stability:"
+SERVER_RECONNECT_DELAY = 5
+
+
+class ScalePort(RS232Client):
+    """
+    เครื่องชั่งหนึ่งเครื่องใน daemon
+    ค่าที่ parse ได้ถูก tag ด้วย port นี้ เพื่อให้ทุก port ใช้ queue ร่วมกันได้
+    """
+
+    def handle_serial_chunk(self, new_bytes):
+        weight = super().handle_serial_chunk(new_bytes)
+        return None if weight is None else (self, weight)
+
+
+def load_daemon_config(config_path=DAEMON_CONFIG_FILE):
+    """
+    โหลดรายการเครื่องชั่งจากไฟล์ config ของ daemon
+
+    Args:
+        config_path: path ของไฟล์ config
+
+    Returns:
+        tuple: (server_url, รายการ ScalePort)
+    """
+    config = configparser.ConfigParser()
+    if not config.read(config_path, encoding='utf-8'):
+        raise FileNotFoundError(f"Daemon config not found: {config_path}")
+
+    server_url = SERVER_WEBSOCKET_URL
+    if 'Daemon' in config:
+        server_url = config['Daemon'].get('Server_URL', SERVER_WEBSOCKET_URL)
+
+    ports = []
+    for section_name in config.sections():
+        if not section_name.startswith(SCALE_SECTION_PREFIX):
+            continue
+        client_id = section_name[len(SCALE_SECTION_PREFIX):].strip()
+        section = config[section_name]
+        framing_config = load_framing_config(config, default_mode='stx_etx',
+                                             section_name=FRAMING_SECTION_PREFIX + client_id)
+        sensitivity = section.getfloat('Sensitivity', DEFAULT_SENSITIVITY)
+        emission_section = EMISSION_SECTION_PREFIX + client_id
+        emission_config = load_emission_config(
+            config, section_name=emission_section if emission_section in config else EMISSION_SECTION,
+            sensitivity=sensitivity)
+        stability_section = STABILITY_SECTION_PREFIX + client_id
+        stability_config = load_stability_config(
+            config, section_name=stability_section if stability_section in config else STABILITY_SECTION)
+        ports.append(ScalePort(client_id,
+                               parse_serial_section(section),
+                               framing_config,
+                               branch=section.get('Branch'),
+                               branch_prefix=section.get('Branch_Prefix'),
+                               capture_path=section.get('Capture'),
+                               emission_config=emission_config,
+                               stability_config=stability_config,
+                               scale_pattern=section.get('Pattern', DEFAULT_PATTERN)))
+
+    if not ports:
+        raise ValueError(f"No [{SCALE_SECTION_PREFIX}<client_id>] sections in {config_path}")
+    return server_url, ports
+
+
+class ScaleDaemon:
+    """อ่านทุก port บน event loop เดียว และส่งค่าผ่าน websocket เส้นเดียว"""
+
+    def __init__(self, ports, server_url=SERVER_WEBSOCKET_URL):
+        """
+        เริ่มต้น Daemon
+
+        Args:
+            ports: รายการ ScalePort
+            server_url: URL ของ agent.py
+        """
+        self.ports = ports
+        self.server_url = server_url
+        self.queue = None
+        self.websocket = None
+        self.messages_sent = 0
+
+    async def send_weight(self, port, weight):
+        await self.websocket.send(json.dumps(port.build_weight_message(weight)))
+        port.emission.mark_sent(weight)
+        self.messages_sent += 1
+
+    async def send_readings(self):
+        """ส่งค่าน้ำหนักของแต่ละ port ตาม emission policy ของ port นั้น (ค่าเปลี่ยน / heartbeat / max rate)"""
+        # server ใหม่ยังไม่มีค่าของทุก port - ส่งค่าล่าสุดทันทีหลังเชื่อมต่อ
+        for port in self.ports:
+            port.emission.reset()
+            port.emission.offer(port.last_weight)
+        while True:
+            timeout = min(port.emission.time_until_due() for port in self.ports)
+            try:
+                reading_ts, (port, weight) = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+                port.emission.offer(weight)
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.monotonic()
+            for port in self.ports:
+                weight = port.emission.poll(now)
+                if weight is not None:
+                    await self.send_weight(port, weight)
+
+    async def send_stats(self):
+        """ส่ง stats ของทุก port ทุก stats_interval วินาที (ค่าที่สั้นที่สุดของทุก port, 0 = ไม่ส่ง)"""
+        intervals = [port.emission_config.get('stats_interval', 0) for port in self.ports]
+        intervals = [interval for interval in intervals if interval > 0]
+        if not intervals:
+            return
+        while True:
+            await asyncio.sleep(min(intervals))
+            for port in self.ports:
+                await self.websocket.send(json.dumps(port.build_stats_message()))
+
+    async def connect_to_server(self):
+        """เชื่อมต่อ websocket เส้นเดียวสำหรับทุก port และเชื่อมต่อใหม่เมื่อหลุด"""
+        while True:
+            try:
+                print(f"Daemon: Connecting to server {self.server_url}")
+                async with websockets.connect(self.server_url) as websocket:
+                    self.websocket = websocket
+                    print(f"Daemon: Connected to server ({len(self.ports)} scales)")
+                    # socket เดียวของทุก port - ไม่ระบุ client_id (แต่ละข้อความค่าน้ำหนักมี client_id เอง)
+                    await websocket.send(json.dumps(build_hello_message()))
+                    stats_task = asyncio.create_task(self.send_stats())
+                    try:
+                        await self.send_readings()
+                    finally:
+                        stats_task.cancel()
+            except Exception as e:
+                print(f"Daemon: Connection error: {e}")
+            self.websocket = None
+            await asyncio.sleep(SERVER_RECONNECT_DELAY)
+
+    async def run(self):
+        """เริ่มอ่านทุก port แล้วส่งข้อมูลไป server"""
+        self.queue = asyncio.Queue(maxsize=DEFAULT_QUEUE_SIZE * len(self.ports))
+        for port in self.ports:
+            port.weight_queue = self.queue
+            port.start_serial_reader()
+        await self.connect_to_server()
+
+
+if __name__ == '__main__':
+    config_path = sys.argv[1] if len(sys.argv) > 1 else DAEMON_CONFIG_FILE
+    try:
+        server_url, ports = load_daemon_config(config_path)
+    except (OSError, ValueError, configparser.Error) as e:
+        print(f"Daemon: {e}")
+        sys.exit(1)
+
+    print(f"Daemon: {len(ports)} scales from {os.path.abspath(config_path)}")
+    for port in ports:
+        print(f"Daemon:   {port.client_id} -> {port.serial_config['port']} ({port.framing_config['mode']})")
+
+    try:
+        asyncio.run(ScaleDaemon(ports, server_url).run())
+    except KeyboardInterrupt:
+        print("Daemon: Stopped.")
+    finally:
+        for port in ports:
+            port.stop_capture()
@@ -0,0 +1,183 @@
+"""
+Scale Parsers - parser แบบ byte-level สำหรับรูปแบบที่ตายตัวใน SCALE_PATTERNS
+- ตรวจ prefix, เครื่องหมาย, สแกนตัวเลข และสถานะนิ่ง/ไม่นิ่ง จาก bytes ของ frame โดยตรง
+  ไม่ใช้ regex และไม่ decode เป็น str
+- registry ตามชื่อ Pattern: Pattern ที่ไม่มี parser (Custom Pattern 1-3) ใช้ regex ใน scale_patterns แทน
+- ผลลัพธ์เป็น WeightReading (ค่า, หน่วย, นิ่งหรือไม่) แทนข้อความ
+
+เพิ่ม parser ของเครื่องชั่งรุ่นใหม่:
+    @register_parser('ชื่อ Pattern')
+    def parse_my_scale(frame: bytes) -> Optional[WeightReading]:
+        ...
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+
+from scale_patterns import (DEFAULT_SENSITIVITY, RAW_PATTERN, SCALE_PATTERNS, DEFAULT_PATTERN,
+                            apply_weight_rules, compile_pattern)
+from weight_reading import DECIGRAMS_PER_KG, DEFAULT_UNIT, WeightReading, kg_to_decigrams
+
+_WHITESPACE = b' \t\r\n\x0b\x0c'
+_DIGIT_0 = 0x30
+_DIGIT_9 = 0x39
+_DOT = 0x2e
+
+
+FrameParser = Callable[[bytes], Optional[WeightReading]]
+
+PrefixIndicators = Tuple[Tuple[bytes, bool, Optional[bool]], ...]
+
+# ชื่อ Pattern -> parser
+PARSERS: Dict[str, FrameParser] = {}
+# ชื่อ Pattern -> indicators ของ parser แบบ "<prefix> <ตัวเลข>" (batch_decoder ใช้ตารางเดียวกัน)
+PREFIX_LAYOUTS: Dict[str, PrefixIndicators] = {}
+
+
+def register_parser(pattern_name: str):
+    """Decorator สำหรับลงทะเบียน parser ของ Pattern (แทนที่ parser เดิมถ้ามี)"""
+    def decorator(parser: FrameParser) -> FrameParser:
+        PARSERS[pattern_name] = parser
+        PREFIX_LAYOUTS.pop(pattern_name, None)
+        return parser
+    return decorator
+
+
+def register_prefix_parser(pattern_name: str, indicators: PrefixIndicators) -> FrameParser:
+    """ลงทะเบียน parser แบบ "<prefix> <ตัวเลข>" (ดู make_prefix_parser)"""
+    parser = register_parser(pattern_name)(make_prefix_parser(indicators))
+    PREFIX_LAYOUTS[pattern_name] = indicators
+    return parser
+
+
+def _digits_end(frame: bytes, pos: int) -> int:
+    end = len(frame)
+    while pos < end and _DIGIT_0 <= frame[pos] <= _DIGIT_9:
+        pos += 1
+    return pos
+
+
+def _prefix_digits(frame: bytes, prefix: bytes) -> Optional[bytes]:
+    """หา prefix + ช่องว่างอย่างน้อยหนึ่งตัว + ตัวเลข คืน bytes ของตัวเลข"""
+    pos = frame.find(prefix)
+    while pos >= 0:
+        rest = frame[pos + len(prefix):]
+        digits = rest.lstrip(_WHITESPACE)
+        if len(digits) < len(rest):
+            # รูปแบบที่พบบ่อย: ตัวเลขยาวจนจบ frame - ตรวจด้วย isdigit() ครั้งเดียว
+            if digits.isdigit():
+                return digits
+            end = _digits_end(digits, 0)
+            if end:
+                return digits[:end]
+        pos = frame.find(prefix, pos + 1)
+    return None
+
+
+def make_prefix_parser(indicators: PrefixIndicators) -> FrameParser:
+    """
+    สร้าง parser สำหรับรูปแบบ "<prefix> <ตัวเลข>" เช่น CAS 001230, MT 001230
+
+    Args:
+        indicators: (prefix, is_zero, stable) เรียงตามลำดับความสำคัญ
+            is_zero=True: ถ้าตามด้วยเลข 0 อย่างน้อย 3 ตัว = น้ำหนัก 0 (ตัวเลขหลังจากนั้นไม่สนใจ)
+    """
+    value_indicators = [item for item in indicators if not item[1]]
+    zero_indicators = [item for item in indicators if item[1]]
+
+    def parse(frame: bytes) -> Optional[WeightReading]:
+        # ค่าน้ำหนักก่อน ค่าศูนย์ทีหลัง (เหมือน regex: ค่าที่ไม่ใช่ศูนย์ชนะ)
+        for prefix, _, stable in value_indicators:
+            digits = _prefix_digits(frame, prefix)
+            if digits is not None:
+                return WeightReading(int(digits) * DECIGRAMS_PER_KG, DEFAULT_UNIT, stable)
+        for prefix, _, stable in zero_indicators:
+            digits = _prefix_digits(frame, prefix)
+            if digits is not None and digits.startswith(b'000'):
+                return WeightReading(0, DEFAULT_UNIT, stable)
+        return None
+
+    return parse
+
+
+register_prefix_parser('Default', (
+    (b'1BH', False, None), (b'1@H', False, None),
+    (b'1CH', True, None), (b' H', True, None), (b'1Rh', True, None),
+))
+register_prefix_parser('CAS Scale', (
+    (b'CAS', False, None), (b'ST', False, True),
+))
+register_prefix_parser('Mettler Toledo', (
+    (b'MT', False, None), (b'WT', False, None),
+))
+register_prefix_parser('Sartorius', (
+    (b'SA', False, None), (b'WE', False, None),
+))
+
+
+@register_parser('ST,GS Format')
+def parse_st_gs(frame: bytes) -> Optional[WeightReading]:
+    """ST,GS,+00123.4kg (นิ่ง) / US,GS,-00012.5kg (ไม่นิ่ง)"""
+    pos = frame.find(b',GS,')
+    while pos >= 0:
+        reading = _parse_st_gs_at(frame, pos)
+        if reading is not None:
+            return reading
+        pos = frame.find(b',GS,', pos + 1)
+    return None
+
+
+def _parse_st_gs_at(frame: bytes, pos: int) -> Optional[WeightReading]:
+    status = frame[pos - 2:pos] if pos >= 2 else b''
+    if status == b'ST':
+        stable = True
+    elif status == b'US':
+        stable = False
+    else:
+        return None
+
+    sign_pos = pos + 4
+    if sign_pos >= len(frame) or frame[sign_pos] not in b'+-':
+        return None
+    start = sign_pos + 1
+    end = _digits_end(frame, start)
+    if end == start:
+        return None
+    if end < len(frame) and frame[end] == _DOT:
+        end = _digits_end(frame, end + 1)
+    if not frame.startswith(b'kg', end):
+        return None
+
+    decigrams = kg_to_decigrams(float(frame[start:end]))
+    if frame[sign_pos] == 0x2d:  # '-'
+        decigrams = -decigrams
+    return WeightReading(decigrams, DEFAULT_UNIT, stable)
+
+
+def parse_frame(frame: bytes, pattern_name: str,
+                sensitivity: float = DEFAULT_SENSITIVITY) -> Optional[WeightReading]:
+    """
+    Parse หนึ่ง frame (bytes จาก framer) ตาม Pattern ที่เลือก
+
+    Args:
+        frame: bytes ของ frame
+        pattern_name: ชื่อ Pattern ใน SCALE_PATTERNS (ไม่พบ = ใช้ Default)
+        sensitivity: น้ำหนักที่น้อยกว่าค่านี้ถือเป็น 0
+
+    Returns:
+        Optional[WeightReading]: ค่าน้ำหนัก หรือ None ถ้าไม่พบ (Raw Data คืน None เสมอ)
+    """
+    if pattern_name not in SCALE_PATTERNS:
+        pattern_name = DEFAULT_PATTERN
+    if pattern_name == RAW_PATTERN:
+        return None
+
+    parser = PARSERS.get(pattern_name)
+    if parser is not None:
+        reading = parser(frame)
+        if reading is not None and reading.decigrams < sensitivity * DECIGRAMS_PER_KG:
+            reading.decigrams = kg_to_decigrams(apply_weight_rules(reading.kg, sensitivity))
+        return reading
+
+    # ไม่มี fast path (เช่น Custom Pattern) - ใช้ regex ที่ compile ไว้แล้ว
+    value = compile_pattern(pattern_name).parse_value(frame.decode('latin-1'), sensitivity)
+    return None if value is None else WeightReading.from_kg(value)
@@ -0,0 +1,239 @@
+"""
+Scale Patterns for RS232 Scale Client
+รูปแบบข้อมูลของเครื่องชั่งแต่ละรุ่น และฟังก์ชัน parse ที่ไม่ขึ้นกับ GUI
+(ใช้ร่วมกันระหว่าง RS232ClientGUI, serial_capture replay และ benchmark)
+"""
+
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_SENSITIVITY = 0.1  # ความไวในการอ่านน้ำหนัก (kg)
+RAW_PATTERN = 'Raw Data (No Parse)'
+DEFAULT_PATTERN = 'Default'
+
+# Scale Pattern Configuration - รองรับหลายรุ่น/ยี่ห้อ
+SCALE_PATTERNS = {
+    'Raw Data (No Parse)': [
+        ("RAW", r".*", False),  # รับข้อมูลทั้งหมดโดยไม่ parse
+    ],
+    'Default': [
+        ("1CH", r"1CH\s+(0{3,})", True),
+        (" H ", r"\sH\s+(0{3,})", True),
+        ("1Rh", r"1Rh\s+(0{3,})", True),
+        ("1BH", r"1BH\s+(\d+)", False),
+        ("1@H", r"1@H\s+(\d+)", False),
+    ],
+    'CAS Scale': [
+        ("CAS", r"CAS\s+(\d+)", False),
+        ("CAS", r"CAS\s+(0{3,})", True),
+        ("ST", r"ST\s+(\d+)", False),
+        ("ST", r"ST\s+(0{3,})", True),
+    ],
+    'ST,GS Format': [
+        ("ST,GS", r"(ST),GS,\+([0-9]+\.?[0-9]*)kg", False),  # น้ำหนัก Stable เช่น ST,GS,+123.4kg
+        ("US,GS", r"(US),GS,\+([0-9]+\.?[0-9]*)kg", False),  # น้ำหนัก Unstable เช่น US,GS,+123.4kg
+        ("ST,GS", r"(ST),GS,\+0{3,}\.?0*kg", True),          # น้ำหนัก 0 Stable เช่น ST,GS,+00000.0kg
+        ("US,GS", r"(US),GS,\+0{3,}\.?0*kg", True),          # น้ำหนัก 0 Unstable เช่น US,GS,+00000.0kg
+        # เพิ่ม pattern สำหรับค่าติดลบ
+        ("ST,GS", r"(ST),GS,-([0-9]+\.?[0-9]*)kg", False),   # น้ำหนัก Stable ติดลบ เช่น ST,GS,-123.4kg
+        ("US,GS", r"(US),GS,-([0-9]+\.?[0-9]*)kg", False),   # น้ำหนัก Unstable ติดลบ เช่น US,GS,-123.4kg
+        ("ST,GS", r"(ST),GS,-0{3,}\.?0*kg", True),           # น้ำหนัก 0 Stable ติดลบ เช่น ST,GS,-00000.0kg
+        ("US,GS", r"(US),GS,-0{3,}\.?0*kg", True),           # น้ำหนัก 0 Unstable ติดลบ เช่น US,GS,-00000.0kg
+    ],
+    'Mettler Toledo': [
+        ("MT", r"MT\s+(\d+)", False),
+        ("MT", r"MT\s+(0{3,})", True),
+        ("WT", r"WT\s+(\d+)", False),
+        ("WT", r"WT\s+(0{3,})", True),
+    ],
+    'Sartorius': [
+        ("SA", r"SA\s+(\d+)", False),
+        ("SA", r"SA\s+(0{3,})", True),
+        ("WE", r"WE\s+(\d+)", False),
+        ("WE", r"WE\s+(0{3,})", True),
+    ],
+    'Custom Pattern 1': [
+        ("CUSTOM1", r"CUSTOM1\s+(\d+)", False),
+        ("CUSTOM1", r"CUSTOM1\s+(0{3,})", True),
+    ],
+    'Custom Pattern 2': [
+        ("CUSTOM2", r"CUSTOM2\s+(\d+)", False),
+        ("CUSTOM2", r"CUSTOM2\s+(0{3,})", True),
+    ],
+    'Custom Pattern 3': []  # จะถูกเติมด้วยข้อมูลจากผู้ใช้
+}
+
+
+def apply_weight_rules(weight_val: float, sensitivity: float = DEFAULT_SENSITIVITY) -> float:
+    """
+    กฎเดียวกันสำหรับทุก parser (regex และ fast path)
+    - ค่าติดลบอาจหมายถึงการชั่งผิดทิศทางหรือมีปัญหา - ใช้ค่าสัมบูรณ์ (น้อยกว่า 0.1 kg ถือเป็น 0)
+    - ค่าที่น้อยกว่า sensitivity ถือเป็น 0
+    """
+    if weight_val < 0:
+        weight_val = 0.0 if weight_val > -0.1 else -weight_val
+    if weight_val < sensitivity:
+        weight_val = 0.0
+    return weight_val
+
+
+def format_weight(weight_val: Optional[float]) -> str:
+    """ข้อความค่าน้ำหนักแบบเดิม: "N/A" = ไม่พบ, "0" = ศูนย์, อื่นๆ = str(float)"""
+    if weight_val is None:
+        return "N/A"
+    if weight_val == 0.0:
+        return "0"
+    return str(weight_val)
+
+
+class CompiledPatternSet:
+    """
+    Pattern ชุดหนึ่งใน SCALE_PATTERNS ที่ compile แล้ว
+    - รวมทุก entry เป็น regex เดียว (alternation แบบ named group) scan ข้อความครั้งเดียวต่อ frame
+      แทน re.findall ทีละ entry
+    - entry ค่าน้ำหนักอยู่ก่อน entry ศูนย์ เพื่อให้ "CAS 000123" ได้ 123 ไม่ใช่ 0
+    - ถ้ารวมไม่ได้ (เช่น regex ของผู้ใช้มี inline flag) จะ scan ทีละ entry แบบเดิม
+    """
+
+    __slots__ = ('name', 'source', 'regex', 'groups', 'fallback')
+
+    def __init__(self, name: str, entries: List[Tuple[str, str, bool]]):
+        """
+        Compile Pattern หนึ่งชุด
+
+        Args:
+            name: ชื่อ Pattern
+            entries: รายการ (indicator, regex, is_zero) จาก SCALE_PATTERNS
+
+        Raises:
+            re.error: ถ้า regex ของ entry ใดไม่ถูกต้อง
+        """
+        self.name = name
+        self.source = entries
+        self.regex = None
+        self.groups: Dict[str, Tuple[str, bool, int]] = {}
+        self.fallback: List[Tuple[str, bool, 're.Pattern', int]] = []
+
+        compiled = [(indicator, re.compile(pattern), is_zero) for indicator, pattern, is_zero in entries]
+        parts = []
+        group = 1
+        # sorted() คงลำดับเดิมภายในกลุ่มเดียวกัน: ค่าน้ำหนัก (False) ก่อน ศูนย์ (True)
+        for index, (indicator, regex, is_zero) in sorted(enumerate(compiled), key=lambda item: item[1][2]):
+            group_name = f"e{index}"
+            parts.append(f"(?P<{group_name}>{regex.pattern})")
+            # ค่าน้ำหนักอยู่ใน capture group สุดท้ายของ entry (เช่น ST,GS มี 2 groups) หรือทั้งข้อความถ้าไม่มี group
+            self.groups[group_name] = (indicator, is_zero, group + regex.groups)
+            group += regex.groups + 1
+
+        if not parts:
+            return
+        try:
+            self.regex = re.compile('|'.join(parts))
+        except re.error:
+            self.fallback = [(indicator, is_zero, regex, regex.groups)
+                             for indicator, regex, is_zero in compiled]
+
+    def matches(self, text: str) -> Iterator[Tuple[str, bool, str]]:
+        """คืน (indicator, is_zero, ข้อความตัวเลข) ของทุก match ตามลำดับ"""
+        if self.regex is not None:
+            for match in self.regex.finditer(text):
+                indicator, is_zero, value_group = self.groups[match.lastgroup]
+                yield indicator, is_zero, match.group(value_group)
+            return
+        for indicator, is_zero, regex, value_group in self.fallback:
+            for match in regex.finditer(text):
+                yield indicator, is_zero, match.group(value_group)
+
+    def parse(self, cleaned_text: str, sensitivity: float = DEFAULT_SENSITIVITY,
+              log: Optional[Callable[[str], None]] = None) -> str:
+        """Parse หนึ่ง frame - ค่าที่ไม่ใช่ศูนย์ตัวสุดท้ายชนะ (ดู parse_scale_text)"""
+        return format_weight(self.parse_value(cleaned_text, sensitivity, log))
+
+    def parse_value(self, cleaned_text: str, sensitivity: float = DEFAULT_SENSITIVITY,
+                    log: Optional[Callable[[str], None]] = None) -> Optional[float]:
+        """เหมือน parse() แต่คืนค่าเป็นตัวเลข (None = ไม่พบ)"""
+        weight_result = None
+        found_zero = False
+        for indicator, is_zero, num_str in self.matches(cleaned_text):
+            if is_zero:
+                found_zero = True
+                continue
+            try:
+                # รองรับทั้งตัวเลขเต็มและทศนิยม รวมถึงค่าติดลบ
+                if '.' in num_str:
+                    weight_val = float(num_str)
+                else:
+                    weight_val = float(int(num_str))
+            except (TypeError, ValueError):
+                continue
+
+            if weight_val < 0 and log:
+                log(f"Negative weight converted: {weight_val} -> {apply_weight_rules(weight_val, 0.0)} "
+                    f"(from: {cleaned_text})")
+            weight_val = apply_weight_rules(weight_val, sensitivity)
+
+            if weight_val == 0.0:
+                found_zero = True
+            else:
+                weight_result = weight_val
+
+        if weight_result is not None:
+            return weight_result
+        if found_zero:
+            return 0.0
+        return None
+
+
+# Pattern ที่ compile แล้ว ตามชื่อ - compile ใหม่เมื่อรายการใน SCALE_PATTERNS ถูกแทนที่ (เช่น Custom Pattern 3)
+_compiled_patterns: Dict[str, CompiledPatternSet] = {}
+
+
+def compile_pattern(pattern_name: str) -> CompiledPatternSet:
+    """
+    คืน Pattern ที่ compile แล้ว (compile เฉพาะครั้งแรกหรือเมื่อรายการเปลี่ยน)
+
+    Args:
+        pattern_name: ชื่อ Pattern ใน SCALE_PATTERNS (ไม่พบ = ใช้ Default)
+
+    Raises:
+        re.error: ถ้า regex ใน Pattern ไม่ถูกต้อง
+    """
+    if pattern_name not in SCALE_PATTERNS:
+        pattern_name = DEFAULT_PATTERN
+    entries = SCALE_PATTERNS[pattern_name]
+    compiled = _compiled_patterns.get(pattern_name)
+    if compiled is None or compiled.source is not entries:
+        compiled = CompiledPatternSet(pattern_name, entries)
+        _compiled_patterns[pattern_name] = compiled
+    return compiled
+
+
+def compile_scale_patterns():
+    """Compile ทุก Pattern ล่วงหน้า (เรียกตอนโหลด config) - regex ที่ผิดจะถูกข้าม"""
+    for pattern_name in SCALE_PATTERNS:
+        try:
+            compile_pattern(pattern_name)
+        except re.error:
+            pass
+
+
+def parse_scale_text(cleaned_text: str, pattern_name: str,
+                     sensitivity: float = DEFAULT_SENSITIVITY,
+                     log: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Parse ข้อความหนึ่ง frame ตาม Pattern ที่เลือก
+    ใช้ Pattern ที่ compile ไว้แล้ว (scan ครั้งเดียว) - ถ้ามีหลายค่า ค่าที่ไม่ใช่ศูนย์ตัวสุดท้ายในข้อความชนะ
+
+    Args:
+        cleaned_text: ข้อความของ frame ที่ decode แล้ว
+        pattern_name: ชื่อ Pattern ใน SCALE_PATTERNS (ไม่พบ = ใช้ Default)
+        sensitivity: น้ำหนักที่น้อยกว่าค่านี้ถือเป็น 0
+        log: ฟังก์ชันสำหรับ log ค่าติดลบที่ถูกแปลง (None = ไม่ log)
+
+    Returns:
+        str: ค่าน้ำหนัก หรือ "N/A" ถ้าไม่พบ
+    """
+    # ถ้าเป็น Raw Data (No Parse) ให้แสดงข้อมูลดิบเลย
+    if pattern_name == RAW_PATTERN:
+        return cleaned_text.strip()
+    return compile_pattern(pattern_name).parse(cleaned_text, sensitivity, log)
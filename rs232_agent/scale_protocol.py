@@ -0,0 +1,224 @@
+"""
+Scale Protocol - จุดเดียวสำหรับแปลง bytes จากเครื่องชั่งเป็นค่าน้ำหนัก
+รวม framing (serial_framer), ตาราง Pattern (scale_patterns), parser (scale_parsers),
+การตรวจรูปแบบอัตโนมัติ (format_detector) และค่าน้ำหนัก (weight_reading)
+ทุกโปรแกรม (RS232ClientGUI, rs232_client, scale_daemon, agent-20250827, rs232_config_tester)
+ใช้ ScaleDecoder ตัวเดียวกัน - แก้ไขหรือเร่งความเร็วการ parse ที่นี่ครั้งเดียวได้ผลทุกที่
+
+ตรวจผลการ parse กับ golden corpus (scale_protocol_golden.jsonl):
+    python -m pytest tests/test_scale_protocol_golden.py
+
+ใช้งาน:
+    decoder = ScaleDecoder(make_framer(framing_config), pattern_name='Auto Detect')
+    for frame, reading in decoder.decode(data):
+        if reading is not None:
+            ...
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from format_detector import (AUTO_PATTERN, AUTO_REDETECT_MISSES, FormatDetector, cached_format,
+                             format_cache_key, remember_format)
+from scale_parsers import PARSERS, parse_frame, register_parser
+from scale_patterns import (DEFAULT_PATTERN, DEFAULT_SENSITIVITY, RAW_PATTERN, SCALE_PATTERNS,
+                            compile_pattern, compile_scale_patterns, parse_scale_text)
+from serial_framer import (FRAMING_MODES, default_framing_config, load_framing_config, make_framer,
+                           save_framing_config)
+from weight_reading import DECIGRAMS_PER_KG, DEFAULT_UNIT, WeightReading, WeightStatus
+
+__all__ = [
+    'AUTO_PATTERN', 'DECIGRAMS_PER_KG', 'DEFAULT_PATTERN', 'DEFAULT_SENSITIVITY', 'DEFAULT_UNIT',
+    'FRAMING_MODES', 'HELLO_MESSAGE_TYPE', 'PARSERS', 'PUBLISHER_ROLE', 'RAW_PATTERN', 'SCALE_PATTERNS',
+    'STATS_MESSAGE_TYPE', 'SUBSCRIBER_ROLE', 'ScaleDecoder', 'WeightReading', 'WeightStatus',
+    'build_hello_message', 'build_stats_message', 'compile_pattern', 'compile_scale_patterns',
+    'default_framing_config', 'format_cache_key', 'load_framing_config', 'make_framer', 'parse_frame',
+    'parse_scale_text', 'register_parser', 'save_framing_config',
+]
+
+# ข้อความ stats ที่ client ส่งไป agent.py เป็นระยะ (แยกจากข้อความค่าน้ำหนักด้วย key "type")
+STATS_MESSAGE_TYPE = 'stats'
+# ข้อความแรกหลังเชื่อมต่อ agent.py - บอกบทบาทของ socket
+# publisher = เครื่องชั่ง (ส่งค่าน้ำหนัก ไม่รับ broadcast), subscriber = browser (รับ broadcast)
+HELLO_MESSAGE_TYPE = 'hello'
+PUBLISHER_ROLE = 'publisher'
+SUBSCRIBER_ROLE = 'subscriber'
+
+
+class ScaleDecoder:
+    """
+    framer + Pattern ที่เลือก (ตายตัว / Raw Data / Auto Detect) + sensitivity
+    Auto Detect: เก็บ frame ช่วงแรกให้ FormatDetector แล้วใช้ Pattern ที่ได้
+    (บันทึกลง cache ตาม cache_key ถ้ากำหนด และตรวจใหม่เมื่อ parse ไม่ได้ติดกันหลายครั้ง)
+    นับ frame ที่ parse ได้ / ไม่ได้ (แยกตาม Pattern) และ exception ระหว่าง parse - ดู stats()
+    """
+
+    def __init__(self, framer, pattern_name: str = DEFAULT_PATTERN,
+                 sensitivity: float = DEFAULT_SENSITIVITY, cache_key: Optional[str] = None,
+                 log: Optional[Callable[[str], None]] = None):
+        """
+        เริ่มต้น ScaleDecoder
+
+        Args:
+            framer: framer จาก make_framer()
+            pattern_name: ชื่อ Pattern ใน SCALE_PATTERNS, RAW_PATTERN หรือ AUTO_PATTERN
+            sensitivity: น้ำหนักที่น้อยกว่าค่านี้ถือเป็น 0 (kg)
+            cache_key: key ของ cache รูปแบบเครื่องชั่ง (None = ไม่ใช้ cache)
+            log: ฟังก์ชันสำหรับ log ผลการตรวจรูปแบบและ parse error (None = print)
+        """
+        self.framer = framer
+        self.sensitivity = sensitivity
+        self.log = log or print
+        self.pattern_name = pattern_name
+        self.cache_key = cache_key
+        self.detected_pattern: Optional[str] = None
+        self.detector: Optional[FormatDetector] = None
+        self.misses = 0
+        self.parsed = 0
+        self.parse_errors = 0
+        # ชื่อ Pattern -> จำนวน frame ที่ parse ไม่ได้ (Auto Detect = frame ระหว่างตรวจรูปแบบ)
+        self.parse_misses: Dict[str, int] = {}
+        self.set_pattern(pattern_name, cache_key)
+
+    def set_pattern(self, pattern_name: str, cache_key: Optional[str] = None):
+        """เปลี่ยน Pattern - Auto Detect เริ่มตรวจใหม่ (ใช้ Pattern จาก cache ถ้ามี)"""
+        self.pattern_name = pattern_name
+        self.cache_key = cache_key
+        self.detector = None
+        self.misses = 0
+        self.detected_pattern = None
+        if pattern_name == AUTO_PATTERN and cache_key is not None:
+            self.detected_pattern = cached_format(cache_key)
+            if self.detected_pattern:
+                self.log(f"Auto detect: using cached pattern {self.detected_pattern}")
+
+    @property
+    def active_pattern(self) -> Optional[str]:
+        """Pattern ที่ใช้ parse จริง (None = Auto Detect ที่ยังตรวจไม่เสร็จ)"""
+        if self.pattern_name == AUTO_PATTERN:
+            return self.detected_pattern
+        return self.pattern_name
+
+    def reset(self):
+        """ทิ้งข้อมูลที่ค้างใน framer (เช่น หลัง reconnect)"""
+        self.framer.reset()
+
+    def detect(self, frame: bytes) -> Optional[str]:
+        """ส่ง frame ให้ FormatDetector - คืน Pattern ที่ตรวจได้ หรือ None ถ้ายังเก็บข้อมูลอยู่"""
+        if self.detected_pattern:
+            return self.detected_pattern
+        if self.detector is None:
+            self.detector = FormatDetector()
+            self.log("Auto detect: sampling frames...")
+        detector = self.detector
+        pattern_name = detector.feed(frame)
+        if not detector.done:
+            return None
+        self.detector = None
+        if pattern_name is None:
+            # ตรวจไม่ได้ (เช่น ตั้งค่า serial ผิด) - เริ่มตรวจรอบใหม่กับ frame ถัดไป
+            self.log(f"Auto detect: no pattern matched ({detector.summary()})")
+            return None
+        self.detected_pattern = pattern_name
+        if self.cache_key is not None:
+            remember_format(self.cache_key, pattern_name)
+        self.log(f"Auto detect: {pattern_name} ({detector.summary()})")
+        return pattern_name
+
+    def count_miss(self):
+        """frame ที่ Pattern ที่ตรวจได้ parse ไม่ได้ - ติดกันหลายครั้ง (เช่น เปลี่ยนเครื่องชั่ง) = ลบ cache แล้วตรวจใหม่"""
+        self.misses += 1
+        if self.misses >= AUTO_REDETECT_MISSES and self.detected_pattern:
+            self.log(f"Auto detect: {self.detected_pattern} stopped matching, detecting again")
+            if self.cache_key is not None:
+                remember_format(self.cache_key, None)
+            self.set_pattern(AUTO_PATTERN, self.cache_key)
+
+    def parse(self, frame: bytes) -> Optional[WeightReading]:
+        """
+        Parse หนึ่ง frame ตาม Pattern ที่เลือก
+
+        Returns:
+            Optional[WeightReading]: ค่าน้ำหนัก หรือ None ถ้า parse ไม่ได้ / กำลังตรวจรูปแบบ
+            (Raw Data: ข้อความของ frame แปลงด้วย WeightReading.from_text - ไม่ใช่ตัวเลข = ค่า no_data
+            และนับเป็น parse_errors)
+        """
+        auto = self.pattern_name == AUTO_PATTERN
+        pattern_name = self.detect(frame) if auto else self.pattern_name
+        if pattern_name is None:
+            self._count_parse(AUTO_PATTERN, None)
+            return None
+        if pattern_name == RAW_PATTERN:
+            line = frame.decode('latin-1').strip()
+            reading = WeightReading.from_text(line) if line else None
+            if reading is not None and not reading.ok:
+                # บรรทัดที่ไม่ใช่ตัวเลขยังคืนค่าให้แสดงข้อความดิบ แต่ไม่นับเป็น frame ที่ parse ได้
+                self.parse_errors += 1
+                return reading
+            return self._count_parse(pattern_name, reading)
+        reading = parse_frame(frame, pattern_name, self.sensitivity)
+        if auto:
+            if reading is None:
+                self.count_miss()
+            else:
+                self.misses = 0
+        return self._count_parse(pattern_name, reading)
+
+    def _count_parse(self, pattern_name: str, reading: Optional[WeightReading]) -> Optional[WeightReading]:
+        if reading is None:
+            self.parse_misses[pattern_name] = self.parse_misses.get(pattern_name, 0) + 1
+        else:
+            self.parsed += 1
+        return reading
+
+    def decode(self, data: bytes) -> Iterator[Tuple[bytes, Optional[WeightReading]]]:
+        """Frame bytes ที่อ่านได้แล้ว parse ทีละ frame - คืน (frame, ค่าน้ำหนักหรือ None)"""
+        for frame in self.framer.feed(data):
+            try:
+                reading = self.parse(frame)
+            except Exception as e:
+                self.parse_errors += 1
+                self.log(f"Error parsing frame {frame!r}: {e}")
+                reading = None
+            yield frame, reading
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        ตัวนับสุขภาพของ read path (ส่งไป agent.py เป็นข้อความ stats และแสดงใน GUI)
+
+        Returns:
+            dict: bytes_read, frames_framed, frames_parsed, parse_misses (ต่อ Pattern),
+            parse_errors (parse แล้วเกิด exception / บรรทัด Raw Data ที่ไม่ใช่ตัวเลข),
+            bytes_dropped, bytes_trimmed (เกิน max_buffer), bytes_pending, max_buffer_depth
+        """
+        framer = self.framer
+        return {
+            'bytes_read': framer.bytes_in,
+            'frames_framed': framer.frames,
+            'frames_parsed': self.parsed,
+            'parse_misses': dict(self.parse_misses),
+            'parse_errors': self.parse_errors,
+            'bytes_dropped': framer.bytes_dropped,
+            'bytes_trimmed': framer.bytes_trimmed,
+            'bytes_pending': framer.pending(),
+            'max_buffer_depth': framer.max_pending,
+        }
+
+
+def build_hello_message(client_id: Optional[str] = None, role: str = PUBLISHER_ROLE) -> Dict[str, Any]:
+    """ข้อความ hello: {"type": "hello", "role", "client_id" (ถ้ามี)} - scale_daemon ไม่ระบุ client_id (หลายเครื่องต่อ socket)"""
+    message = {"type": HELLO_MESSAGE_TYPE, "role": role}
+    if client_id is not None:
+        message["client_id"] = client_id
+    return message
+
+
+def build_stats_message(client_id: str, decoder: ScaleDecoder) -> Dict[str, Any]:
+    """ข้อความ stats ของเครื่องชั่งหนึ่งเครื่อง: {"type": "stats", "client_id", "timestamp", ...ScaleDecoder.stats()}"""
+    return {
+        "type": STATS_MESSAGE_TYPE,
+        "client_id": client_id,
+        "timestamp": time.time(),
+        "pattern": decoder.active_pattern or decoder.pattern_name,
+        **decoder.stats(),
+    }
@@ -0,0 +1,239 @@
+"""
+Serial Capture for RS232 Scale Client
+บันทึก bytes ดิบจาก serial port ลงไฟล์ binary และเล่นซ้ำผ่าน framer/parser ชุดเดียวกับ client
+- ใช้ทำ benchmark ด้วยข้อมูลจริงจากหน้างาน และจำลองปัญหาของเครื่องชั่งโดยไม่ต้องอยู่ที่ตาชั่ง
+
+รูปแบบไฟล์ (.rs232cap):
+    header: magic b'RS232CAP' (8) + version (uint8) + wall time ตอนเริ่มบันทึก (float64)
+    record: monotonic timestamp (float64) + ความยาว (uint32) + bytes ดิบ
+    ทุกค่าเป็น little-endian
+
+ใช้งาน:
+    python serial_capture.py info FILE
+    python serial_capture.py replay FILE [--speed X] [--pattern NAME] [--config client_config.ini]
+        --speed 0 (ค่าเริ่มต้น) = เร็วที่สุด, 1 = เวลาจริง, 10 = เร็วกว่าจริง 10 เท่า
+"""
+
+import argparse
+import configparser
+import os
+import struct
+import sys
+import threading
+import time
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from serial_framer import default_framing_config, load_framing_config, make_framer
+
+CAPTURE_MAGIC = b'RS232CAP'
+CAPTURE_VERSION = 1
+CAPTURE_EXTENSION = '.rs232cap'
+HEADER = struct.Struct('<8sBd')
+RECORD = struct.Struct('<dI')
+
+
+class CaptureWriter:
+    """
+    บันทึกทุก chunk ที่อ่านได้จาก serial port พร้อม monotonic timestamp
+    เรียก write() จาก reader thread ได้ (มี lock)
+    """
+
+    def __init__(self, path: str):
+        """
+        เปิดไฟล์ capture ใหม่ (เขียนทับถ้ามีอยู่แล้ว)
+
+        Args:
+            path: path ของไฟล์ capture
+        """
+        self.path = path
+        self.chunks = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = open(path, 'wb')
+        self._file.write(HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, time.time()))
+
+    def write(self, data: bytes, timestamp: Optional[float] = None):
+        """
+        บันทึก bytes ดิบหนึ่ง chunk
+
+        Args:
+            data: bytes ที่อ่านได้จาก serial port
+            timestamp: time.monotonic() ตอนที่อ่านได้ (None = เวลาปัจจุบัน)
+        """
+        if not data:
+            return
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD.pack(timestamp, len(data)))
+            self._file.write(data)
+            self.chunks += 1
+            self.bytes_written += len(data)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+
+def default_capture_path(prefix: str = 'capture') -> str:
+    """ชื่อไฟล์ capture ตามวันเวลาปัจจุบัน เช่น capture_20250827_153000.rs232cap"""
+    return f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}{CAPTURE_EXTENSION}"
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, bytes]]:
+    """
+    อ่านไฟล์ capture
+
+    Args:
+        path: path ของไฟล์ capture
+
+    Returns:
+        Iterator[Tuple[float, bytes]]: (monotonic timestamp, bytes ดิบ) ตามลำดับที่บันทึก
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path}: not a capture file (header too short)")
+        magic, version, _ = HEADER.unpack(header)
+        if magic != CAPTURE_MAGIC:
+            raise ValueError(f"{path}: not a capture file")
+        if version != CAPTURE_VERSION:
+            raise ValueError(f"{path}: unsupported capture version {version}")
+
+        while True:
+            record = f.read(RECORD.size)
+            if len(record) < RECORD.size:
+                # record สุดท้ายอาจไม่ครบถ้าโปรแกรมถูกปิดระหว่างบันทึก
+                return
+            timestamp, length = RECORD.unpack(record)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, data
+
+
+def capture_start_time(path: str) -> float:
+    """wall time (time.time()) ตอนเริ่มบันทึก"""
+    with open(path, 'rb') as f:
+        magic, _, started = HEADER.unpack(f.read(HEADER.size))
+    if magic != CAPTURE_MAGIC:
+        raise ValueError(f"{path}: not a capture file")
+    return started
+
+
+class ReplaySource:
+    """
+    เล่นไฟล์ capture ซ้ำ ส่งแต่ละ chunk ให้ handle_chunk เหมือนอ่านจาก serial port จริง
+    - speed = 0: เร็วที่สุด (สำหรับ benchmark)
+    - speed = 1: ตามเวลาจริงที่บันทึกไว้, speed > 1: เร็วขึ้นตามสัดส่วน
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        self.path = path
+        self.speed = speed
+
+    def chunks(self) -> Iterator[bytes]:
+        """คืน chunk ตามลำดับ โดยหน่วงเวลาตาม speed"""
+        first_ts = None
+        started = time.monotonic()
+        for timestamp, data in read_capture(self.path):
+            if self.speed > 0:
+                if first_ts is None:
+                    first_ts = timestamp
+                delay = (timestamp - first_ts) / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            yield data
+
+    def replay(self, handle_chunk: Callable[[bytes], Optional[object]]) -> int:
+        """
+        ส่งทุก chunk ให้ handle_chunk (เช่น RS232Client.handle_serial_chunk)
+
+        Returns:
+            int: จำนวน chunk ที่เล่น
+        """
+        count = 0
+        for data in self.chunks():
+            handle_chunk(data)
+            count += 1
+        return count
+
+
+def load_replay_framing(config_path: Optional[str]):
+    """อ่าน [Framing] จาก config ของ client (ไม่มีไฟล์ = line framing)"""
+    if config_path and os.path.exists(config_path):
+        config = configparser.ConfigParser()
+        config.read(config_path, encoding='utf-8')
+        return load_framing_config(config, default_mode='line')
+    return default_framing_config('line')
+
+
+def print_info(path: str):
+    chunks = 0
+    total_bytes = 0
+    first_ts = last_ts = None
+    for timestamp, data in read_capture(path):
+        chunks += 1
+        total_bytes += len(data)
+        if first_ts is None:
+            first_ts = timestamp
+        last_ts = timestamp
+    duration = (last_ts - first_ts) if chunks else 0.0
+    started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(capture_start_time(path)))
+    print(f"File:     {path}")
+    print(f"Started:  {started}")
+    print(f"Chunks:   {chunks}")
+    print(f"Bytes:    {total_bytes}")
+    print(f"Duration: {duration:.1f}s")
+
+
+def replay_to_console(path: str, speed: float, pattern_name: str, config_path: Optional[str]):
+    """เล่นไฟล์ capture ผ่าน framer และ parser แล้วพิมพ์ค่าน้ำหนักที่ได้"""
+    from scale_patterns import parse_scale_text
+
+    framing = load_replay_framing(config_path)
+    framer = make_framer(framing)
+
+    def handle_chunk(data):
+        for frame in framer.feed(data):
+            text = frame.decode('latin-1').strip()
+            if text:
+                print(f"{text!r:40} -> {parse_scale_text(text, pattern_name)}")
+
+    chunks = ReplaySource(path, speed).replay(handle_chunk)
+    print(f"Replayed {chunks} chunks, {framer.frames} frames ({framing['mode']} framing), "
+          f"{framer.bytes_dropped} bytes dropped")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="RS232 serial capture tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    info_parser = subparsers.add_parser('info', help="show capture summary")
+    info_parser.add_argument('file')
+
+    replay_parser = subparsers.add_parser('replay', help="replay capture through framer and parser")
+    replay_parser.add_argument('file')
+    replay_parser.add_argument('--speed', type=float, default=0.0,
+                               help="0 = as fast as possible, 1 = real time")
+    replay_parser.add_argument('--pattern', default='Default', help="scale pattern name")
+    replay_parser.add_argument('--config', default='client_config.ini',
+                               help="client config with [Framing] section")
+
+    args = parser.parse_args()
+    try:
+        if args.command == 'info':
+            print_info(args.file)
+        else:
+            replay_to_console(args.file, args.speed, args.pattern, args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,205 @@
+"""
+Serial Connection Manager for RS232 Scale Client
+จัดการการเปิด serial port แทนการเรียก serial.Serial(**config) ทุกครั้งที่อ่าน
+- state machine: closed -> connected / retrying / gone
+- retrying: เปิด port ไม่ได้ (เช่น port ถูกใช้งานอยู่) ลองใหม่แบบ exponential backoff
+- gone: port ไม่อยู่ในระบบ (เช่น ถอด USB-serial) รอจนกว่า comports() จะเห็น port อีกครั้ง
+- ระหว่างที่ยังไม่ถึงเวลา retry get() คืน None ทันทีโดยไม่ open และไม่ log ซ้ำ
+"""
+
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+import serial
+import serial.tools.list_ports
+
+CLOSED = 'closed'
+CONNECTED = 'connected'
+RETRYING = 'retrying'
+GONE = 'gone'
+
+DEFAULT_MIN_RETRY_DELAY = 1.0   # วินาที
+DEFAULT_MAX_RETRY_DELAY = 30.0  # วินาที
+DEFAULT_PORT_SCAN_INTERVAL = 2.0  # ความถี่ในการเรียก comports() ขณะที่ port หายไป (วินาที)
+
+
+def list_port_names() -> Set[str]:
+    """รายชื่อ serial port ที่มีอยู่ในระบบตอนนี้"""
+    try:
+        return {port.device for port in serial.tools.list_ports.comports()}
+    except Exception:
+        return set()
+
+
+class SerialConnectionManager:
+    """
+    เปิดและเก็บ serial connection หนึ่ง port พร้อม backoff และตรวจจับ hot-plug
+    ปลอดภัยสำหรับการเรียกจากหลาย thread (reader thread และ GUI thread)
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 log: Callable[[str], None] = print,
+                 on_state_change: Optional[Callable[[str], None]] = None,
+                 min_delay: float = DEFAULT_MIN_RETRY_DELAY,
+                 max_delay: float = DEFAULT_MAX_RETRY_DELAY,
+                 scan_interval: float = DEFAULT_PORT_SCAN_INTERVAL):
+        """
+        เริ่มต้น Connection Manager
+
+        Args:
+            config: kwargs ของ serial.Serial (port, baudrate, ...)
+            log: ฟังก์ชันสำหรับ log ข้อความ (เรียกเฉพาะเมื่อ state เปลี่ยนหรือ retry จริง)
+            on_state_change: callback เมื่อ state เปลี่ยน
+            min_delay: เวลารอก่อน retry ครั้งแรก
+            max_delay: เวลารอสูงสุดระหว่าง retry
+            scan_interval: ความถี่ในการตรวจ comports() ขณะ state เป็น gone
+        """
+        self.config = dict(config) if config else None
+        self.log = log
+        self.on_state_change = on_state_change
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.scan_interval = scan_interval
+
+        self.connection: Optional[serial.Serial] = None
+        self.state = CLOSED
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.next_scan = 0.0
+        self.known_ports: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def is_connected(self) -> bool:
+        connection = self.connection
+        return self.state == CONNECTED and connection is not None and connection.is_open
+
+    def get(self, config: Optional[Dict[str, Any]] = None) -> Optional[serial.Serial]:
+        """
+        คืน connection ที่เปิดอยู่ หรือ None ถ้ายังเชื่อมต่อไม่ได้
+
+        Args:
+            config: การตั้งค่าล่าสุด ถ้าต่างจากเดิมจะปิด port เก่าและเปิดใหม่ทันที
+
+        Returns:
+            Optional[serial.Serial]: connection หรือ None (ไม่ block และไม่ open ก่อนถึงเวลา retry)
+        """
+        with self._lock:
+            if config is not None and config != self.config:
+                self._close_connection()
+                self.config = dict(config)
+                self.failures = 0
+                self.next_attempt = 0.0
+                self._set_state(CLOSED)
+
+            if self.is_connected():
+                return self.connection
+            if self.config is None:
+                return None
+
+            now = time.monotonic()
+            if self.state == GONE:
+                if now < self.next_scan:
+                    return None
+                self.next_scan = now + self.scan_interval
+                if not self._port_present():
+                    return None
+                # port กลับมาแล้ว (hot-plug) - เปิดทันทีโดยไม่รอ backoff
+                self.log(f"Serial port {self.config['port']} detected, reconnecting")
+                self.failures = 0
+                self.next_attempt = now
+            elif now < self.next_attempt:
+                return None
+
+            return self._open(now)
+
+    def _open(self, now: float) -> Optional[serial.Serial]:
+        port = self.config['port']
+        try:
+            self.connection = serial.Serial(**self.config)
+        except (serial.SerialException, OSError, ValueError) as e:
+            self.connection = None
+            self._schedule_retry(now, e)
+            return None
+
+        self.failures = 0
+        self.log(f"Connected to {port}")
+        self._set_state(CONNECTED)
+        return self.connection
+
+    def _schedule_retry(self, now: float, error: Optional[Exception]):
+        port = self.config['port']
+        if not self._port_present():
+            self.next_scan = now + self.scan_interval
+            if self.state != GONE:
+                self.log(f"Serial port {port} not found - waiting for it to be plugged in")
+                self._set_state(GONE)
+            return
+
+        self.failures += 1
+        delay = min(self.max_delay, self.min_delay * (2 ** (self.failures - 1)))
+        self.next_attempt = now + delay
+        self.log(f"Serial connection error on {port}: {error} (retry in {delay:.1f}s)")
+        self._set_state(RETRYING)
+
+    def _port_present(self) -> bool:
+        """ตรวจว่า port ยังอยู่ในระบบ (comports() และ log port ที่เพิ่ม/หายไป)"""
+        port = self.config['port']
+        if '://' in port:
+            # URL เช่น socket:// หรือ rfc2217:// ตรวจด้วย comports() ไม่ได้
+            return True
+
+        ports = list_port_names()
+        if ports != self.known_ports:
+            added = sorted(ports - self.known_ports)
+            removed = sorted(self.known_ports - ports)
+            if self.known_ports and added:
+                self.log(f"Serial ports added: {', '.join(added)}")
+            if removed:
+                self.log(f"Serial ports removed: {', '.join(removed)}")
+            self.known_ports = ports
+
+        # pty หรือ device ที่ comports() ไม่แสดง ให้ดูจาก path แทน (posix)
+        return port in ports or os.path.exists(port)
+
+    def mark_lost(self, error: Optional[Exception] = None):
+        """แจ้งว่า connection ใช้งานไม่ได้ (เช่น read error หลังถอดสาย) ให้ปิดและ retry ตาม backoff"""
+        with self._lock:
+            if self.connection is None:
+                return
+            self._close_connection()
+            self.failures = 0
+            self._schedule_retry(time.monotonic(), error)
+
+    def retry_in(self) -> float:
+        """จำนวนวินาทีจนกว่า get() จะลองเปิด port อีกครั้ง"""
+        now = time.monotonic()
+        due = self.next_scan if self.state == GONE else self.next_attempt
+        return max(0.1, due - now)
+
+    def close(self):
+        """ปิด port (เช่น เมื่อหยุด client) - get() ครั้งถัดไปจะเปิดใหม่ทันที"""
+        with self._lock:
+            self._close_connection()
+            self.failures = 0
+            self.next_attempt = 0.0
+            self._set_state(CLOSED)
+
+    def _close_connection(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+        self.connection = None
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        self.state = state
+        if self.on_state_change:
+            try:
+                self.on_state_change(state)
+            except Exception as e:
+                self.log(f"Serial state callback error: {e}")
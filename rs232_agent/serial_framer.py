@@ -0,0 +1,346 @@
+"""
+Serial Framer for RS232 Scale Client
+แยก frame ที่สมบูรณ์ออกจาก byte stream ของเครื่องชั่ง
+ใช้ bytearray + scan cursor แทนการต่อ bytes และตัด buffer ทุก frame
+
+ทุก framer นับจำนวน bytes เพื่อพิสูจน์ว่าแต่ละ byte ถูกประมวลผลครั้งเดียว:
+    bytes_in == bytes_framed + bytes_dropped + pending()
+bytes_trimmed (ส่วนหนึ่งของ bytes_dropped) = bytes ที่ทิ้งเพราะ buffer เกิน max_buffer
+max_pending = ขนาด buffer สูงสุดที่เคยค้างอยู่ (ดูว่า max_buffer เหมาะกับเครื่องชั่งหรือไม่)
+
+รูปแบบ frame เลือกได้ต่อเครื่องชั่งจาก section [Framing] ใน config:
+    mode         = line, stx_etx หรือ fixed
+    delimiters   = (line) byte ที่จบบรรทัด เขียนแบบ escape เช่น \\r\\n
+    stx, etx     = (stx_etx) byte เริ่มต้น/สิ้นสุด frame เช่น \\x02, \\x03
+    frame_length = (fixed) ความยาว frame รวม sync
+    sync         = (fixed) byte ที่ขึ้นต้นทุก frame (ว่าง = ไม่ตรวจ)
+    max_buffer   = ขนาดสูงสุดของ frame ที่ยังไม่จบ ก่อนจะถูกทิ้ง
+"""
+
+import abc
+import configparser
+from typing import Any, Dict, Iterator
+
+STX = b'\x02'
+ETX = b'\x03'
+LINE_DELIMITERS = b'\r\n\x02\x03'
+
+FRAMING_SECTION = 'Framing'
+FRAMING_MODES = ('line', 'stx_etx', 'fixed')
+DEFAULT_MAX_BUFFER = 2048
+
+
+class BaseFramer(abc.ABC):
+    """ส่วนที่ใช้ร่วมกันของ framer: buffer, scan cursor และตัวนับ (subclass ต้อง implement _drain)"""
+
+    def __init__(self, max_buffer: int = 2048):
+        self.max_buffer = max_buffer
+        self.buffer = bytearray()
+        self.scan_pos = 0  # ตำแหน่งที่ค้นหาค้างไว้ (ไม่ต้อง scan ซ้ำ)
+        self.bytes_in = 0
+        self.bytes_framed = 0
+        self.bytes_dropped = 0
+        self.bytes_trimmed = 0
+        self.max_pending = 0
+        self.frames = 0
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        """
+        เพิ่มข้อมูลใหม่และคืน frames ที่สมบูรณ์
+
+        Args:
+            data: bytes ที่อ่านได้จาก serial port
+
+        Returns:
+            Iterator[bytes]: payload ของแต่ละ frame ตามลำดับ
+        """
+        if data:
+            self.bytes_in += len(data)
+            self.buffer += data
+            if len(self.buffer) > self.max_pending:
+                self.max_pending = len(self.buffer)
+        return self._drain()
+
+    @abc.abstractmethod
+    def _drain(self) -> Iterator[bytes]:
+        """แยก frame ที่สมบูรณ์จาก self.buffer ตั้งแต่ self.scan_pos (เรียกจาก feed หลังเพิ่มข้อมูล)"""
+
+    def _compact(self, pos: int):
+        """ลบข้อมูลที่ประมวลผลแล้วออกจากหัว buffer (ครั้งเดียวต่อรอบ)"""
+        if pos:
+            del self.buffer[:pos]
+            self.scan_pos = max(0, self.scan_pos - pos)
+
+        # frame ที่ยังไม่จบแต่ยาวเกินไป ให้ทิ้งเพื่อไม่ให้ buffer โตไม่สิ้นสุด
+        if len(self.buffer) > self.max_buffer:
+            cut = self._trim_point()
+            self.bytes_dropped += cut
+            self.bytes_trimmed += cut
+            del self.buffer[:cut]
+            self.scan_pos = 0
+
+    def _trim_point(self) -> int:
+        """ตำแหน่งที่จะตัด buffer เมื่อเกิน max_buffer (ค่าเริ่มต้น: ทิ้งทั้งหมด)"""
+        return len(self.buffer)
+
+    def pending(self) -> int:
+        """จำนวน bytes ที่ยังค้างอยู่ใน buffer"""
+        return len(self.buffer)
+
+    def is_balanced(self) -> bool:
+        """ตรวจสอบว่าทุก byte ที่รับเข้ามาถูกนับครั้งเดียว (framed, dropped หรือ pending)"""
+        return self.bytes_in == self.bytes_framed + self.bytes_dropped + len(self.buffer)
+
+    def reset(self):
+        """ล้าง buffer (เช่น หลัง reconnect) - bytes ที่ค้างอยู่ถูกนับเป็น dropped"""
+        self.bytes_dropped += len(self.buffer)
+        self.buffer.clear()
+        self.scan_pos = 0
+
+
+class StxEtxFramer(BaseFramer):
+    """
+    Framer สำหรับข้อมูลที่ห่อด้วย STX ... ETX
+    - feed() ต่อข้อมูลใหม่ท้าย bytearray (ไม่ copy ทั้ง buffer)
+    - frames ที่สมบูรณ์ถูก yield ออกไปโดยไม่ copy ส่วนที่เหลือของ buffer ซ้ำ
+    - buffer ถูก compact ครั้งเดียวต่อการ feed หนึ่งครั้ง
+    """
+
+    def __init__(self, stx: bytes = STX, etx: bytes = ETX, max_buffer: int = 2048):
+        """
+        เริ่มต้น Framer
+
+        Args:
+            stx: byte เริ่มต้น frame
+            etx: byte สิ้นสุด frame
+            max_buffer: ขนาดสูงสุดของ frame ที่ยังไม่จบ ก่อนจะถูกทิ้ง
+        """
+        super().__init__(max_buffer)
+        self.stx = stx
+        self.etx = etx
+
+    def _drain(self) -> Iterator[bytes]:
+        buf = self.buffer
+        pos = 0
+        try:
+            while True:
+                stx_index = buf.find(self.stx, pos)
+                if stx_index == -1:
+                    # ไม่มี STX เหลือ ข้อมูลที่เหลือเป็นขยะ
+                    self.bytes_dropped += len(buf) - pos
+                    pos = len(buf)
+                    self.scan_pos = 0
+                    break
+                if stx_index > pos:
+                    self.bytes_dropped += stx_index - pos
+
+                # ถ้าเคยหา ETX ของ frame นี้ไปแล้ว ให้หาต่อจากจุดเดิม
+                etx_index = buf.find(self.etx, max(stx_index + 1, self.scan_pos))
+                if etx_index == -1:
+                    pos = stx_index
+                    self.scan_pos = len(buf)
+                    break
+
+                with memoryview(buf) as view:
+                    frame = view[stx_index + 1:etx_index].tobytes()
+                self.bytes_framed += etx_index + 1 - stx_index
+                self.frames += 1
+                pos = etx_index + 1
+                self.scan_pos = 0
+                yield frame
+        finally:
+            self._compact(pos)
+
+    def _trim_point(self) -> int:
+        # เก็บตั้งแต่ STX ล่าสุดไว้ เผื่อ frame นั้นยังมาไม่ครบ
+        last_stx = self.buffer.rfind(self.stx, 1)
+        return last_stx if last_stx != -1 else len(self.buffer)
+
+
+class LineFramer(BaseFramer):
+    """
+    Framer สำหรับข้อมูลที่จบด้วยตัวคั่น (เช่น CR/LF)
+    - ตัวคั่นทุกตัวใน delimiters ถูกแปลงเป็น LF ครั้งเดียวตอน feed (bytes.translate)
+    - frame ว่าง (เช่น CR LF ติดกัน) ไม่ถูก yield แต่ยังนับเป็น bytes_framed
+    """
+
+    def __init__(self, delimiters: bytes = LINE_DELIMITERS, max_buffer: int = 2000):
+        """
+        เริ่มต้น Framer
+
+        Args:
+            delimiters: byte ที่ถือเป็นจุดสิ้นสุด frame (ค่าเริ่มต้น CR, LF, STX, ETX)
+            max_buffer: ขนาดสูงสุดของบรรทัดที่ยังไม่จบ ก่อนจะถูกทิ้ง
+        """
+        super().__init__(max_buffer)
+        self.delimiters = delimiters
+        self._table = bytes.maketrans(delimiters, b'\n' * len(delimiters))
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        if data:
+            data = data.translate(self._table)
+        return super().feed(data)
+
+    def _drain(self) -> Iterator[bytes]:
+        buf = self.buffer
+        pos = 0
+        try:
+            while True:
+                end = buf.find(b'\n', max(pos, self.scan_pos))
+                if end == -1:
+                    self.scan_pos = len(buf)
+                    break
+                self.bytes_framed += end + 1 - pos
+                if end > pos:
+                    with memoryview(buf) as view:
+                        frame = view[pos:end].tobytes()
+                    self.frames += 1
+                    pos = end + 1
+                    yield frame
+                else:
+                    pos = end + 1
+        finally:
+            self._compact(pos)
+
+
+class FixedLengthFramer(BaseFramer):
+    """
+    Framer สำหรับเครื่องชั่งที่ส่ง frame ความยาวคงที่ (ไม่มีตัวคั่น)
+    - ถ้ากำหนด sync จะหา sync ก่อนทุก frame เพื่อ resync เมื่อ byte หาย
+    - payload ที่ yield ไม่รวม sync
+    """
+
+    def __init__(self, length: int, sync: bytes = b'', max_buffer: int = DEFAULT_MAX_BUFFER):
+        """
+        เริ่มต้น Framer
+
+        Args:
+            length: ความยาวของแต่ละ frame (รวม sync)
+            sync: byte ที่ขึ้นต้นทุก frame (ว่าง = ตัดทุก length bytes)
+            max_buffer: ขนาดสูงสุดของข้อมูลที่ยังไม่ครบ frame ก่อนจะถูกทิ้ง
+        """
+        if length <= len(sync):
+            raise ValueError(f"frame_length must be greater than sync length ({len(sync)}), got {length}")
+        super().__init__(max(max_buffer, length))
+        self.length = length
+        self.sync = sync
+
+    def _drain(self) -> Iterator[bytes]:
+        buf = self.buffer
+        pos = 0
+        sync_len = len(self.sync)
+        try:
+            while True:
+                start = pos
+                if sync_len:
+                    start = buf.find(self.sync, pos)
+                    if start == -1:
+                        # เก็บท้าย buffer ไว้เผื่อ sync หลาย byte มาไม่ครบ
+                        keep_from = max(pos, len(buf) - sync_len + 1)
+                        self.bytes_dropped += keep_from - pos
+                        pos = keep_from
+                        break
+                    self.bytes_dropped += start - pos
+
+                end = start + self.length
+                if end > len(buf):
+                    pos = start
+                    break
+
+                with memoryview(buf) as view:
+                    frame = view[start + sync_len:end].tobytes()
+                self.bytes_framed += self.length
+                self.frames += 1
+                pos = end
+                yield frame
+        finally:
+            self._compact(pos)
+
+
+def decode_escapes(text: str) -> bytes:
+    """แปลงข้อความจาก config เช่น '\\r\\n' หรือ '\\x02' เป็น bytes"""
+    return text.encode('latin-1').decode('unicode_escape').encode('latin-1')
+
+
+def encode_escapes(data: bytes) -> str:
+    """แปลง bytes เป็นข้อความสำหรับเขียนลง config (กลับด้านของ decode_escapes)"""
+    return data.decode('latin-1').encode('unicode_escape').decode('ascii')
+
+
+def default_framing_config(mode: str = 'line') -> Dict[str, Any]:
+    """ค่าเริ่มต้นของ [Framing] สำหรับ mode ที่กำหนด"""
+    return {
+        'mode': mode,
+        'delimiters': LINE_DELIMITERS,
+        'stx': STX,
+        'etx': ETX,
+        'frame_length': 0,
+        'sync': b'',
+        'max_buffer': DEFAULT_MAX_BUFFER,
+    }
+
+
+def load_framing_config(config: configparser.ConfigParser, default_mode: str = 'line',
+                        section_name: str = FRAMING_SECTION) -> Dict[str, Any]:
+    """
+    อ่าน section [Framing] จาก config ที่โหลดแล้ว
+
+    Args:
+        config: ConfigParser ที่อ่านไฟล์แล้ว
+        default_mode: mode ที่ใช้เมื่อไม่มี section [Framing] (แต่ละโปรแกรมมีค่าเดิมต่างกัน)
+        section_name: ชื่อ section (daemon ใช้ [Framing:<client_id>] แยกต่อเครื่องชั่ง)
+
+    Returns:
+        Dict[str, Any]: การตั้งค่าสำหรับ make_framer
+    """
+    settings = default_framing_config(default_mode)
+    if section_name not in config:
+        return settings
+
+    section = config[section_name]
+    mode = section.get('Mode', default_mode).strip().lower()
+    if mode not in FRAMING_MODES:
+        raise ValueError(f"Unknown framing mode '{mode}' (expected one of {', '.join(FRAMING_MODES)})")
+    settings['mode'] = mode
+    for key in ('delimiters', 'stx', 'etx', 'sync'):
+        if key in section:
+            settings[key] = decode_escapes(section.get(key))
+    settings['frame_length'] = section.getint('Frame_Length', 0)
+    settings['max_buffer'] = section.getint('Max_Buffer', DEFAULT_MAX_BUFFER)
+    return settings
+
+
+def save_framing_config(config: configparser.ConfigParser, settings: Dict[str, Any]):
+    """เขียนการตั้งค่า framing ลง section [Framing] ของ config"""
+    config[FRAMING_SECTION] = {
+        'Mode': settings['mode'],
+        'Delimiters': encode_escapes(settings['delimiters']),
+        'STX': encode_escapes(settings['stx']),
+        'ETX': encode_escapes(settings['etx']),
+        'Frame_Length': str(settings['frame_length']),
+        'Sync': encode_escapes(settings['sync']),
+        'Max_Buffer': str(settings['max_buffer']),
+    }
+
+
+def make_framer(settings: Dict[str, Any]) -> BaseFramer:
+    """
+    สร้าง framer ตามการตั้งค่า
+
+    Args:
+        settings: ผลจาก load_framing_config / default_framing_config
+
+    Returns:
+        BaseFramer: framer ที่ yield เฉพาะ frame ที่สมบูรณ์
+    """
+    mode = settings['mode']
+    max_buffer = settings.get('max_buffer', DEFAULT_MAX_BUFFER)
+    if mode == 'line':
+        if not settings['delimiters']:
+            raise ValueError("Line framing requires at least one delimiter")
+        return LineFramer(settings['delimiters'], max_buffer=max_buffer)
+    if mode == 'stx_etx':
+        return StxEtxFramer(settings['stx'], settings['etx'], max_buffer=max_buffer)
+    if mode == 'fixed':
+        return FixedLengthFramer(settings['frame_length'], settings['sync'], max_buffer=max_buffer)
+    raise ValueError(f"Unknown framing mode '{mode}'")
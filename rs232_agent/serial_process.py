@@ -0,0 +1,434 @@
+"""
+Serial Process - อ่านและ parse serial port ใน process แยก (multiprocessing)
+- GUI ค้าง (dialog, วาด real-time text ใหม่, callback ของ tray icon) ไม่ทำให้การอ่าน port หยุด
+  process ลูกมี GIL ของตัวเอง bytes จึงไม่ค้างใน buffer จนถูก trim ทิ้ง และใช้ CPU อีก core ได้
+- process ลูกเป็นเจ้าของ port (SerialConnectionManager + SerialReaderThread + ScaleDecoder ชุดเดิม)
+- ค่าน้ำหนักล่าสุดอยู่ใน shared memory (SharedReading: seq + ค่า + เวลา) อ่านได้โดยไม่ต้อง lock
+- เหตุการณ์อื่น (log, stability, stats, state ของ port, chunk ดิบเมื่อมีผู้ขอ) ส่งผ่าน event queue
+- process แม่ (GUI / websocket sender) อ่านอย่างเดียว - SerialProcessReader มี attach / start / stop /
+  stopped เหมือน SerialReaderThread จึงใช้แทนกันได้ และมี stats() / active_pattern / pattern_name
+  เหมือน ScaleDecoder จึงใช้กับ build_stats_message ได้
+
+รูปแบบ config (section [Reader] ใน client_config.ini):
+    mode = process      # thread (ค่าเริ่มต้น) หรือ process
+
+process mode กับโปรแกรมที่ build เป็น exe (PyInstaller, เช่น rs232_client_gui.exe):
+process ลูก (spawn) รัน exe ตัวเดิมซ้ำ - ต้องเรียก multiprocessing.freeze_support() เป็นคำสั่งแรก
+ใน if __name__ == '__main__': ของโปรแกรมหลัก ไม่งั้น process ลูกเปิดโปรแกรมหลักซ้ำแทน run_reader_process
+
+ใช้งาน:
+    reader = SerialProcessReader(serial_config, framing_config, pattern_name='Auto Detect')
+    reader.attach(loop, weight_queue)
+    reader.start()
+    seq, reading, text = reader.latest()
+"""
+
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from scale_protocol import (DEFAULT_PATTERN, DEFAULT_SENSITIVITY, RAW_PATTERN, SCALE_PATTERNS, ScaleDecoder,
+                            WeightReading, WeightStatus, compile_pattern, make_framer)
+from serial_connection import SerialConnectionManager
+from serial_reader import SerialReaderThread, put_latest
+from stability_detector import default_stability_config, make_stability_detector
+
+READER_SECTION = 'Reader'
+THREAD_MODE = 'thread'
+PROCESS_MODE = 'process'
+READER_MODES = (THREAD_MODE, PROCESS_MODE)
+
+DEFAULT_POLL_INTERVAL = 0.02  # วินาที - ความถี่ที่ process แม่ตรวจ seq ของค่าล่าสุด
+PROCESS_STATS_INTERVAL = 1.0  # วินาที - ความถี่ที่ process ลูกส่ง stats
+PROCESS_STOP_TIMEOUT = 3.0
+SEQLOCK_RETRIES = 100
+
+# spawn ทุก platform: fork process ที่มี Tk และ thread อยู่แล้วไม่ปลอดภัย
+_CONTEXT = multiprocessing.get_context('spawn')
+
+# seq (เลขคี่ = กำลังเขียน) | decigrams, stable (-1 = ไม่ทราบ), status, unit, monotonic, wall, ข้อความ Raw
+_SEQ = struct.Struct('<Q')
+_BODY = struct.Struct('<qbB8sdd64s')
+_STATUSES = list(WeightStatus)
+_STABLE_CODES = {None: -1, False: 0, True: 1}
+_STABLE_VALUES = {code: value for value, code in _STABLE_CODES.items()}
+
+
+def default_reader_config() -> Dict[str, Any]:
+    """ค่าเริ่มต้นของ [Reader] (อ่าน port ด้วย thread ใน process เดียวกับ GUI)"""
+    return {'mode': THREAD_MODE}
+
+
+def load_reader_config(config, section_name: str = READER_SECTION) -> Dict[str, Any]:
+    """
+    อ่าน section [Reader] จาก ConfigParser
+
+    Args:
+        config: ConfigParser ที่อ่านไฟล์แล้ว
+        section_name: ชื่อ section
+
+    Returns:
+        dict: mode (thread / process)
+    """
+    settings = default_reader_config()
+    if config is not None and section_name in config:
+        mode = config[section_name].get('Mode', THREAD_MODE).strip().lower()
+        if mode not in READER_MODES:
+            print(f"Unknown reader mode '{mode}' - using {THREAD_MODE}")
+            mode = THREAD_MODE
+        settings['mode'] = mode
+    return settings
+
+
+def save_reader_config(config, settings: Dict[str, Any]):
+    """เขียน section [Reader] ลง ConfigParser"""
+    config[READER_SECTION] = {'Mode': settings.get('mode', THREAD_MODE)}
+
+
+class SharedReading:
+    """
+    ค่าน้ำหนักล่าสุดใน shared memory (ผู้เขียนหนึ่งราย ผู้อ่านหลายราย ไม่ใช้ lock)
+    ใช้ seqlock: ผู้เขียนตั้ง seq เป็นเลขคี่ระหว่างเขียน ผู้อ่านอ่านซ้ำถ้า seq เปลี่ยนระหว่างอ่าน
+    """
+
+    SIZE = _SEQ.size + _BODY.size
+
+    def __init__(self, buffer=None):
+        """
+        Args:
+            buffer: RawArray ที่แชร์กับ process อื่น (None = สร้างใหม่)
+        """
+        self.buffer = buffer if buffer is not None else _CONTEXT.RawArray('B', self.SIZE)
+        self._view = memoryview(self.buffer).cast('B')
+        self._written = 0
+
+    def publish(self, reading: WeightReading, text: str = ''):
+        """เขียนค่าล่าสุด (เรียกจากผู้เขียนรายเดียว)"""
+        self._written += 1
+        _SEQ.pack_into(self._view, 0, self._written * 2 - 1)
+        _BODY.pack_into(self._view, _SEQ.size, reading.decigrams, _STABLE_CODES.get(reading.stable, -1),
+                        _STATUSES.index(reading.status), reading.unit.encode('latin-1', 'replace')[:8],
+                        reading.monotonic, reading.wall, text.encode('latin-1', 'replace')[:64])
+        _SEQ.pack_into(self._view, 0, self._written * 2)
+
+    def read(self) -> Tuple[int, Optional[WeightReading], str]:
+        """
+        อ่านค่าล่าสุด
+
+        Returns:
+            Tuple[int, Optional[WeightReading], str]: (ลำดับของค่า, ค่าน้ำหนัก, ข้อความ Raw)
+            ลำดับ 0 = ยังไม่มีค่า (หรืออ่านไม่สำเร็จเพราะถูกเขียนทับตลอด)
+        """
+        for _ in range(SEQLOCK_RETRIES):
+            before = _SEQ.unpack_from(self._view, 0)[0]
+            if before & 1:
+                continue
+            fields = _BODY.unpack_from(self._view, _SEQ.size)
+            if _SEQ.unpack_from(self._view, 0)[0] == before:
+                break
+        else:
+            return 0, None, ''
+        if before == 0:
+            return 0, None, ''
+
+        decigrams, stable, status, unit, monotonic, wall, text = fields
+        reading = WeightReading(decigrams, unit.rstrip(b'\0').decode('latin-1'), _STABLE_VALUES[stable],
+                                _STATUSES[status], monotonic=monotonic, wall=wall)
+        return before // 2, reading, text.rstrip(b'\0').decode('latin-1')
+
+
+class ReaderProcessWorker:
+    """ส่วนที่ทำงานใน process ลูก: อ่าน port, parse และเขียนค่าล่าสุดลง SharedReading"""
+
+    def __init__(self, settings: Dict[str, Any], shared: SharedReading, events):
+        self.events = events
+        self.shared = shared
+        self.stability_config = settings['stability_config']
+        self.forward_raw = settings.get('forward_raw', False)
+        self.install_patterns(settings.get('patterns', {}))
+        self.connection = SerialConnectionManager(settings['serial_config'], log=self.log,
+                                                  on_state_change=self.on_state_change)
+        self.decoder = ScaleDecoder(make_framer(settings['framing_config']), settings['pattern_name'],
+                                    settings['sensitivity'], cache_key=settings.get('cache_key'), log=self.log)
+        self.stability = make_stability_detector(self.stability_config, settings['sensitivity'])
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def log(self, message: str):
+        self.events.put(('log', message))
+
+    def on_state_change(self, state: str):
+        self.events.put(('state', state))
+
+    @staticmethod
+    def install_patterns(patterns: Dict[str, Any]):
+        """ใช้ Pattern ที่ process แม่แก้ไข (เช่น Custom Pattern 3 จาก GUI)"""
+        for name, entries in patterns.items():
+            if SCALE_PATTERNS.get(name) != entries:
+                SCALE_PATTERNS[name] = entries
+                compile_pattern(name)
+
+    def configure(self, changes: Dict[str, Any]):
+        """รับการตั้งค่าใหม่จาก process แม่ (main thread) - ใช้ตอนเริ่ม chunk ถัดไปใน reader thread"""
+        with self._lock:
+            self._pending.update(changes)
+
+    def apply_pending(self):
+        with self._lock:
+            changes, self._pending = self._pending, {}
+        if not changes:
+            return
+        decoder = self.decoder
+        if 'forward_raw' in changes:
+            self.forward_raw = changes['forward_raw']
+        if 'sensitivity' in changes:
+            decoder.sensitivity = changes['sensitivity']
+        if 'patterns' in changes:
+            self.install_patterns(changes['patterns'])
+        if 'framing_config' in changes:
+            decoder.reset()
+            decoder.framer = make_framer(changes['framing_config'])
+        if changes.keys() & {'pattern_name', 'cache_key', 'patterns', 'framing_config'}:
+            decoder.set_pattern(changes.get('pattern_name', decoder.pattern_name),
+                                changes.get('cache_key', decoder.cache_key))
+
+    def handle_chunk(self, new_bytes: bytes):
+        """frame + parse หนึ่ง chunk (แบบเดียวกับ RS232ClientGUI.ingest_serial_bytes) แล้วเขียนค่าล่าสุด"""
+        self.apply_pending()
+        if self.forward_raw:
+            self.events.put(('chunk', new_bytes, time.monotonic()))
+
+        latest_weight = None
+        latest_text = ''
+        decoder = self.decoder
+        for frame, reading in decoder.decode(new_bytes):
+            if reading is None:
+                continue
+            if decoder.active_pattern == RAW_PATTERN:
+                if not reading.ok:
+                    # บรรทัดที่ไม่ใช่ตัวเลข - ไม่ใช่ค่าน้ำหนัก ไม่เขียนลง SharedReading (ไม่ถึง sender)
+                    continue
+                latest_weight = reading
+                latest_text = frame.decode('latin-1').strip()
+                continue
+            event = self.stability.feed(reading)
+            if event is not None:
+                self.events.put(('stability', event))
+            latest_weight = reading
+            latest_text = ''
+
+        if latest_weight is not None:
+            self.shared.publish(latest_weight, latest_text)
+        # ไม่มี event loop ใน process นี้ - process แม่อ่านค่าจาก SharedReading
+        return None
+
+    def send_stats(self):
+        decoder = self.decoder
+        self.events.put(('stats', decoder.active_pattern, decoder.pattern_name, decoder.stats()))
+
+
+def run_reader_process(settings: Dict[str, Any], buffer, events, control):
+    """
+    จุดเริ่มของ process ลูก
+
+    Args:
+        settings: serial_config, framing_config, pattern_name, sensitivity, stability_config,
+            cache_key, patterns, forward_raw
+        buffer: RawArray ของ SharedReading
+        events: queue ของเหตุการณ์ไปยัง process แม่
+        control: queue ของคำสั่งจาก process แม่ (('configure', dict) / ('stop',))
+    """
+    worker = ReaderProcessWorker(settings, SharedReading(buffer), events)
+    reader = SerialReaderThread(worker.connection.get, worker.handle_chunk,
+                                log=worker.log, on_lost=worker.connection.mark_lost)
+    reader.start()
+    parent = multiprocessing.parent_process()
+    next_stats = time.monotonic()
+    try:
+        while parent is None or parent.is_alive():
+            try:
+                command = control.get(timeout=PROCESS_STATS_INTERVAL)
+            except queue.Empty:
+                command = None
+            if command is not None:
+                if command[0] == 'stop':
+                    break
+                if command[0] == 'configure':
+                    worker.configure(command[1])
+            now = time.monotonic()
+            if now >= next_stats:
+                worker.send_stats()
+                next_stats = now + PROCESS_STATS_INTERVAL
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.stop()
+        worker.connection.close()
+        worker.send_stats()
+
+
+class SerialProcessReader:
+    """
+    ฝั่ง process แม่ของ reader ใน process แยก
+    thread ภายในรอ event queue และตรวจ seq ของค่าล่าสุด แล้วส่งค่าใหม่เข้า asyncio.Queue ของ sender
+    (เหมือน SerialReaderThread.publish) และเรียก callback ของเหตุการณ์
+    """
+
+    def __init__(self, serial_config: Dict[str, Any], framing_config: Dict[str, Any],
+                 pattern_name: str = DEFAULT_PATTERN, sensitivity: float = DEFAULT_SENSITIVITY,
+                 stability_config: Optional[Dict[str, Any]] = None, cache_key: Optional[str] = None,
+                 log: Callable[[str], None] = print,
+                 on_stability_event: Optional[Callable[[Any], None]] = None,
+                 on_state_change: Optional[Callable[[str], None]] = None,
+                 on_chunk: Optional[Callable[[bytes, float], None]] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        เริ่มต้น Serial Process Reader
+
+        Args:
+            serial_config: kwargs ของ serial.Serial (process ลูกเปิด port เอง)
+            framing_config: การตั้งค่า framing
+            pattern_name: ชื่อ Pattern หรือ Auto Detect
+            sensitivity: sensitivity ของการ parse
+            stability_config: การตั้งค่า stability (None = ค่าเริ่มต้น)
+            cache_key: key ของ cache รูปแบบเครื่องชั่ง (Auto Detect)
+            log: ฟังก์ชันสำหรับ log ข้อความ (รวมข้อความจาก process ลูก)
+            on_stability_event: callback เมื่อสถานะนิ่งเปลี่ยน (StabilityEvent)
+            on_state_change: callback เมื่อ state ของ port เปลี่ยน (ดู serial_connection)
+            on_chunk: callback(data, timestamp) ของ bytes ดิบ (ส่งเฉพาะเมื่อเปิด forward_raw)
+            poll_interval: ความถี่ที่ตรวจค่าใหม่ใน SharedReading (วินาที)
+        """
+        self.settings = {
+            'serial_config': dict(serial_config),
+            'framing_config': dict(framing_config),
+            'pattern_name': pattern_name,
+            'sensitivity': sensitivity,
+            'stability_config': dict(stability_config or default_stability_config()),
+            'cache_key': cache_key,
+            'patterns': {},
+            'forward_raw': False,
+        }
+        self.log = log
+        self.on_stability_event = on_stability_event
+        self.on_state_change = on_state_change
+        self.on_chunk = on_chunk
+        self.poll_interval = poll_interval
+        self.shared = SharedReading()
+        self.loop = None
+        self.queue = None
+        self.process = None
+        self.active_pattern: Optional[str] = None
+        self.pattern_name = pattern_name
+        # ตัวนับเป็น 0 จนกว่า process ลูกจะส่ง stats ครั้งแรก
+        self._stats: Dict[str, Any] = ScaleDecoder(make_framer(framing_config)).stats()
+        self._events = _CONTEXT.Queue()
+        self._control = _CONTEXT.Queue()
+        self._bridge: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def attach(self, loop, queue):
+        """กำหนด event loop และ queue ที่จะรับค่าน้ำหนัก (เหมือน SerialReaderThread.attach)"""
+        self.loop = loop
+        self.queue = queue
+
+    def configure(self, **changes):
+        """
+        เปลี่ยนการตั้งค่าของ process ลูกขณะทำงาน (ส่งเฉพาะค่าที่เปลี่ยน)
+        key: pattern_name, sensitivity, framing_config, cache_key, patterns, forward_raw
+        """
+        changed = {key: value for key, value in changes.items() if self.settings.get(key) != value}
+        if not changed:
+            return
+        self.settings.update(changed)
+        if 'pattern_name' in changed:
+            self.pattern_name = changed['pattern_name']
+        if self.process is not None:
+            self._control.put(('configure', changed))
+
+    def start(self):
+        """เริ่ม process ลูกและ thread ที่รับค่าจาก process ลูก"""
+        self.process = _CONTEXT.Process(target=run_reader_process, name="SerialReaderProcess", daemon=True,
+                                        args=(self.settings, self.shared.buffer, self._events, self._control))
+        self.process.start()
+        self._bridge = threading.Thread(target=self._run_bridge, name="SerialProcessBridge", daemon=True)
+        self._bridge.start()
+        self.log(f"Serial reader process started (pid {self.process.pid})")
+
+    def stop(self):
+        """หยุด process ลูก (ปิด port) และรอจนกว่า process จะจบ"""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        process = self.process
+        if process is None:
+            return
+        self._control.put(('stop',))
+        process.join(PROCESS_STOP_TIMEOUT)
+        if process.is_alive():
+            self.log("Serial reader process did not stop - terminating")
+            process.terminate()
+            process.join(PROCESS_STOP_TIMEOUT)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def latest(self) -> Tuple[int, Optional[WeightReading], str]:
+        """ค่าล่าสุดจาก shared memory: (ลำดับ, ค่าน้ำหนัก, ข้อความ Raw) - ดู SharedReading.read"""
+        return self.shared.read()
+
+    def stats(self) -> Dict[str, Any]:
+        """ScaleDecoder.stats() ล่าสุดของ process ลูก (อัปเดตทุก PROCESS_STATS_INTERVAL วินาที)"""
+        return dict(self._stats)
+
+    def _run_bridge(self):
+        last_seq = 0
+        while not self._stop_event.is_set() or self.is_alive():
+            try:
+                self._dispatch(self._events.get(timeout=self.poll_interval))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                self.log(f"Serial process event error: {e}")
+
+            seq, reading, text = self.shared.read()
+            if seq != last_seq and reading is not None:
+                last_seq = seq
+                self.publish(reading)
+
+            if not self._stop_event.is_set() and not self.is_alive():
+                self.log(f"Serial reader process exited (code {self.process.exitcode})")
+                self._stop_event.set()
+
+    def _dispatch(self, event):
+        kind = event[0]
+        if kind == 'log':
+            self.log(event[1])
+        elif kind == 'stability':
+            if self.on_stability_event:
+                self.on_stability_event(event[1])
+        elif kind == 'state':
+            if self.on_state_change:
+                self.on_state_change(event[1])
+        elif kind == 'chunk':
+            if self.on_chunk:
+                self.on_chunk(event[1], event[2])
+        elif kind == 'stats':
+            self.active_pattern, self.pattern_name, self._stats = event[1], event[2], event[3]
+
+    def publish(self, weight: WeightReading):
+        """ส่งค่าน้ำหนักเข้า queue ของ event loop (เรียกจาก thread ภายใน)"""
+        loop = self.loop
+        if loop is None or self.queue is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(put_latest, self.queue, (time.monotonic(), weight))
+        except RuntimeError:
+            # loop ถูกปิดไปแล้ว
+            pass
@@ -0,0 +1,212 @@
+"""
+Serial Reader for RS232 Scale Client
+อ่าน serial port แล้วส่งค่าน้ำหนักที่ parse แล้วเข้า asyncio.Queue ของ event loop
+ที่ส่งข้อมูลไป server
+- SerialReaderThread: อ่านแบบ blocking ใน thread แยก (ใช้ได้ทุก platform)
+- AsyncSerialReader: ลงทะเบียน file descriptor กับ loop.add_reader (posix, ไม่ใช้ thread)
+"""
+
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+import serial
+
+# ขนาด queue ของค่าน้ำหนัก - เก็บแค่ค่าล่าสุดจำนวนหนึ่ง ค่าเก่าจะถูกทิ้ง
+DEFAULT_QUEUE_SIZE = 100
+RECONNECT_DELAY = 1.0
+
+
+def put_latest(queue: asyncio.Queue, item: Tuple[float, Any]):
+    """ใส่ค่าใน queue (ต้องเรียกบน event loop) ถ้า queue เต็มให้ทิ้งค่าเก่าที่สุด"""
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(item)
+
+
+class SerialReaderThread(threading.Thread):
+    """
+    Thread สำหรับอ่าน serial port แบบ blocking
+    - เรียก ser.read() ค้างไว้จนกว่าจะมีข้อมูล (ไม่ poll)
+    - ส่ง bytes ที่อ่านได้ให้ handle_chunk เพื่อ frame และ parse
+    - ค่าที่ parse ได้ถูก publish เป็น (monotonic_ts, weight) เข้า asyncio.Queue
+      ผ่าน loop.call_soon_threadsafe
+    """
+
+    def __init__(self, get_connection: Callable[[], Optional[serial.Serial]],
+                 handle_chunk: Callable[[bytes], Optional[Any]],
+                 log: Callable[[str], None] = print,
+                 name: str = "SerialReader",
+                 on_lost: Optional[Callable[[Exception], None]] = None):
+        """
+        เริ่มต้น Serial Reader
+
+        Args:
+            get_connection: ฟังก์ชันที่คืน serial connection ที่เปิดอยู่ (หรือ None)
+            handle_chunk: ฟังก์ชันประมวลผล bytes ที่อ่านได้ คืนค่าน้ำหนักล่าสุดหรือ None
+            log: ฟังก์ชันสำหรับ log ข้อความ
+            name: ชื่อ thread
+            on_lost: callback เมื่ออ่าน port ไม่ได้ (เช่น แจ้ง SerialConnectionManager ให้ปิดและ retry)
+        """
+        super().__init__(name=name, daemon=True)
+        self.get_connection = get_connection
+        self.handle_chunk = handle_chunk
+        self.log = log
+        self.on_lost = on_lost
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._stop_event = threading.Event()
+
+    def attach(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        """
+        กำหนด event loop และ queue ที่จะรับค่าน้ำหนัก
+
+        Args:
+            loop: event loop ของ sender
+            queue: asyncio.Queue ที่ sender รอรับค่า
+        """
+        self.loop = loop
+        self.queue = queue
+
+    def stop(self):
+        """สั่งให้ thread หยุด (thread จะออกหลัง read ปัจจุบัน timeout หรือ port ถูกปิด)"""
+        self._stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            ser = self.get_connection()
+            if not ser:
+                self._stop_event.wait(RECONNECT_DELAY)
+                continue
+
+            try:
+                # block รอ byte แรก (ตาม ser.timeout) แล้วอ่านส่วนที่เหลือที่ค้างใน UART
+                data = ser.read(ser.in_waiting or 1)
+                if data and ser.in_waiting:
+                    data += ser.read(ser.in_waiting)
+            except (serial.SerialException, OSError, TypeError, AttributeError) as e:
+                # port ถูกปิดจาก thread อื่น หรืออุปกรณ์ถูกถอด
+                if not self._stop_event.is_set():
+                    self.log(f"Serial reader error: {e}")
+                    if self.on_lost:
+                        self.on_lost(e)
+                    self._stop_event.wait(RECONNECT_DELAY)
+                continue
+
+            if not data or self._stop_event.is_set():
+                continue
+
+            try:
+                weight = self.handle_chunk(data)
+            except Exception as e:
+                self.log(f"Serial reader parse error: {e}")
+                continue
+
+            if weight is not None:
+                self.publish(weight)
+
+    def publish(self, weight: Any):
+        """ส่งค่าน้ำหนักเข้า queue ของ event loop (เรียกจาก reader thread)"""
+        loop = self.loop
+        if loop is None or self.queue is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(put_latest, self.queue, (time.monotonic(), weight))
+        except RuntimeError:
+            # loop ถูกปิดไปแล้ว
+            pass
+
+
+class AsyncSerialReader:
+    """
+    อ่าน serial port บน event loop โดยตรงผ่าน loop.add_reader
+    - ไม่มี thread และไม่มีการ poll: callback ทำงานเฉพาะเมื่อมี bytes เข้ามา
+    - ใช้ได้เฉพาะ port ที่มี fileno() (pyserial บน posix) และ selector event loop
+    - ถ้า port หายหรืออ่านผิดพลาด จะถอด reader ออกและเรียก on_lost
+    """
+
+    def __init__(self, ser: serial.Serial,
+                 handle_chunk: Callable[[bytes], Optional[Any]],
+                 queue: asyncio.Queue,
+                 on_lost: Optional[Callable[[Exception], None]] = None,
+                 log: Callable[[str], None] = print):
+        """
+        เริ่มต้น Async Serial Reader
+
+        Args:
+            ser: serial connection ที่เปิดอยู่
+            handle_chunk: ฟังก์ชันประมวลผล bytes ที่อ่านได้ คืนค่าน้ำหนักล่าสุดหรือ None
+            queue: asyncio.Queue ที่ sender รอรับค่า (monotonic_ts, weight)
+            on_lost: callback เมื่อ port ใช้งานไม่ได้
+            log: ฟังก์ชันสำหรับ log ข้อความ
+        """
+        self.ser = ser
+        self.handle_chunk = handle_chunk
+        self.queue = queue
+        self.on_lost = on_lost
+        self.log = log
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fd: Optional[int] = None
+
+    @staticmethod
+    def is_supported(ser: serial.Serial, loop: asyncio.AbstractEventLoop) -> bool:
+        """ตรวจสอบว่า port และ event loop รองรับ add_reader หรือไม่"""
+        if not hasattr(ser, 'fileno') or not isinstance(loop, asyncio.SelectorEventLoop):
+            return False
+        try:
+            ser.fileno()
+        except Exception:
+            return False
+        return True
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """ลงทะเบียน file descriptor ของ port กับ event loop"""
+        self.loop = loop or asyncio.get_running_loop()
+        # อ่านแบบ non-blocking เพราะ callback ถูกเรียกเมื่อมีข้อมูลพร้อมแล้ว
+        self.ser.timeout = 0
+        self.fd = self.ser.fileno()
+        self.loop.add_reader(self.fd, self._on_readable)
+
+    def stop(self):
+        """ถอด reader ออกจาก event loop"""
+        if self.loop is not None and self.fd is not None:
+            try:
+                self.loop.remove_reader(self.fd)
+            except Exception:
+                pass
+        self.fd = None
+
+    @property
+    def active(self) -> bool:
+        return self.fd is not None
+
+    def _on_readable(self):
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            # เช่น USB-serial ถูกถอด: fd พร้อมอ่านแต่ไม่มีข้อมูล
+            self.stop()
+            self.log(f"Serial reader error: {e}")
+            if self.on_lost:
+                self.on_lost(e)
+            return
+
+        if not data:
+            return
+
+        try:
+            weight = self.handle_chunk(data)
+        except Exception as e:
+            self.log(f"Serial reader parse error: {e}")
+            return
+
+        if weight is not None:
+            put_latest(self.queue, (time.monotonic(), weight))
@@ -0,0 +1,171 @@
+"""
+Serial Tap for RS232 Scale Client
+reader ตัวเดียวเป็นเจ้าของ serial port - ทุกส่วนที่ต้องการ bytes ดิบรับจาก tap แทนการเปิด port เอง
+- handle_chunk (framer + parser ของ production) ถูกเรียกทุก chunk เหมือนเดิม ไม่มีการทิ้งข้อมูล
+- listener (เช่น CaptureWriter.write) ถูกเรียกใน reader thread ทุก chunk (ต้องทำงานเร็ว)
+- subscription (real-time monitor, เครื่องมือ debug) ได้ chunk ผ่าน queue ที่จำกัดขนาด
+  queue เต็ม = ทิ้ง chunk เก่าที่สุด ผู้อ่านที่ช้าไม่ทำให้ reader ช้าลงและไม่แย่ง bytes จาก production
+
+ใช้งาน:
+    tap = SerialTap(handle_chunk=client.ingest_serial_bytes)
+    reader = SerialReaderThread(get_connection, tap.feed)
+
+    with tap.subscribe('debug') as subscription:
+        item = subscription.get(timeout=0.5)   # (monotonic_ts, bytes) หรือ None
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+# จำนวน chunk สูงสุดที่ค้างใน queue ของแต่ละ subscription
+DEFAULT_TAP_QUEUE_SIZE = 256
+
+Chunk = Tuple[float, bytes]
+ChunkListener = Callable[[bytes, float], Any]
+
+
+class Subscription:
+    """queue ของ chunk ดิบสำหรับผู้อ่านหนึ่งราย (thread-safe, ทิ้งค่าเก่าที่สุดเมื่อเต็ม)"""
+
+    def __init__(self, tap: 'SerialTap', name: str, maxsize: int = DEFAULT_TAP_QUEUE_SIZE):
+        self.tap = tap
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+        self._items: Deque[Chunk] = deque()
+        self._condition = threading.Condition()
+
+    def put(self, timestamp: float, data: bytes):
+        """เพิ่ม chunk (เรียกจาก reader thread) - ไม่ block"""
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append((timestamp, data))
+            self.received += 1
+            self._condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Chunk]:
+        """
+        รอ chunk ถัดไป
+
+        Args:
+            timeout: เวลารอสูงสุด (วินาที, None = รอจนกว่าจะมีข้อมูลหรือถูกปิด)
+
+        Returns:
+            Optional[Tuple[float, bytes]]: (monotonic timestamp, bytes) หรือ None ถ้าหมดเวลา / ถูกปิด
+        """
+        with self._condition:
+            if not self._items and not self.closed:
+                self._condition.wait_for(lambda: self._items or self.closed, timeout)
+            return self._items.popleft() if self._items else None
+
+    def drain(self) -> List[Chunk]:
+        """คืนทุก chunk ที่ค้างอยู่โดยไม่รอ (สำหรับ timer ของ GUI)"""
+        with self._condition:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    def close(self):
+        """เลิกรับข้อมูล"""
+        self.tap.unsubscribe(self)
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SerialTap:
+    """กระจาย chunk ดิบจาก reader ตัวเดียวไปยัง parser, listener และ subscription"""
+
+    def __init__(self, handle_chunk: Optional[Callable[[bytes], Any]] = None,
+                 log: Callable[[str], None] = print):
+        """
+        เริ่มต้น Serial Tap
+
+        Args:
+            handle_chunk: ฟังก์ชันประมวลผลของ production (frame + parse) ผลลัพธ์ถูกคืนจาก feed()
+            log: ฟังก์ชันสำหรับ log ข้อผิดพลาดของ listener
+        """
+        self.handle_chunk = handle_chunk
+        self.log = log
+        self.chunks = 0
+        # copy-on-write: reader thread อ่าน tuple ได้โดยไม่ต้อง lock
+        self._listeners: Tuple[ChunkListener, ...] = ()
+        self._subscriptions: Tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self, name: str, maxsize: int = DEFAULT_TAP_QUEUE_SIZE) -> Subscription:
+        """รับ chunk ดิบผ่าน queue (ปิดด้วย subscription.close() หรือ with)"""
+        subscription = Subscription(self, name, maxsize)
+        with self._lock:
+            self._subscriptions += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions = tuple(item for item in self._subscriptions if item is not subscription)
+
+    def add_listener(self, listener: ChunkListener):
+        """เรียก listener(data, timestamp) ทุก chunk ใน reader thread (เช่น CaptureWriter.write)"""
+        with self._lock:
+            self._listeners += (listener,)
+
+    def remove_listener(self, listener: ChunkListener):
+        with self._lock:
+            self._listeners = tuple(item for item in self._listeners if item != listener)
+
+    @property
+    def subscriptions(self) -> Tuple[Subscription, ...]:
+        return self._subscriptions
+
+    @property
+    def active(self) -> bool:
+        """มี listener หรือ subscription อย่างน้อยหนึ่งราย (reader ใน process แยกส่ง bytes ดิบมาเฉพาะตอนนี้)"""
+        return bool(self._listeners or self._subscriptions)
+
+    def feed(self, data: bytes) -> Any:
+        """
+        ส่ง chunk ที่อ่านได้ให้ทุกผู้รับ (ใช้แทน handle_chunk ของ reader)
+
+        Returns:
+            ผลของ handle_chunk (ค่าน้ำหนักล่าสุดหรือ None)
+        """
+        if not data:
+            return None
+        self.publish(data)
+        if self.handle_chunk is not None:
+            return self.handle_chunk(data)
+        return None
+
+    def publish(self, data: bytes, timestamp: Optional[float] = None):
+        """
+        ส่ง chunk ให้ listener และ subscription เท่านั้น (ไม่เรียก handle_chunk)
+        ใช้เมื่อ chunk ถูก parse ที่อื่นแล้ว เช่น reader ใน process แยก (ดู serial_process.py)
+
+        Args:
+            data: bytes ที่อ่านได้
+            timestamp: time.monotonic() ตอนที่อ่านได้ (None = เวลาปัจจุบัน)
+        """
+        if not data:
+            return
+        self.chunks += 1
+        if timestamp is None:
+            timestamp = time.monotonic()
+        for listener in self._listeners:
+            try:
+                listener(data, timestamp)
+            except Exception as e:
+                self.log(f"Serial tap listener error: {e}")
+        for subscription in self._subscriptions:
+            subscription.put(timestamp, data)
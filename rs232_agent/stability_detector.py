@@ -0,0 +1,222 @@
+"""
+Stability Detector - ตัดสินว่าน้ำหนักนิ่งหรือไม่จากค่าที่อ่านได้ต่อเนื่อง (หลัง parser)
+- sliding window ตามเวลา (window_ms) เก็บ min / max แบบ O(1) ต่อค่า (amortized)
+- นิ่ง = ได้ข้อมูลครบหนึ่ง window, max - min ไม่เกิน tolerance และเครื่องชั่งไม่ได้บอกว่าไม่นิ่ง (US)
+- ส่ง event เฉพาะเมื่อสถานะเปลี่ยน: stable(ค่า) / unstable / zero
+  ผู้ใช้ค่า (sender, local store, หน้าจอบัตรชั่ง) ไม่ต้องดูทุก frame
+
+รูปแบบ config (section [Stability] ใน client_config.ini - ไม่บังคับ):
+    window_ms = 1000
+    min_samples = 3
+    tolerance = 0.1
+tolerance ไม่กำหนด = ใช้ sensitivity ของ [SerialConfig]
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from scale_patterns import DEFAULT_SENSITIVITY
+from weight_reading import DECIGRAMS_PER_KG, WeightReading, kg_to_decigrams
+
+STABILITY_SECTION = 'Stability'
+DEFAULT_WINDOW_MS = 1000
+DEFAULT_MIN_SAMPLES = 3
+
+STABLE = 'stable'
+UNSTABLE = 'unstable'
+ZERO = 'zero'
+
+
+class StabilityEvent:
+    """การเปลี่ยนสถานะหนึ่งครั้ง พร้อมค่าที่ทำให้เปลี่ยน"""
+
+    __slots__ = ('kind', 'reading')
+
+    def __init__(self, kind: str, reading: WeightReading):
+        self.kind = kind
+        self.reading = reading
+
+    def __repr__(self):
+        if self.kind == STABLE:
+            return f"stable({self.reading.to_text()} {self.reading.unit})"
+        return self.kind
+
+
+class SlidingWindow:
+    """
+    ค่าในช่วงเวลาล่าสุด - min/max ด้วย monotonic deque
+    ทุก operation เป็น O(1) amortized ต่อค่า
+    """
+
+    def __init__(self, duration: float):
+        self.duration = duration
+        self.samples: Deque[Tuple[float, int]] = deque()
+        self._min: Deque[Tuple[float, int]] = deque()
+        self._max: Deque[Tuple[float, int]] = deque()
+
+    def add(self, timestamp: float, value: int):
+        self.samples.append((timestamp, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((timestamp, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((timestamp, value))
+        self.expire(timestamp - self.duration)
+
+    def expire(self, cutoff: float):
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        while self._min and self._min[0][0] < cutoff:
+            self._min.popleft()
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+
+    def clear(self):
+        self.samples.clear()
+        self._min.clear()
+        self._max.clear()
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def min(self) -> int:
+        return self._min[0][1]
+
+    @property
+    def max(self) -> int:
+        return self._max[0][1]
+
+
+def default_stability_config() -> Dict[str, Any]:
+    """ค่าเริ่มต้นของ [Stability] (tolerance None = ใช้ sensitivity)"""
+    return {
+        'window_ms': DEFAULT_WINDOW_MS,
+        'min_samples': DEFAULT_MIN_SAMPLES,
+        'tolerance': None,
+    }
+
+
+def load_stability_config(config, section_name: str = STABILITY_SECTION) -> Dict[str, Any]:
+    """
+    อ่าน section [Stability] จาก ConfigParser
+
+    Args:
+        config: ConfigParser ที่อ่านไฟล์แล้ว
+        section_name: ชื่อ section (daemon ใช้ Stability:<client_id>)
+
+    Returns:
+        dict: window_ms, min_samples, tolerance
+    """
+    settings = default_stability_config()
+    if config is not None and section_name in config:
+        section = config[section_name]
+        settings['window_ms'] = section.getint('Window_Ms', DEFAULT_WINDOW_MS)
+        settings['min_samples'] = section.getint('Min_Samples', DEFAULT_MIN_SAMPLES)
+        settings['tolerance'] = section.getfloat('Tolerance', None)
+    return settings
+
+
+def save_stability_config(config, settings: Dict[str, Any]):
+    """เขียน section [Stability] ลง ConfigParser"""
+    section = {
+        'Window_Ms': str(settings.get('window_ms', DEFAULT_WINDOW_MS)),
+        'Min_Samples': str(settings.get('min_samples', DEFAULT_MIN_SAMPLES)),
+    }
+    if settings.get('tolerance') is not None:
+        section['Tolerance'] = str(settings['tolerance'])
+    config[STABILITY_SECTION] = section
+
+
+def make_stability_detector(settings: Dict[str, Any],
+                            sensitivity: float = DEFAULT_SENSITIVITY) -> 'StabilityDetector':
+    tolerance = settings.get('tolerance')
+    return StabilityDetector(settings.get('window_ms', DEFAULT_WINDOW_MS),
+                             sensitivity if tolerance is None else tolerance,
+                             settings.get('min_samples', DEFAULT_MIN_SAMPLES))
+
+
+class StabilityDetector:
+    """
+    รับ WeightReading ทีละค่า ตั้ง reading.stable เป็นผลการตัดสิน และคืน event เมื่อสถานะเปลี่ยน
+
+    ใช้งาน:
+        event = detector.feed(reading)
+        if event is not None and event.kind == STABLE:
+            ...  # น้ำหนักนิ่งที่ event.reading
+    """
+
+    def __init__(self, window_ms: int = DEFAULT_WINDOW_MS, tolerance: float = DEFAULT_SENSITIVITY,
+                 min_samples: int = DEFAULT_MIN_SAMPLES):
+        """
+        เริ่มต้น Stability Detector
+
+        Args:
+            window_ms: ช่วงเวลาที่ค่าต้องนิ่ง (มิลลิวินาที)
+            tolerance: ค่าที่แกว่งได้ภายใน window โดยยังถือว่านิ่ง (kg)
+            min_samples: จำนวนค่าขั้นต่ำใน window
+        """
+        self.window = SlidingWindow(window_ms / 1000.0)
+        self.tolerance = kg_to_decigrams(max(0.0, tolerance))
+        self.min_samples = max(1, min_samples)
+        self.state: Optional[str] = None
+        self.started: Optional[float] = None
+        self.last_event: Optional[StabilityEvent] = None
+
+    def reset(self):
+        self.window.clear()
+        self.started = None
+
+    def is_steady(self, now: float) -> bool:
+        """ค่าใน window ครบช่วงเวลาและแกว่งไม่เกิน tolerance"""
+        window = self.window
+        return (self.started is not None
+                and now - self.started >= window.duration
+                and len(window) >= self.min_samples
+                and window.max - window.min <= self.tolerance)
+
+    def feed(self, reading: WeightReading) -> Optional[StabilityEvent]:
+        """
+        เพิ่มค่าหนึ่งค่า
+
+        Returns:
+            Optional[StabilityEvent]: event ถ้าสถานะเปลี่ยน (หรือค่านิ่งใหม่ต่างจากเดิมเกิน tolerance)
+        """
+        if not reading.ok:
+            self.reset()
+            return self._transition(UNSTABLE, reading)
+
+        now = reading.monotonic
+        if self.started is None or reading.stable is False:
+            # เครื่องชั่งบอกว่าไม่นิ่ง (US) - ต้องนิ่งครบ window นับจากตอนนี้
+            self.started = now
+        self.window.add(now, reading.decigrams)
+
+        if reading.stable is False or not self.is_steady(now):
+            reading.stable = False
+            return self._transition(UNSTABLE, reading)
+
+        reading.stable = True
+        kind = ZERO if abs(reading.decigrams) <= self.tolerance else STABLE
+        if (kind == STABLE and self.state == STABLE
+                and abs(reading.decigrams - self.last_event.reading.decigrams) > self.tolerance):
+            # ค่าเปลี่ยนโดยไม่ผ่านช่วงไม่นิ่ง (เช่น เพิ่มน้ำหนักทีละน้อย)
+            self.state = None
+        return self._transition(kind, reading)
+
+    def _transition(self, kind: str, reading: WeightReading) -> Optional[StabilityEvent]:
+        previous, self.state = self.state, kind
+        if kind == previous or (kind == UNSTABLE and previous is None):
+            # ไม่เปลี่ยน หรือยังไม่เคยนิ่ง (เริ่มต้น) - ไม่มี event
+            return None
+        self.last_event = StabilityEvent(kind, reading)
+        return self.last_event
+
+    @property
+    def stable_kg(self) -> Optional[float]:
+        """ค่านิ่งล่าสุด (None ถ้าตอนนี้ไม่นิ่ง)"""
+        if self.state in (STABLE, ZERO) and self.last_event is not None:
+            return self.last_event.reading.decigrams / DECIGRAMS_PER_KG
+        return None
@@ -0,0 +1,19 @@
+"""
+ให้ test import โมดูลใน rs232_agent ได้โดยตรง (โมดูลอยู่ระดับเดียวกัน ไม่ได้เป็น package)
+
+รัน:
+    cd rs232_agent
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if AGENT_DIR not in sys.path:
+    sys.path.insert(0, AGENT_DIR)
+
+
+def pytest_addoption(parser):
+    parser.addoption('--update-golden', action='store_true',
+                     help="rewrite expected results in scale_protocol_golden.jsonl from current output")
@@ -0,0 +1,60 @@
+"""
+writer task ของ SubscriberQueue: error ใดๆ ระหว่างส่งต้องลบ socket ออกจาก hub และปิด socket
+"""
+
+import asyncio
+
+import websockets.exceptions
+
+import agent
+
+
+class FakeWebSocket:
+    remote_address = ('127.0.0.1', 50000)
+
+    def __init__(self, error):
+        self.error = error
+        self.closed = False
+        self.close_code = None
+
+    async def send(self, frame):
+        if isinstance(self.error, websockets.exceptions.ConnectionClosed):
+            self.closed = True
+        raise self.error
+
+    async def close(self, code=1000, reason=''):
+        self.closed = True
+        self.close_code = code
+
+
+async def run_writer(websocket):
+    outbound = agent.OUTBOUND[websocket] = agent.SubscriberQueue(websocket)
+    outbound.request_snapshots(agent.set_role(websocket, agent.SUBSCRIBER_ROLE))
+    outbound.put('{"type":"subscribed"}')
+    await asyncio.wait_for(outbound.task, 1)
+    if outbound.close_task is not None:
+        await outbound.close_task
+    return outbound
+
+
+def assert_forgotten(websocket):
+    assert websocket not in agent.SUBSCRIBERS
+    assert websocket not in agent.OUTBOUND
+    assert websocket not in agent.SUBSCRIPTIONS
+    assert not any(websocket in sockets for sockets in agent.TOPIC_SUBSCRIBERS.values())
+
+
+def test_writer_error_unregisters_and_closes_socket(capsys):
+    websocket = FakeWebSocket(RuntimeError("encoder exploded"))
+    outbound = asyncio.run(run_writer(websocket))
+    assert outbound.closing
+    assert websocket.close_code == agent.WRITER_ERROR_CLOSE_CODE
+    assert_forgotten(websocket)
+    assert "writer error" in capsys.readouterr().out
+
+
+def test_closed_connection_unregisters_without_close():
+    websocket = FakeWebSocket(websockets.exceptions.ConnectionClosed(None, None))
+    asyncio.run(run_writer(websocket))
+    assert websocket.close_code is None
+    assert_forgotten(websocket)
@@ -0,0 +1,143 @@
+"""
+reader thread / asyncio thread ต้องใช้ค่าที่ sync_reader_settings copy ไว้ ไม่อ่าน Tk variable เอง
+"""
+
+import threading
+import queue
+
+import pytest
+import serial
+
+from scale_protocol import RAW_PATTERN
+
+
+class FakeVar:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class TkOnlyVar(FakeVar):
+    """Tk variable ที่อ่านได้เฉพาะใน thread ที่สร้าง (เหมือน Tk จริงที่ไม่ thread-safe)"""
+
+    def __init__(self, value, owner):
+        super().__init__(value)
+        self.owner = owner
+
+    def get(self):
+        assert threading.current_thread() is self.owner, "Tk variable read off the UI thread"
+        return self.value
+
+
+class FakeSerialManager:
+    config = None
+
+    def __init__(self):
+        self.requested = []
+
+    def is_connected(self):
+        return False
+
+    def get(self, config):
+        self.requested.append(config)
+        return None
+
+
+class FakeReader:
+    def __init__(self):
+        self.configured = {}
+
+    def configure(self, **kwargs):
+        self.configured = kwargs
+
+
+class FakeTap:
+    active = False
+
+
+def make_gui():
+    """RS232ClientGUI ที่ไม่สร้างหน้าต่าง Tk - Tk variable ทุกตัวที่ sync_reader_settings trace"""
+    pytest.importorskip('PIL')
+    pytest.importorskip('pystray')
+    import rs232_client_gui
+
+    app = rs232_client_gui.RS232ClientGUI.__new__(rs232_client_gui.RS232ClientGUI)
+    app.ui_thread = threading.current_thread()
+    app.ui_queue = queue.Queue()
+    app.serial_config = {'parity': serial.PARITY_NONE, 'stopbits': serial.STOPBITS_ONE,
+                         'bytesize': serial.EIGHTBITS}
+    app.framing_config = {'mode': 'line'}
+    app.serial_manager = FakeSerialManager()
+    app.tap = FakeTap()
+    values = {
+        'sensitivity_var': '0.5', 'scale_pattern_var': RAW_PATTERN, 'framing_mode_var': 'line',
+        'port_var': 'COM3', 'baudrate_var': '9600', 'parity_var': 'N', 'stopbits_var': '1',
+        'bytesize_var': '8', 'timeout_var': '1', 'branch_var': 'สาขา 1 (SPS)',
+        'server_url_var': ' ws://scale-hub:8765 ', 'client_id_var': 'scale_test',
+    }
+    for name, value in values.items():
+        setattr(app, name, TkOnlyVar(value, app.ui_thread))
+    app.logged = []
+    app.log_message = app.logged.append
+    return app
+
+
+def run_off_ui_thread(func):
+    result = {}
+
+    def target():
+        try:
+            result['value'] = func()
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+def test_sync_reader_settings_snapshots_every_setting():
+    app = make_gui()
+    app.sync_reader_settings()
+    assert app.sensitivity == 0.5
+    assert app.selected_pattern == RAW_PATTERN
+    assert app.serial_settings['port'] == 'COM3'
+    assert app.serial_settings['baudrate'] == 9600
+    assert app.serial_settings['timeout'] == 1.0
+    assert app.branch_name == 'สาขา 1 (SPS)'
+    assert app.server_url == 'ws://scale-hub:8765'
+    assert app.client_id == 'scale_test'
+
+
+def test_reader_and_asyncio_paths_use_snapshot_only():
+    app = make_gui()
+    app.sync_reader_settings()
+    reader = FakeReader()
+
+    def off_thread():
+        app.get_serial_connection()
+        app.configure_reader_process(reader)
+        return app.get_active_pattern(), app.get_branch_prefix(app.branch_name)
+
+    pattern, prefix = run_off_ui_thread(off_thread)
+    assert pattern == RAW_PATTERN
+    assert prefix == 'Z4'
+    assert app.serial_manager.requested == [app.serial_settings]
+    assert reader.configured['pattern_name'] == RAW_PATTERN
+    assert reader.configured['sensitivity'] == 0.5
+    assert reader.configured['cache_key'] == app.format_cache_key
+
+
+def test_invalid_serial_settings_skip_connect():
+    app = make_gui()
+    app.baudrate_var = TkOnlyVar('96x', app.ui_thread)
+    app.sync_reader_settings()
+    assert app.serial_settings is None
+    assert run_off_ui_thread(app.get_serial_connection) is None
+    assert app.serial_manager.requested == []
+    assert 'Invalid serial config' in app.logged
@@ -0,0 +1,110 @@
+"""
+Raw Data mode: บรรทัดที่ไม่ใช่ตัวเลขต้องไม่ถูกส่งไป server และไม่ทำให้ sender reconnect
+"""
+
+import asyncio
+import threading
+import queue
+
+import pytest
+
+from emission_policy import default_emission_config
+from rs232_client import RS232Client
+from scale_protocol import RAW_PATTERN, ScaleDecoder, WeightReading, make_framer
+from serial_framer import default_framing_config
+from stability_detector import default_stability_config, make_stability_detector
+
+GARBAGE = b"hello\r\n???\r\nN/A\r\n"
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.closed = False
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class FakeWidget:
+    def config(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def fast_sleep(monkeypatch):
+    """asyncio.sleep ไม่รอจริง - bug ที่ส่งค่าเดิมซ้ำจะวนจน reconnect ภายในเวลาของ test"""
+    real_sleep = asyncio.sleep
+
+    async def no_wait(delay, result=None):
+        return await real_sleep(0, result)
+
+    monkeypatch.setattr(asyncio, 'sleep', no_wait)
+
+
+def make_client():
+    return RS232Client('scale_test', serial_config={'port': 'COM_TEST', 'baudrate': 9600},
+                       framing_config=default_framing_config('line'),
+                       emission_config=default_emission_config(),
+                       stability_config=default_stability_config(),
+                       scale_pattern=RAW_PATTERN)
+
+
+def test_client_skips_non_numeric_raw_lines():
+    client = make_client()
+    assert client.handle_serial_chunk(GARBAGE) is None
+    assert client.last_weight.ok
+
+    reading = client.handle_serial_chunk(b"12.5\r\n")
+    assert reading is not None and reading.kg == 12.5
+
+
+def make_gui():
+    """RS232ClientGUI ที่ไม่สร้างหน้าต่าง Tk - เฉพาะ attribute ที่ read path และ sender ใช้"""
+    pytest.importorskip('PIL')
+    pytest.importorskip('pystray')
+    import rs232_client_gui
+
+    app = rs232_client_gui.RS232ClientGUI.__new__(rs232_client_gui.RS232ClientGUI)
+    app.ui_thread = threading.current_thread()
+    app.ui_queue = queue.Queue()
+    app.decoder = ScaleDecoder(make_framer(default_framing_config('line')), RAW_PATTERN, 0.1)
+    app.sensitivity = 0.1
+    app.selected_pattern = RAW_PATTERN
+    app.format_cache_key = None
+    app.stability = make_stability_detector(default_stability_config(), 0.1)
+    app.last_weight = WeightReading()
+    app.weight_label = FakeWidget()
+    app.emission_config = default_emission_config()
+    app.serial_reader = None
+    app.branch_name = 'สำนักงานใหญ่ P8'
+    app.logged = []
+    app.log_message = app.logged.append
+    return app
+
+
+def test_gui_ingest_does_not_publish_non_numeric_raw_lines():
+    app = make_gui()
+    assert app.ingest_serial_bytes(GARBAGE) is None
+    assert app.last_weight.ok
+
+
+def test_gui_sender_consumes_no_data_without_reconnect(fast_sleep):
+    app = make_gui()
+
+    async def run():
+        app.is_running = True
+        app.is_connected = True
+        app.websocket = FakeWebSocket()
+        app.weight_queue = asyncio.Queue()
+        # ค่า no_data ที่หลุดเข้ามาใน queue (เช่น จาก client รุ่นเก่า) ต้องถูกจัดการครั้งเดียว
+        app.weight_queue.put_nowait((0.0, WeightReading.no_data()))
+        task = asyncio.create_task(app.send_weight_loop('scale_test'))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.shield(task), 0.5)
+        task.cancel()
+        return app.websocket.sent
+
+    sent = asyncio.run(run())
+    assert not [message for message in app.logged if 'reconnecting' in message]
+    assert all('"status": "ok"' in message for message in sent)
@@ -0,0 +1,63 @@
+"""
+Benchmark ของ hot path ใน read path (framer.feed / ScaleDecoder.decode / parse_frame) ด้วย pytest-benchmark
+ข้ามทั้งไฟล์ถ้าไม่ได้ติดตั้ง pytest-benchmark (requirements-dev.txt)
+
+รัน:
+    python -m pytest tests/test_scale_protocol_benchmark.py
+    python -m pytest tests --benchmark-skip      # รันเฉพาะ test ปกติ
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from scale_protocol import (DEFAULT_PATTERN, RAW_PATTERN, ScaleDecoder, default_framing_config,  # noqa: E402
+                            make_framer, parse_frame)
+from serial_framer import decode_escapes  # noqa: E402
+from test_scale_protocol_golden import CASES  # noqa: E402
+
+FRAMES = 1000
+CHUNK_SIZE = 7  # UART ส่งมาเป็นชิ้นเล็กไม่ตรงขอบ frame
+
+STREAMS = {
+    'line': b''.join(b'1BH   %06d\r\n' % i for i in range(FRAMES)),
+    'stx_etx': b''.join(b'\x021BH   %06d\x03' % i for i in range(FRAMES)),
+}
+
+
+def chunked(data, size=CHUNK_SIZE):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('mode', sorted(STREAMS))
+def test_framer_feed(benchmark, mode):
+    chunks = chunked(STREAMS[mode])
+
+    def run():
+        framer = make_framer(default_framing_config(mode))
+        return sum(1 for chunk in chunks for _ in framer.feed(chunk))
+
+    assert benchmark(run) == FRAMES
+
+
+@pytest.mark.parametrize('pattern_name', [DEFAULT_PATTERN, RAW_PATTERN])
+def test_decoder_decode(benchmark, pattern_name):
+    chunks = chunked(STREAMS['line'])
+
+    def run():
+        decoder = ScaleDecoder(make_framer(default_framing_config('line')), pattern_name)
+        return sum(1 for chunk in chunks for _, reading in decoder.decode(chunk) if reading is not None)
+
+    assert benchmark(run) == FRAMES
+
+
+@pytest.mark.parametrize('pattern_name', sorted({case['pattern'] for case in CASES if case['kind'] == 'parse'}))
+def test_parse_frame(benchmark, pattern_name):
+    frames = [decode_escapes(case['frame']) for case in CASES
+              if case['kind'] == 'parse' and case['pattern'] == pattern_name]
+
+    def run():
+        for frame in frames:
+            parse_frame(frame, pattern_name)
+
+    benchmark(run)
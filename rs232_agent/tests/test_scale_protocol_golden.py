@@ -0,0 +1,86 @@
+"""
+ตรวจ scale_protocol กับ golden corpus (scale_protocol_golden.jsonl) - หนึ่ง test ต่อหนึ่งกรณี
+หนึ่งบรรทัดต่อหนึ่งกรณี - bytes เขียนแบบ escape เดียวกับ config (เช่น \\x02, \\r\\n):
+    {"kind": "parse", "pattern": "Default", "frame": "1BH   001230", "expected": {"weight": 1230.0, ...}}
+    {"kind": "frame", "framing": "stx_etx", "chunks": ["\\x021BH", " 001230\\x03"], "expected": ["1BH 001230"]}
+expected ของ parse เป็น WeightReading.to_wire() (ไม่รวม timestamp) หรือ null ถ้า parse ไม่ได้
+
+รัน:
+    python -m pytest tests/test_scale_protocol_golden.py
+    python -m pytest tests/test_scale_protocol_golden.py --update-golden   # เขียน expected ใหม่จากผลปัจจุบัน
+"""
+
+import json
+import os
+
+import pytest
+
+from scale_protocol import DEFAULT_SENSITIVITY, default_framing_config, make_framer, parse_frame
+from serial_framer import decode_escapes, encode_escapes
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'scale_protocol_golden.jsonl')
+
+
+def parse_result(case):
+    reading = parse_frame(decode_escapes(case['frame']), case['pattern'],
+                          case.get('sensitivity', DEFAULT_SENSITIVITY))
+    if reading is None:
+        return None
+    wire = reading.to_wire()
+    del wire['timestamp']
+    return wire
+
+
+def frame_result(case):
+    settings = default_framing_config(case['framing'])
+    for key in ('delimiters', 'stx', 'etx', 'sync'):
+        if key in case:
+            settings[key] = decode_escapes(case[key])
+    settings['frame_length'] = case.get('frame_length', 0)
+    framer = make_framer(settings)
+    frames = []
+    for chunk in case['chunks']:
+        frames += [encode_escapes(frame) for frame in framer.feed(decode_escapes(chunk))]
+    return frames
+
+
+RUNNERS = {'parse': parse_result, 'frame': frame_result}
+
+
+def load_cases(path=GOLDEN_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def describe(case):
+    if case['kind'] == 'parse':
+        return f"{case['pattern']}: {case['frame']!r}"
+    return f"{case['framing']} framing: {case['chunks']!r}"
+
+
+CASES = load_cases()
+
+
+@pytest.fixture(scope='module')
+def golden_update(request):
+    """--update-golden: เก็บผลปัจจุบันของทุกกรณีแล้วเขียน corpus ใหม่ตอนจบ module"""
+    if not request.config.getoption('--update-golden'):
+        yield None
+        return
+    updated = {}
+    yield updated
+    with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+        for index, case in enumerate(CASES):
+            case = dict(case, expected=updated.get(index, case.get('expected')))
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+
+
+@pytest.mark.parametrize('index', range(len(CASES)), ids=[describe(case) for case in CASES])
+def test_golden_case(index, golden_update):
+    case = CASES[index]
+    actual = RUNNERS[case['kind']](case)
+    if golden_update is not None:
+        golden_update[index] = actual
+        return
+    assert actual == case.get('expected')
@@ -0,0 +1,20 @@
+"""
+BaseFramer เป็น abstract - framer ทุกแบบต้อง implement _drain
+"""
+
+import pytest
+
+from serial_framer import FRAMING_MODES, BaseFramer, default_framing_config, make_framer
+
+
+def test_base_framer_is_abstract():
+    with pytest.raises(TypeError):
+        BaseFramer()
+
+
+@pytest.mark.parametrize('mode', FRAMING_MODES)
+def test_every_framing_mode_is_concrete(mode):
+    settings = default_framing_config(mode)
+    if mode == 'fixed':
+        settings['frame_length'] = 12
+    assert isinstance(make_framer(settings), BaseFramer)
@@ -0,0 +1,33 @@
+"""
+ReaderProcessWorker (process ลูกของ [Reader] mode = process) - ทดสอบใน process เดียวกัน
+"""
+
+import queue
+
+from scale_protocol import RAW_PATTERN
+from serial_framer import default_framing_config
+from serial_process import ReaderProcessWorker, SharedReading
+from stability_detector import default_stability_config
+
+
+def make_worker(pattern_name):
+    settings = {
+        'serial_config': {'port': 'COM_TEST', 'baudrate': 9600},
+        'framing_config': default_framing_config('line'),
+        'pattern_name': pattern_name,
+        'sensitivity': 0.1,
+        'stability_config': default_stability_config(),
+    }
+    return ReaderProcessWorker(settings, SharedReading(), queue.Queue())
+
+
+def test_raw_non_numeric_lines_are_not_published():
+    worker = make_worker(RAW_PATTERN)
+    worker.handle_chunk(b"hello\r\n???\r\n")
+    seq, reading, text = worker.shared.read()
+    assert reading is None
+
+    worker.handle_chunk(b"12.5\r\nnoise\r\n")
+    seq, reading, text = worker.shared.read()
+    assert reading.kg == 12.5
+    assert text == "12.5"
@@ -0,0 +1,312 @@
+"""
+Virtual Scale - เครื่องชั่งจำลองบน pseudo-terminal (Linux/macOS)
+ต่างจาก simulate_weight() ใน agent-20250827.py ที่สุ่มแค่ค่าน้ำหนัก: เครื่องมือนี้ส่ง frame จริง
+ออกทาง pty ทำให้ RS232Client / RS232ClientGUI / scale_daemon.py เปิดได้เหมือน COM port
+และทดสอบทั้งเส้นทาง serial -> hub -> browser ได้บนเครื่อง dev
+
+- รูปแบบข้อมูลตาม SCALE_PATTERNS: default (1BH/1CH), stgs (ST,GS / US,GS), cas, mettler
+- จำกัดความเร็วตาม baud rate (bits ต่อตัวอักษรตาม parity/stop bits)
+- noise ของค่าน้ำหนัก และ byte ขยะ/byte หาย แบบสุ่ม
+- profile: idle (0 kg), constant, trucks (รถขึ้น -> นิ่ง -> รถลง วนไป)
+
+ใช้งาน:
+    python virtual_scale.py --format stgs --count 3 --profile trucks --link /tmp/vscale
+    python virtual_scale.py --count 24 --daemon-config vscales.ini   (แล้วรัน scale_daemon.py vscales.ini)
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import sys
+import time
+import tty
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+STX = b'\x02'
+ETX = b'\x03'
+
+# payload ของแต่ละรูปแบบ (ไม่รวมตัวคั่น) รับ (น้ำหนัก kg, นิ่งหรือไม่)
+SCALE_FORMATS: Dict[str, Callable[[float, bool], bytes]] = {
+    'default': lambda weight, stable: (b'1BH   %06d' % round(weight)) if round(weight) else b'1CH   000000',
+    'stgs': lambda weight, stable: b'%s,GS,%+08.1fkg' % (b'ST' if stable else b'US', weight),
+    'cas': lambda weight, stable: b'CAS %06d' % round(weight),
+    'mettler': lambda weight, stable: b'MT %06d' % round(weight),
+}
+
+# Pattern ใน SCALE_PATTERNS ที่ใช้ parse แต่ละรูปแบบ
+FORMAT_PATTERNS = {
+    'default': 'Default',
+    'stgs': 'ST,GS Format',
+    'cas': 'CAS Scale',
+    'mettler': 'Mettler Toledo',
+}
+
+PROFILES = ('idle', 'constant', 'trucks')
+
+
+def bits_per_char(bytesize: int = 8, parity: str = 'N', stopbits: float = 1) -> float:
+    """จำนวน bit บนสายต่อหนึ่งตัวอักษร (start + data + parity + stop)"""
+    return 1 + bytesize + (0 if parity.upper() == 'N' else 1) + stopbits
+
+
+def weight_profile(profile: str, rng: random.Random, min_weight: float, max_weight: float,
+                   idle_seconds: float, ramp_seconds: float, hold_seconds: float) -> Iterator[Tuple[float, bool]]:
+    """
+    ค่าน้ำหนักจริง (ก่อนใส่ noise) ตามเวลา
+
+    Returns:
+        Iterator[Tuple[float, bool]]: (น้ำหนัก kg, นิ่งหรือไม่) ทุกครั้งที่เรียก next()
+    """
+    if profile == 'idle':
+        while True:
+            yield 0.0, True
+    if profile == 'constant':
+        weight = rng.uniform(min_weight, max_weight)
+        while True:
+            yield weight, True
+
+    # trucks: ว่าง -> รถขึ้น (ไม่นิ่ง) -> นิ่ง -> รถลง (ไม่นิ่ง) -> ว่าง ...
+    cycle_start = time.monotonic()
+    target = rng.uniform(min_weight, max_weight)
+    while True:
+        elapsed = time.monotonic() - cycle_start
+        if elapsed < idle_seconds:
+            yield 0.0, True
+        elif elapsed < idle_seconds + ramp_seconds:
+            yield target * (elapsed - idle_seconds) / ramp_seconds, False
+        elif elapsed < idle_seconds + ramp_seconds + hold_seconds:
+            yield target, True
+        elif elapsed < idle_seconds + 2 * ramp_seconds + hold_seconds:
+            remaining = idle_seconds + 2 * ramp_seconds + hold_seconds - elapsed
+            yield target * remaining / ramp_seconds, False
+        else:
+            cycle_start = time.monotonic()
+            target = rng.uniform(min_weight, max_weight)
+            yield 0.0, True
+
+
+class VirtualScale:
+    """เครื่องชั่งจำลองหนึ่งเครื่อง: pty หนึ่งคู่ ส่ง frame ทาง master ให้ client อ่านจาก slave"""
+
+    def __init__(self, scale_format: str = 'default', profile: str = 'trucks',
+                 rate_hz: float = 10.0, baud: int = 9600, char_bits: float = 10.0,
+                 noise: float = 0.0, division: float = 10.0,
+                 garbage_rate: float = 0.0, drop_rate: float = 0.0,
+                 framing: str = 'line', byte_paced: bool = False,
+                 min_weight: float = 5000, max_weight: float = 50000,
+                 idle_seconds: float = 10, ramp_seconds: float = 5, hold_seconds: float = 20,
+                 link: Optional[str] = None, seed: Optional[int] = None):
+        """
+        เริ่มต้นเครื่องชั่งจำลอง
+
+        Args:
+            scale_format: รูปแบบข้อมูล (คีย์ใน SCALE_FORMATS)
+            profile: idle, constant หรือ trucks
+            rate_hz: จำนวน frame ต่อวินาทีสูงสุด
+            baud: baud rate ที่จำลอง (จำกัด bytes ต่อวินาที)
+            char_bits: จำนวน bit ต่อตัวอักษร (ดู bits_per_char)
+            noise: ส่วนเบี่ยงเบนมาตรฐานของ noise (kg) ขณะไม่นิ่ง (ขณะนิ่งใช้ 1/10)
+            division: ความละเอียดของเครื่องชั่ง (kg) ค่าที่ส่งถูกปัดตามนี้
+            garbage_rate: โอกาสต่อ frame ที่จะมี byte ขยะแทรก
+            drop_rate: โอกาสต่อ frame ที่ byte หนึ่งจะหายไป
+            framing: line (จบด้วย CR LF) หรือ stx_etx
+            byte_paced: ส่งทีละไม่กี่ byte ตามเวลาของ UART แทนการส่งทั้ง frame ครั้งเดียว
+            min_weight, max_weight: ช่วงน้ำหนักรถ (profile trucks/constant)
+            idle_seconds, ramp_seconds, hold_seconds: ช่วงเวลาของ profile trucks
+            link: path ของ symlink ที่ชี้ไปยัง slave (ชื่อคงที่สำหรับ config)
+            seed: seed ของตัวสุ่ม (ผลลัพธ์ทำซ้ำได้)
+        """
+        if scale_format not in SCALE_FORMATS:
+            raise ValueError(f"Unknown scale format '{scale_format}' (expected one of {', '.join(SCALE_FORMATS)})")
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile '{profile}' (expected one of {', '.join(PROFILES)})")
+        self.scale_format = scale_format
+        self.rate_hz = rate_hz
+        self.baud = baud
+        self.char_time = char_bits / baud
+        self.noise = noise
+        self.division = division
+        self.garbage_rate = garbage_rate
+        self.drop_rate = drop_rate
+        self.framing = framing
+        self.byte_paced = byte_paced
+        self.link = link
+        self.rng = random.Random(seed)
+        self.profile = weight_profile(profile, self.rng, min_weight, max_weight,
+                                      idle_seconds, ramp_seconds, hold_seconds)
+
+        self.master_fd: Optional[int] = None
+        self.slave_fd: Optional[int] = None
+        self.slave_name: Optional[str] = None
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.bytes_lost = 0  # ไม่มีใครอ่าน pty จน buffer เต็ม (เหมือนสาย serial ที่ไม่มีคนฟัง)
+
+    @property
+    def port(self) -> str:
+        """ชื่อ port ที่ client ใช้เปิด (symlink ถ้ากำหนด ไม่เช่นนั้น /dev/pts/N)"""
+        return self.link or self.slave_name
+
+    def open(self):
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.slave_name = os.ttyname(self.slave_fd)
+        if self.link:
+            if os.path.islink(self.link):
+                os.remove(self.link)
+            os.symlink(self.slave_name, self.link)
+
+    def close(self):
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def next_frame(self) -> bytes:
+        """frame ถัดไปตาม profile พร้อม noise และความผิดพลาดของสายที่จำลอง"""
+        weight, stable = next(self.profile)
+        if self.noise and weight:
+            weight += self.rng.gauss(0, self.noise if not stable else self.noise / 10)
+        weight = max(0.0, round(weight / self.division) * self.division)
+
+        payload = SCALE_FORMATS[self.scale_format](weight, stable)
+        frame = STX + payload + ETX if self.framing == 'stx_etx' else payload + b'\r\n'
+
+        if self.garbage_rate and self.rng.random() < self.garbage_rate:
+            pos = self.rng.randrange(len(frame) + 1)
+            frame = frame[:pos] + bytes([self.rng.randrange(0x20, 0x7f)]) + frame[pos:]
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            pos = self.rng.randrange(len(frame))
+            frame = frame[:pos] + frame[pos + 1:]
+        return frame
+
+    def _write(self, data: bytes):
+        try:
+            written = os.write(self.master_fd, data)
+        except BlockingIOError:
+            written = 0
+        self.bytes_sent += written
+        self.bytes_lost += len(data) - written
+
+    async def run(self, stop_event: asyncio.Event):
+        """ส่ง frame ไปเรื่อยๆ จนกว่า stop_event จะถูก set"""
+        frame_interval = 1.0 / self.rate_hz
+        next_time = time.monotonic()
+        while not stop_event.is_set():
+            frame = self.next_frame()
+            if self.byte_paced:
+                # ส่งทีละ 8 bytes ตามเวลาของ UART เพื่อให้ client ได้ frame ไม่ครบในแต่ละ read
+                for pos in range(0, len(frame), 8):
+                    piece = frame[pos:pos + 8]
+                    self._write(piece)
+                    await asyncio.sleep(len(piece) * self.char_time)
+            else:
+                self._write(frame)
+            self.frames_sent += 1
+
+            # ไม่เร็วกว่า rate_hz และไม่เร็วกว่าที่ baud rate ส่งได้จริง
+            next_time += max(frame_interval, len(frame) * self.char_time)
+            await asyncio.sleep(max(0.0, next_time - time.monotonic()))
+
+
+def write_daemon_config(path: str, scales: List[VirtualScale], server_url: str):
+    """สร้าง config ของ scale_daemon.py สำหรับเครื่องชั่งจำลองทั้งหมด"""
+    lines = ["[Daemon]", f"server_url = {server_url}", ""]
+    for index, scale in enumerate(scales, 1):
+        client_id = f"vscale_{index:03d}"
+        lines += [f"[Scale:{client_id}]", f"port = {scale.port}", f"baudrate = {scale.baud}", "parity = N",
+                  "stopbits = 1", "bytesize = 8", "readtimeout = 1.0",
+                  f"branch = Virtual {index}", f"branch_prefix = V{index}",
+                  f"pattern = {FORMAT_PATTERNS[scale.scale_format]}", "",
+                  f"[Framing:{client_id}]", f"mode = {scale.framing}", ""]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+async def run_scales(scales: List[VirtualScale], report_interval: float):
+    stop_event = asyncio.Event()
+    tasks = [asyncio.create_task(scale.run(stop_event)) for scale in scales]
+    try:
+        while True:
+            await asyncio.sleep(report_interval)
+            frames = sum(scale.frames_sent for scale in scales)
+            sent = sum(scale.bytes_sent for scale in scales)
+            lost = sum(scale.bytes_lost for scale in scales)
+            print(f"Virtual scales: {frames} frames, {sent} bytes sent, {lost} bytes lost (no reader)")
+    finally:
+        stop_event.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _stop_on_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual RS232 scales on pseudo-terminals")
+    parser.add_argument('--format', dest='scale_format', choices=sorted(SCALE_FORMATS), default='default')
+    parser.add_argument('--count', type=int, default=1, help="number of virtual scales")
+    parser.add_argument('--profile', choices=PROFILES, default='trucks')
+    parser.add_argument('--rate', type=float, default=10.0, help="frames per second per scale")
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--bytesize', type=int, default=8)
+    parser.add_argument('--parity', default='N')
+    parser.add_argument('--stopbits', type=float, default=1)
+    parser.add_argument('--noise', type=float, default=5.0, help="weight noise std-dev (kg) while unstable")
+    parser.add_argument('--division', type=float, default=10.0, help="scale resolution (kg)")
+    parser.add_argument('--garbage-rate', type=float, default=0.0, help="chance per frame of an injected junk byte")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="chance per frame of a lost byte")
+    parser.add_argument('--framing', choices=('line', 'stx_etx'), default='line')
+    parser.add_argument('--byte-paced', action='store_true', help="write in UART-timed pieces")
+    parser.add_argument('--min-weight', type=float, default=5000)
+    parser.add_argument('--max-weight', type=float, default=50000)
+    parser.add_argument('--idle', type=float, default=10, help="seconds empty between trucks")
+    parser.add_argument('--ramp', type=float, default=5, help="seconds for a truck to drive on/off")
+    parser.add_argument('--hold', type=float, default=20, help="seconds a truck stays on the scale")
+    parser.add_argument('--link', help="symlink prefix, e.g. /tmp/vscale -> /tmp/vscale0, /tmp/vscale1 ...")
+    parser.add_argument('--seed', type=int, help="random seed (reproducible runs)")
+    parser.add_argument('--daemon-config', metavar='FILE', help="write a scale_daemon.py config for these scales")
+    parser.add_argument('--server-url', default='ws://localhost:8765')
+    parser.add_argument('--report', type=float, default=10.0, help="seconds between status lines")
+    args = parser.parse_args()
+
+    char_bits = bits_per_char(args.bytesize, args.parity, args.stopbits)
+    scales = []
+    for index in range(args.count):
+        scale = VirtualScale(args.scale_format, args.profile, args.rate, args.baud, char_bits,
+                             noise=args.noise, division=args.division,
+                             garbage_rate=args.garbage_rate, drop_rate=args.drop_rate,
+                             framing=args.framing, byte_paced=args.byte_paced,
+                             min_weight=args.min_weight, max_weight=args.max_weight,
+                             idle_seconds=args.idle, ramp_seconds=args.ramp, hold_seconds=args.hold,
+                             link=f"{args.link}{index}" if args.link else None,
+                             seed=None if args.seed is None else args.seed + index)
+        scale.open()
+        scales.append(scale)
+        print(f"Virtual scale {index}: {scale.port} ({args.scale_format}, pattern "
+              f"'{FORMAT_PATTERNS[args.scale_format]}', {args.framing} framing)")
+
+    if args.daemon_config:
+        write_daemon_config(args.daemon_config, scales, args.server_url)
+        print(f"Daemon config written: {args.daemon_config}")
+
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)  # ลบ symlink เมื่อถูก kill ด้วย
+    try:
+        asyncio.run(run_scales(scales, args.report))
+    except KeyboardInterrupt:
+        print("Virtual scales stopped.")
+    finally:
+        for scale in scales:
+            scale.close()
+
+
+if __name__ == '__main__':
+    if sys.platform.startswith('win'):
+        print("virtual_scale.py requires a POSIX pty (Linux/macOS)")
+        sys.exit(1)
+    main()
@@ -0,0 +1,145 @@
+"""
+Weight Reading - ค่าน้ำหนักแบบมีชนิดข้อมูล ใช้ตั้งแต่ parser จนถึงข้อความที่ส่งไป agent.py
+แทนข้อความ "0" / "N/A" / "Error" ที่ต้องเทียบและแปลง str/int/float ซ้ำในแต่ละจุด
+- น้ำหนักเก็บเป็นจำนวนเต็มหน่วย decigram (0.1 g) ไม่มีปัญหาทศนิยมของ float
+- status: ok / no_data / error
+- เวลาที่อ่านได้ทั้ง monotonic (คำนวณช่วงเวลา) และ wall time (ส่งไป server)
+- แปลงเป็นข้อความที่ส่งทาง websocket ที่ to_wire() จุดเดียว (key "weight" เป็นตัวเลข kg เหมือนเดิม)
+"""
+
+import enum
+import time
+from typing import Any, Dict, Optional
+
+DECIGRAMS_PER_KG = 10000
+DEFAULT_UNIT = 'kg'
+
+
+class WeightStatus(enum.Enum):
+    OK = 'ok'
+    NO_DATA = 'no_data'   # ยังไม่มีค่า / parse ไม่ได้ (เดิม "N/A")
+    ERROR = 'error'       # อ่าน serial port ไม่ได้ (เดิม "Error")
+
+
+# ข้อความเดิมของสถานะที่ไม่ใช่ค่าน้ำหนัก (แสดงผลและรับจาก client รุ่นเก่า)
+_STATUS_TEXT = {WeightStatus.NO_DATA: "N/A", WeightStatus.ERROR: "Error"}
+_TEXT_STATUS = {text: status for status, text in _STATUS_TEXT.items()}
+
+
+def kg_to_decigrams(kg: float) -> int:
+    return int(round(kg * DECIGRAMS_PER_KG))
+
+
+class WeightReading:
+    """ค่าน้ำหนักหนึ่งค่าพร้อมหน่วย สถานะนิ่ง และเวลาที่อ่านได้"""
+
+    __slots__ = ('decigrams', 'unit', 'stable', 'status', 'monotonic', 'wall')
+
+    def __init__(self, decigrams: int = 0, unit: str = DEFAULT_UNIT, stable: Optional[bool] = None,
+                 status: WeightStatus = WeightStatus.OK,
+                 monotonic: Optional[float] = None, wall: Optional[float] = None):
+        """
+        Args:
+            decigrams: น้ำหนัก (0.1 g) - ใช้ from_kg() ถ้ามีค่าเป็น kg
+            unit: หน่วยที่เครื่องชั่งแสดง เช่น kg
+            stable: True = นิ่ง, False = ไม่นิ่ง, None = เครื่องชั่งไม่ได้บอก
+            status: สถานะของค่า
+            monotonic: time.monotonic() ตอนอ่านได้ (None = ตอนนี้)
+            wall: time.time() ตอนอ่านได้ (None = ตอนนี้)
+        """
+        self.decigrams = decigrams
+        self.unit = unit
+        self.stable = stable
+        self.status = status
+        self.monotonic = time.monotonic() if monotonic is None else monotonic
+        self.wall = time.time() if wall is None else wall
+
+    @classmethod
+    def from_kg(cls, kg: float, unit: str = DEFAULT_UNIT, stable: Optional[bool] = None,
+                **timestamps) -> 'WeightReading':
+        return cls(kg_to_decigrams(kg), unit, stable, WeightStatus.OK, **timestamps)
+
+    @classmethod
+    def no_data(cls, **timestamps) -> 'WeightReading':
+        return cls(status=WeightStatus.NO_DATA, **timestamps)
+
+    @classmethod
+    def error(cls, **timestamps) -> 'WeightReading':
+        return cls(status=WeightStatus.ERROR, **timestamps)
+
+    @classmethod
+    def from_text(cls, text: str, **timestamps) -> 'WeightReading':
+        """แปลงข้อความแบบเดิม ("1230.0", "0", "N/A", "Error") - สำหรับ client รุ่นเก่าและเครื่องมือ debug"""
+        text = str(text).strip()
+        if text in _TEXT_STATUS:
+            return cls(status=_TEXT_STATUS[text], **timestamps)
+        try:
+            return cls.from_kg(float(text.replace(',', '')), **timestamps)
+        except ValueError:
+            return cls.no_data(**timestamps)
+
+    @classmethod
+    def from_wire(cls, data: Dict[str, Any]) -> 'WeightReading':
+        """
+        อ่านค่าจากข้อความ websocket ของ client (ดู to_wire)
+        รองรับ client รุ่นเก่าที่ส่ง "weight" เป็นข้อความ
+        """
+        weight = data.get('weight')
+        wall = data.get('timestamp')
+        timestamps = {'wall': wall} if isinstance(wall, (int, float)) else {}
+        if isinstance(weight, str):
+            return cls.from_text(weight, **timestamps)
+        if isinstance(weight, (int, float)) and not isinstance(weight, bool):
+            stable = data.get('stable')
+            return cls.from_kg(weight, data.get('unit', DEFAULT_UNIT),
+                               stable if isinstance(stable, bool) else None, **timestamps)
+        try:
+            status = WeightStatus(data.get('status'))
+        except ValueError:
+            status = WeightStatus.NO_DATA
+        if status == WeightStatus.OK:
+            status = WeightStatus.NO_DATA
+        return cls(status=status, **timestamps)
+
+    @property
+    def ok(self) -> bool:
+        return self.status == WeightStatus.OK
+
+    @property
+    def kg(self) -> Optional[float]:
+        """น้ำหนักเป็น kg (None ถ้าไม่มีค่า)"""
+        return self.decigrams / DECIGRAMS_PER_KG if self.status == WeightStatus.OK else None
+
+    def to_text(self) -> str:
+        """ข้อความสำหรับแสดงผล แบบเดียวกับค่าเดิม ("0", "1230.0", "N/A", "Error")"""
+        if self.status != WeightStatus.OK:
+            return _STATUS_TEXT[self.status]
+        if self.decigrams == 0:
+            return "0"
+        return str(self.decigrams / DECIGRAMS_PER_KG)
+
+    def to_wire(self) -> Dict[str, Any]:
+        """ส่วนของข้อความ websocket ที่มาจากค่านี้ - จุดเดียวที่แปลงค่าน้ำหนักเป็นข้อมูลที่ส่งออก"""
+        return {
+            "weight": self.kg,
+            "unit": self.unit,
+            "stable": self.stable,
+            "status": self.status.value,
+            "timestamp": self.wall,
+        }
+
+    def _key(self):
+        return self.status, self.decigrams, self.unit, self.stable
+
+    def __eq__(self, other):
+        # เทียบเฉพาะค่า ไม่รวมเวลาที่อ่าน
+        if not isinstance(other, WeightReading):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (f"WeightReading({self.to_text()} {self.unit}, stable={self.stable!r}, "
+                f"status={self.status.value})")